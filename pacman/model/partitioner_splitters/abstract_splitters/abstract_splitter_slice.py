@@ -291,26 +291,35 @@ class AbstractSplitterSlice(AbstractSplitterCommon):
             list(tuple(int, int)), list(tuple(int, int))))
         """
 
+        # If any of the placements can't be remade, the tracker is left as
+        # it was before any of them were changed
         new_used_placements = list()
-        for (x, y, p, placed_resources, ip_tags, reverse_ip_tags) in \
-                used_placements:
-
-            if not isinstance(self._governed_app_vertex, AbstractVirtual):
-                # Deallocate the existing resources
-                resource_tracker.unallocate_resources(
-                    x, y, p, placed_resources, ip_tags, reverse_ip_tags)
-
-            # Get the new resource usage
-            vertex_slice = Slice(lo_atom, hi_atom)
-            new_resources = self.get_resources_used_by_atoms(vertex_slice)
-
-            if not isinstance(self._governed_app_vertex, AbstractVirtual):
-                # Re-allocate the existing resources
-                (x, y, p, ip_tags, reverse_ip_tags) = (
-                    resource_tracker.allocate_constrained_resources(
-                        new_resources, self._governed_app_vertex.constraints))
-            new_used_placements.append(
-                (x, y, p, new_resources, ip_tags, reverse_ip_tags))
+        resource_tracker.checkpoint()
+        try:
+            for (x, y, p, placed_resources, ip_tags, reverse_ip_tags) in \
+                    used_placements:
+
+                if not isinstance(self._governed_app_vertex, AbstractVirtual):
+                    # Deallocate the existing resources
+                    resource_tracker.unallocate_resources(
+                        x, y, p, placed_resources, ip_tags, reverse_ip_tags)
+
+                # Get the new resource usage
+                vertex_slice = Slice(lo_atom, hi_atom)
+                new_resources = self.get_resources_used_by_atoms(vertex_slice)
+
+                if not isinstance(self._governed_app_vertex, AbstractVirtual):
+                    # Re-allocate the existing resources
+                    (x, y, p, ip_tags, reverse_ip_tags) = (
+                        resource_tracker.allocate_constrained_resources(
+                            new_resources,
+                            self._governed_app_vertex.constraints))
+                new_used_placements.append(
+                    (x, y, p, new_resources, ip_tags, reverse_ip_tags))
+        except Exception:
+            resource_tracker.rollback()
+            raise
+        resource_tracker.commit()
         return new_used_placements
 
     @staticmethod
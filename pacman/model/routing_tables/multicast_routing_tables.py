@@ -15,8 +15,13 @@
 
 import json
 import gzip
+import os
+import struct
 from collections import OrderedDict
-from pacman.exceptions import PacmanAlreadyExistsException
+import numpy
+from spinn_utilities.ordered_set import OrderedSet
+from pacman.exceptions import (
+    PacmanAlreadyExistsException, PacmanConfigurationException)
 from .uncompressed_multicast_routing_table import \
     UnCompressedMulticastRoutingTable
 from spinn_machine import MulticastRoutingEntry
@@ -27,7 +32,7 @@ class MulticastRoutingTables(object):
     """
 
     __slots__ = [
-        # set that holds routing tables
+        # set that holds routing tables in the order they were added
         "_routing_tables",
         # dict of (x,y) -> routing table
         "_routing_tables_by_chip"
@@ -40,7 +45,7 @@ class MulticastRoutingTables(object):
         :raise PacmanAlreadyExistsException:
             If any two routing tables are for the same chip
         """
-        self._routing_tables = set()
+        self._routing_tables = OrderedSet()
         self._routing_tables_by_chip = dict()
 
         if routing_tables is not None:
@@ -72,7 +77,7 @@ class MulticastRoutingTables(object):
 
     @property
     def routing_tables(self):
-        """ The routing tables stored within
+        """ The routing tables stored within, in the order they were added
 
         :return: an iterable of routing tables
         :rtype: iterable(MulticastRoutingTable)
@@ -119,21 +124,235 @@ def to_json(router_table):
 
 
 def from_json(j_router):
-    if isinstance(j_router, str):
-        if j_router.endswith(".gz"):
-            with gzip.open(j_router) as j_file:
-                j_router = json.load(j_file)
-        else:
-            with open(j_router) as j_file:
-                j_router = json.load(j_file)
-
-    tables = MulticastRoutingTables()
-    for j_table in j_router:
-        table = UnCompressedMulticastRoutingTable(j_table["x"], j_table["y"])
-        tables.add_routing_table(table)
-        for j_entry in j_table["entries"]:
-            table.add_multicast_routing_entry(MulticastRoutingEntry(
-                j_entry["key"], j_entry["mask"],
-                defaultable=j_entry["defaultable"],
-                spinnaker_route=j_entry["spinnaker_route"]))
-    return tables
+    """ Read routing tables from JSON
+
+    :param j_router: The name of a JSON file (which is gzipped if the name
+        ends with ``.gz``) or the JSON itself as from :py:func:`to_json`
+    :type j_router: str or list
+    :rtype: MulticastRoutingTables
+    """
+    return MulticastRoutingTables(iter_json(j_router))
+
+
+#: Suffix added to the name of a JSON file to get its binary sidecar
+SIDECAR_SUFFIX = ".bin"
+
+#: Start of a binary routing table file
+_BINARY_MAGIC = b"PACMAN-MRT-1\n"
+
+#: x, y and number of entries of each table in a binary file
+_BINARY_HEADER = struct.Struct("<iiI")
+
+#: The entries of a table in a binary file
+_BINARY_ENTRY = numpy.dtype([
+    ("key", "<u4"), ("mask", "<u4"), ("route", "<u4"),
+    ("defaultable", "u1")])
+
+#: Characters read from a JSON file at once
+_CHUNK_SIZE = 1 << 20
+
+
+def _open(filename, mode):
+    """ Open a file, which is gzipped if the name ends with ``.gz``
+
+    :param str filename:
+    :param str mode:
+    """
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode)
+    return open(filename, mode)
+
+
+def _table_from_json(j_table):
+    """
+    :param dict j_table:
+    :rtype: UnCompressedMulticastRoutingTable
+    """
+    return UnCompressedMulticastRoutingTable(j_table["x"], j_table["y"], [
+        MulticastRoutingEntry(
+            j_entry["key"], j_entry["mask"],
+            defaultable=j_entry["defaultable"],
+            spinnaker_route=j_entry["spinnaker_route"])
+        for j_entry in j_table["entries"]])
+
+
+def iter_json(j_router):
+    """ Read routing tables from JSON one at a time.
+
+    When reading a file, only the text of the table being read is held in
+    memory, so a whole machine's tables can be passed on to be compressed
+    or checked without all being loaded at once.
+
+    :param j_router: The name of a JSON file (which is gzipped if the name
+        ends with ``.gz``) or the JSON itself as from :py:func:`to_json`
+    :type j_router: str or list
+    :rtype: iterable(UnCompressedMulticastRoutingTable)
+    :raises PacmanConfigurationException: If the file is not a JSON list
+    """
+    if not isinstance(j_router, str):
+        for j_table in j_router:
+            yield _table_from_json(j_table)
+        return
+
+    decoder = json.JSONDecoder()
+    with _open(j_router, "rt") as j_file:
+        text = j_file.read(_CHUNK_SIZE)
+        pos = _skip_space(text, 0)
+        if text[pos:pos + 1] != "[":
+            raise PacmanConfigurationException(
+                "{} is not a JSON list of routing tables".format(j_router))
+        pos += 1
+        expect_table = True
+        while True:
+            pos = _skip_space(text, pos)
+            if pos == len(text):
+                more = j_file.read(_CHUNK_SIZE)
+                if not more:
+                    raise PacmanConfigurationException(
+                        "{} ends before the end of the list".format(j_router))
+                text = more
+                pos = 0
+                continue
+            if text[pos] == "]":
+                return
+            if not expect_table:
+                if text[pos] != ",":
+                    raise PacmanConfigurationException(
+                        "{} has no comma between tables".format(j_router))
+                pos += 1
+                expect_table = True
+                continue
+            try:
+                j_table, pos = decoder.raw_decode(text, pos)
+            except ValueError:
+                # Most likely only part of the table has been read; read at
+                # least as much again so each table is only decoded a few
+                # times
+                more = j_file.read(max(_CHUNK_SIZE, len(text) - pos))
+                if not more:
+                    raise
+                text = text[pos:] + more
+                pos = 0
+                continue
+            expect_table = False
+            yield _table_from_json(j_table)
+
+
+def _skip_space(text, pos):
+    """
+    :param str text:
+    :param int pos:
+    :return: The index of the first character from pos that is not white
+        space, or the length of the text if there is none
+    :rtype: int
+    """
+    while pos < len(text) and text[pos] in " \t\n\r":
+        pos += 1
+    return pos
+
+
+def write_json(router_tables, filename, sidecar=False):
+    """ Write routing tables to a JSON file one at a time.
+
+    :param iterable(MulticastRoutingTable) router_tables:
+        The tables, which may be generated as they are written
+    :param str filename:
+        The file to write, which is gzipped if the name ends with ``.gz``
+    :param bool sidecar:
+        Whether to also write the tables to a binary file, named by adding
+        :py:data:`SIDECAR_SUFFIX` to the filename, which
+        :py:func:`iter_tables` reads in preference to the JSON
+    """
+    if sidecar:
+        binary_file = open(filename + SIDECAR_SUFFIX, "wb")
+        binary_file.write(_BINARY_MAGIC)
+    try:
+        with _open(filename, "wt") as j_file:
+            j_file.write("[")
+            separator = ""
+            for routing_table in router_tables:
+                j_file.write(separator)
+                json.dump(to_json([routing_table])[0], j_file)
+                separator = ",\n"
+                if sidecar:
+                    _write_binary_table(routing_table, binary_file)
+            j_file.write("]\n")
+    finally:
+        if sidecar:
+            binary_file.close()
+
+
+def write_binary(router_tables, filename):
+    """ Write routing tables to a compact binary file one at a time.
+
+    :param iterable(MulticastRoutingTable) router_tables:
+    :param str filename:
+    """
+    with open(filename, "wb") as binary_file:
+        binary_file.write(_BINARY_MAGIC)
+        for routing_table in router_tables:
+            _write_binary_table(routing_table, binary_file)
+
+
+def _write_binary_table(routing_table, binary_file):
+    """
+    :param MulticastRoutingTable routing_table:
+    :param ~io.BufferedWriter binary_file:
+    """
+    entries = routing_table.multicast_routing_entries
+    data = numpy.empty(len(entries), dtype=_BINARY_ENTRY)
+    data["key"] = [entry.routing_entry_key for entry in entries]
+    data["mask"] = [entry.mask for entry in entries]
+    data["route"] = [entry.spinnaker_route for entry in entries]
+    data["defaultable"] = [entry.defaultable for entry in entries]
+    binary_file.write(_BINARY_HEADER.pack(
+        routing_table.x, routing_table.y, len(entries)))
+    binary_file.write(data.tobytes())
+
+
+def iter_binary(filename):
+    """ Read routing tables from a binary file one at a time.
+
+    :param str filename: A file written by :py:func:`write_binary`
+    :rtype: iterable(UnCompressedMulticastRoutingTable)
+    :raises PacmanConfigurationException: If the file is not of that format
+    """
+    with open(filename, "rb") as binary_file:
+        if binary_file.read(len(_BINARY_MAGIC)) != _BINARY_MAGIC:
+            raise PacmanConfigurationException(
+                "{} is not a binary routing table file".format(filename))
+        while True:
+            header = binary_file.read(_BINARY_HEADER.size)
+            if not header:
+                return
+            if len(header) < _BINARY_HEADER.size:
+                raise PacmanConfigurationException(
+                    "{} is truncated".format(filename))
+            x, y, n_entries = _BINARY_HEADER.unpack(header)
+            n_bytes = n_entries * _BINARY_ENTRY.itemsize
+            body = binary_file.read(n_bytes)
+            if len(body) < n_bytes:
+                raise PacmanConfigurationException(
+                    "{} is truncated".format(filename))
+            data = numpy.frombuffer(body, dtype=_BINARY_ENTRY)
+            yield UnCompressedMulticastRoutingTable(x, y, [
+                MulticastRoutingEntry(
+                    key, mask, defaultable=bool(defaultable),
+                    spinnaker_route=route)
+                for key, mask, route, defaultable in zip(
+                    data["key"].tolist(), data["mask"].tolist(),
+                    data["route"].tolist(), data["defaultable"].tolist())])
+
+
+def iter_tables(filename):
+    """ Read routing tables from a JSON file one at a time, using its \
+        binary sidecar instead if there is one at least as new as the JSON
+
+    :param str filename: The name of the JSON file
+    :rtype: iterable(UnCompressedMulticastRoutingTable)
+    """
+    sidecar = filename + SIDECAR_SUFFIX
+    if os.path.exists(sidecar) and (
+            os.path.getmtime(sidecar) >= os.path.getmtime(filename)):
+        return iter_binary(sidecar)
+    return iter_json(filename)
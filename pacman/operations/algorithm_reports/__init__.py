@@ -17,6 +17,7 @@ import os
 from .network_specification import NetworkSpecification
 from .router_collision_potential_report import RouterCollisionPotentialReport
 from .router_summary import RouterSummary
+from .routing_metrics import RoutingMetrics
 from .write_json_machine import WriteJsonMachine
 from .write_json_machine_graph import WriteJsonMachineGraph
 from .write_json_partition_n_keys_map import WriteJsonPartitionNKeysMap
@@ -30,6 +31,7 @@ __all__ = (
     "NetworkSpecification",
     "RouterCollisionPotentialReport",
     "RouterSummary",
+    "RoutingMetrics",
     "WriteJsonMachine",
     "WriteJsonMachineGraph",
     "WriteJsonPartitionNKeysMap",
@@ -0,0 +1,436 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Measures of the quality of a routing, for comparing routers and placers.
+"""
+
+import logging
+import os
+import numpy
+from spinn_utilities.log import FormatAdapter
+from pacman.utilities.algorithm_utilities.machine_topology import (
+    N_LINKS, machine_topology)
+
+logger = FormatAdapter(logging.getLogger(__name__))
+
+_ROUTING_METRICS_FILENAME = "routing_metrics.rpt"
+
+_LINK_LABELS = {0: 'E', 1: 'NE', 2: 'N', 3: 'W', 4: 'SW', 5: 'S'}
+
+#: The number of hotspots written to the report
+_N_HOTSPOTS = 10
+
+
+class RoutingMetrics(object):
+    """ The load on the links and routers of a machine from a routing, and \
+        how long and how large the routes are.
+
+    The loads are NumPy arrays with a row per chip, in the order of
+    :py:attr:`xys`, so that different routings of the same machine can be
+    compared directly.
+
+    The load of a link is the number of keys sent over it, when the number
+    of keys of each partition is known, or otherwise the number of
+    partitions routed over it. The Steiner ratio of a route is the number of
+    links it uses over a lower bound of the number of links any tree joining
+    its source and destinations must use: the larger of the distance to the
+    furthest destination and the number of destination chips.
+    """
+
+    __slots__ = [
+        # The (x, y) of each chip, as int32 with a row per chip
+        "_xys",
+        # The load of each link of each chip, with a row per chip and a
+        # column per link
+        "_link_loads",
+        # The number of partitions with an entry on each chip, as int32
+        "_chip_entries",
+        # The most links from the source to any destination of each route
+        "_max_hops",
+        # The links from the source to each destination of all routes
+        "_hops",
+        # The number of links used by each route
+        "_tree_sizes",
+        # The lower bound of the number of links of each route
+        "_lower_bounds"]
+
+    def __init__(self, xys, link_loads, chip_entries, max_hops, hops,
+                 tree_sizes, lower_bounds):
+        """
+        :param ~numpy.ndarray xys: The (x, y) of each chip
+        :param ~numpy.ndarray link_loads: The load of each link of each chip
+        :param ~numpy.ndarray chip_entries:
+            The number of partitions with an entry on each chip
+        :param ~numpy.ndarray max_hops:
+            The most links to any destination of each route
+        :param ~numpy.ndarray hops:
+            The links to each destination of all routes
+        :param ~numpy.ndarray tree_sizes:
+            The number of links used by each route
+        :param ~numpy.ndarray lower_bounds:
+            The lower bound of the number of links of each route
+        """
+        # pylint: disable=too-many-arguments
+        self._xys = xys
+        self._link_loads = link_loads
+        self._chip_entries = chip_entries
+        self._max_hops = max_hops
+        self._hops = hops
+        self._tree_sizes = tree_sizes
+        self._lower_bounds = lower_bounds
+
+    @property
+    def xys(self):
+        """ The (x, y) of the chip of each row of the arrays
+
+        :rtype: ~numpy.ndarray
+        """
+        return self._xys
+
+    @property
+    def link_loads(self):
+        """ The load of each link of each chip, with a column per link
+
+        :rtype: ~numpy.ndarray
+        """
+        return self._link_loads
+
+    @property
+    def chip_entries(self):
+        """ The number of partitions with an entry on each chip, before \
+            any compression
+
+        :rtype: ~numpy.ndarray
+        """
+        return self._chip_entries
+
+    @property
+    def n_routes(self):
+        """ The number of routes measured
+
+        :rtype: int
+        """
+        return len(self._max_hops)
+
+    @property
+    def max_link_load(self):
+        """ The largest load on any link
+
+        :rtype: float
+        """
+        return float(self._link_loads.max()) if self._link_loads.size else 0.0
+
+    @property
+    def mean_link_load(self):
+        """ The mean load of the links that are used
+
+        :rtype: float
+        """
+        used = self._link_loads[self._link_loads > 0]
+        return float(used.mean()) if used.size else 0.0
+
+    @property
+    def max_chip_entries(self):
+        """ The most entries on any chip
+
+        :rtype: int
+        """
+        return int(self._chip_entries.max()) if self._chip_entries.size else 0
+
+    @property
+    def max_hops(self):
+        """ The most links from a source to a destination of any route
+
+        :rtype: int
+        """
+        return int(self._max_hops.max()) if self._max_hops.size else 0
+
+    @property
+    def mean_hops(self):
+        """ The mean number of links from a source to a destination, over \
+            the destination chips of all routes
+
+        :rtype: float
+        """
+        return float(self._hops.mean()) if self._hops.size else 0.0
+
+    @property
+    def total_links(self):
+        """ The number of links used by all the routes together
+
+        :rtype: int
+        """
+        return int(self._tree_sizes.sum())
+
+    @property
+    def steiner_ratios(self):
+        """ The Steiner ratio of each route that leaves its source chip
+
+        :rtype: ~numpy.ndarray
+        """
+        leaves = self._lower_bounds > 0
+        return self._tree_sizes[leaves] / self._lower_bounds[leaves]
+
+    @property
+    def mean_steiner_ratio(self):
+        """ The mean Steiner ratio of the routes that leave their source chip
+
+        :rtype: float
+        """
+        ratios = self.steiner_ratios
+        return float(ratios.mean()) if ratios.size else 1.0
+
+    @property
+    def max_steiner_ratio(self):
+        """ The largest Steiner ratio of the routes
+
+        :rtype: float
+        """
+        ratios = self.steiner_ratios
+        return float(ratios.max()) if ratios.size else 1.0
+
+    def link_load(self, x, y, link):
+        """ The load on a link
+
+        :param int x:
+        :param int y:
+        :param int link:
+        :rtype: float
+        """
+        row = self._row(x, y)
+        return 0.0 if row is None else float(self._link_loads[row, link])
+
+    def entries_on_chip(self, x, y):
+        """ The number of partitions with an entry on a chip
+
+        :param int x:
+        :param int y:
+        :rtype: int
+        """
+        row = self._row(x, y)
+        return 0 if row is None else int(self._chip_entries[row])
+
+    def link_hotspots(self, n_hotspots):
+        """ The most loaded links
+
+        :param int n_hotspots: The most links to return
+        :return: The x, y, link and load of each, most loaded first
+        :rtype: list(tuple(int,int,int,float))
+        """
+        loads = self._link_loads.ravel()
+        order = numpy.argsort(-loads, kind="mergesort")[:n_hotspots]
+        order = order[loads[order] > 0]
+        rows, links = numpy.divmod(order, N_LINKS)
+        return [
+            (int(x), int(y), int(link), float(load)) for (x, y), link, load
+            in zip(self._xys[rows], links, loads[order])]
+
+    def chip_hotspots(self, n_hotspots):
+        """ The chips with the most entries
+
+        :param int n_hotspots: The most chips to return
+        :return: The x, y and number of entries of each, most entries first
+        :rtype: list(tuple(int,int,int))
+        """
+        order = numpy.argsort(
+            -self._chip_entries, kind="mergesort")[:n_hotspots]
+        order = order[self._chip_entries[order] > 0]
+        return [
+            (int(x), int(y), int(entries)) for (x, y), entries
+            in zip(self._xys[order], self._chip_entries[order])]
+
+    def _row(self, x, y):
+        """
+        :param int x:
+        :param int y:
+        :return: The row of the chip, or None if there is no such chip
+        :rtype: int or None
+        """
+        rows = numpy.flatnonzero(
+            (self._xys[:, 0] == x) & (self._xys[:, 1] == y))
+        return int(rows[0]) if rows.size else None
+
+
+def routing_metrics(router_tables_by_partition, machine, n_keys_map=None):
+    """ Measure a routing
+
+    :param MulticastRoutingTableByPartition router_tables_by_partition:
+        The routing to measure
+    :param ~spinn_machine.Machine machine: The machine routed over
+    :param n_keys_map: The number of keys of each partition, or None to
+        count each partition routed over a link once
+    :type n_keys_map: AbstractMachinePartitionNKeysMap or None
+    :rtype: RoutingMetrics
+    """
+    topology = machine_topology(machine)
+    neighbours = topology.neighbours.tolist()
+    chip_index = topology.chip_index
+
+    # The chip and entry of each partition, and the row, link and load of
+    # each use of a link
+    routes = dict()
+    rows = list()
+    links = list()
+    loads = list()
+    for x, y in router_tables_by_partition.get_routers():
+        row = chip_index(x, y)
+        entries = router_tables_by_partition.get_entries_for_router(x, y)
+        for partition, entry in entries.items():
+            routes.setdefault(partition, dict())[row] = entry
+            load = (1 if n_keys_map is None
+                    else n_keys_map.n_keys_for_partition(partition))
+            for link in entry.link_ids:
+                rows.append(row)
+                links.append(link)
+                loads.append(load)
+
+    link_loads = numpy.zeros((topology.n_chips, N_LINKS))
+    numpy.add.at(link_loads, (
+        numpy.array(rows, dtype=numpy.int32),
+        numpy.array(links, dtype=numpy.int32)), loads)
+    chip_entries = numpy.bincount(
+        numpy.array([row for route in routes.values() for row in route],
+                    dtype=numpy.int32),
+        minlength=topology.n_chips).astype(numpy.int32)
+
+    xys = topology.xys.tolist()
+    max_hops = list()
+    hops = list()
+    tree_sizes = list()
+    lower_bounds = list()
+    for route in routes.values():
+        source = _source_row(route, neighbours)
+        route_hops, tree_size = _measure_route(route, source, neighbours)
+        max_hops.append(max(route_hops.values()) if route_hops else 0)
+        hops.extend(route_hops.values())
+        tree_sizes.append(tree_size)
+        destinations = [row for row in route_hops if row != source]
+        lower_bounds.append(max([len(destinations)] + [
+            topology.get_vector_length(xys[source], xys[row])
+            for row in destinations]))
+
+    return RoutingMetrics(
+        topology.xys, link_loads, chip_entries,
+        numpy.array(max_hops, dtype=numpy.int32),
+        numpy.array(hops, dtype=numpy.int32),
+        numpy.array(tree_sizes, dtype=numpy.int32),
+        numpy.array(lower_bounds, dtype=numpy.int32))
+
+
+def _source_row(route, neighbours):
+    """ Find the chip a route starts from, which no link of the route \
+        goes to
+
+    :param dict(int,MulticastRoutingTableByPartitionEntry) route:
+        The entry of the route on each chip, by row
+    :param list(list(int)) neighbours: The row over each link of each chip
+    :rtype: int
+    """
+    reached = set(
+        neighbours[row][link]
+        for row, entry in route.items() for link in entry.link_ids)
+    sources = [row for row in route if row not in reached]
+    # A route with a loop has no such chip; any chip will do then
+    return sources[0] if sources else next(iter(route))
+
+
+def _measure_route(route, source, neighbours):
+    """ Find the links from the source to each destination of a route, and \
+        the number of links the route uses
+
+    The destinations are the chips that have processors in their entry,
+    and the chips that links of the route go to that have no entry, such as
+    the virtual chips of external devices.
+
+    :param dict(int,MulticastRoutingTableByPartitionEntry) route:
+        The entry of the route on each chip, by row
+    :param int source: The row of the chip the route starts from
+    :param list(list(int)) neighbours: The row over each link of each chip
+    :return: The links to each destination by row, and the links used
+    :rtype: tuple(dict(int,int),int)
+    """
+    hops = dict()
+    depths = {source: 0}
+    to_visit = [source]
+    n_links = 0
+    while to_visit:
+        row = to_visit.pop()
+        depth = depths[row]
+        entry = route.get(row)
+        if entry is None or entry.processor_ids:
+            hops[row] = depth
+        if entry is None:
+            continue
+        for link in entry.link_ids:
+            n_links += 1
+            neighbour = neighbours[row][link]
+            if neighbour >= 0 and neighbour not in depths:
+                depths[neighbour] = depth + 1
+                to_visit.append(neighbour)
+    return hops, n_links
+
+
+def routing_metrics_report(
+        router_tables_by_partition, machine, n_keys_map=None,
+        report_folder=None):
+    """ Measure a routing, and write the measures to a report if there is \
+        a report folder
+
+    :param MulticastRoutingTableByPartition router_tables_by_partition:
+    :param ~spinn_machine.Machine machine:
+    :param n_keys_map:
+    :type n_keys_map: AbstractMachinePartitionNKeysMap or None
+    :param report_folder: Where to write the report, if anywhere
+    :type report_folder: str or None
+    :rtype: RoutingMetrics
+    """
+    metrics = routing_metrics(router_tables_by_partition, machine, n_keys_map)
+    if report_folder is None:
+        return metrics
+
+    file_name = os.path.join(report_folder, _ROUTING_METRICS_FILENAME)
+    try:
+        with open(file_name, "w") as f:
+            _write_report(f, metrics, n_keys_map is not None)
+    except IOError:
+        logger.exception("Generate routing metrics report: "
+                         "Can't open file {} for writing.", file_name)
+    return metrics
+
+
+def _write_report(f, metrics, by_keys):
+    """
+    :param ~io.TextIOBase f:
+    :param RoutingMetrics metrics:
+    :param bool by_keys: Whether the loads are numbers of keys
+    """
+    unit = "keys" if by_keys else "partitions"
+    f.write("        Routing Metrics Report\n")
+    f.write("        ======================\n\n")
+    f.write("Routes: {}\n".format(metrics.n_routes))
+    f.write("Links used: {}\n".format(metrics.total_links))
+    f.write("Link load ({}): max {} mean of used links {:.2f}\n".format(
+        unit, metrics.max_link_load, metrics.mean_link_load))
+    f.write("Entries per chip: max {}\n".format(metrics.max_chip_entries))
+    f.write("Hops to destinations: max {} mean {:.2f}\n".format(
+        metrics.max_hops, metrics.mean_hops))
+    f.write("Steiner ratio: max {:.2f} mean {:.2f}\n\n".format(
+        metrics.max_steiner_ratio, metrics.mean_steiner_ratio))
+    f.write("Most loaded links:\n")
+    for x, y, link, load in metrics.link_hotspots(_N_HOTSPOTS):
+        f.write("    {}:{} {} {}\n".format(x, y, _LINK_LABELS[link], load))
+    f.write("Chips with most entries:\n")
+    for x, y, entries in metrics.chip_hotspots(_N_HOTSPOTS):
+        f.write("    {}:{} {}\n".format(x, y, entries))
@@ -13,21 +13,32 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import numpy
 from spinn_utilities.progress_bar import ProgressBar
 from spinn_machine import FixedRouteEntry, Machine
 from pacman.exceptions import (
     PacmanAlreadyExistsException, PacmanConfigurationException,
     PacmanRoutingException)
+from pacman.utilities.algorithm_utilities.machine_topology import (
+    LINK_ADD_TABLE, machine_topology)
+
+#: The order in which the links of a chip are tried, starting with the most
+#: direct to 0,0
+_LINK_ORDER = (4, 3, 5, 2, 0, 1)
 
 
 class FixedRouteRouter(object):
     """ Computes the fixed routes used to direct data out traffic to the
         board-local gatherer processors.
+
+    The routes of a whole 48-chip board are worked out once, and used on
+    every board that has all its chips and the links the routes use; the
+    routes of any other board are worked out for that board.
     """
 
     __slots__ = [
         "_destination_class", "_fixed_route_tables",
-        "_machine", "_placements"]
+        "_machine", "_placements", "_topology"]
 
     def __call__(self, machine, placements, destination_class):
         """ Runs the fixed route generator for all boards on machine
@@ -45,19 +56,86 @@ class FixedRouteRouter(object):
         # pylint: disable=attribute-defined-outside-init
 
         self._machine = machine
+        self._topology = machine_topology(machine)
         self._destination_class = destination_class
         self._placements = placements
         self._fixed_route_tables = dict()
 
+        ethernet_chips = list(machine.ethernet_connected_chips)
+        template = _board_template()
+        whole = self._boards_matching(ethernet_chips, template)
+
         progress = ProgressBar(
-            len(machine.ethernet_connected_chips),
-            "Generating fixed router routes")
+            len(ethernet_chips), "Generating fixed router routes")
 
         # handle per board
-        for ethernet_chip in progress.over(machine.ethernet_connected_chips):
-            self._do_fixed_routing(ethernet_chip)
+        for ethernet_chip, is_whole in progress.over(
+                zip(ethernet_chips, whole)):
+            if is_whole:
+                self._do_template_routing(ethernet_chip, template)
+            else:
+                self._do_fixed_routing(ethernet_chip)
         return self._fixed_route_tables
 
+    def _boards_matching(self, ethernet_chips, template):
+        """ Find the boards that have every chip of a 48-chip board and \
+            every link used by the template, all at once
+
+        :param list(~spinn_machine.Chip) ethernet_chips:
+        :param ~numpy.ndarray template: From :py:func:`_board_template`
+        :return: Whether the template can be used, for each board
+        :rtype: ~numpy.ndarray
+        """
+        width = self._machine.width
+        height = self._machine.height
+        topology = self._topology
+
+        # The row of each chip by (x, y), or -1 where there is no chip
+        xys = topology.xys
+        inside = (xys[:, 0] < width) & (xys[:, 1] < height)
+        rows = numpy.full((width, height), -1, dtype=numpy.int32)
+        rows[xys[inside, 0], xys[inside, 1]] = numpy.flatnonzero(inside)
+
+        # The chips and the chips over the links used, as in
+        # Machine.get_existing_xys_by_ethernet, with a row per board
+        ethernet_xys = numpy.array(
+            [(chip.x, chip.y) for chip in ethernet_chips],
+            dtype=numpy.int32).reshape(-1, 2)
+        link_add = numpy.array(LINK_ADD_TABLE, dtype=numpy.int32)
+        dxs, dys, links = template[:, 0], template[:, 1], template[:, 2]
+        xs = ethernet_xys[:, 0:1] + dxs
+        ys = ethernet_xys[:, 1:2] + dys
+        chip_rows = rows[xs % width, ys % height]
+        destination_rows = rows[
+            (xs + link_add[links, 0]) % width,
+            (ys + link_add[links, 1]) % height]
+
+        return (
+            numpy.all(chip_rows >= 0, axis=1) &
+            numpy.all(topology.neighbours[chip_rows, links] ==
+                      destination_rows, axis=1))
+
+    def _do_template_routing(self, ethernet_connected_chip, template):
+        """ Handles a board with all its chips and links by moving the \
+            routes of the template to the board.
+
+        :param ~spinn_machine.Chip ethernet_connected_chip:
+            the Ethernet connected chip
+        :param ~numpy.ndarray template: From :py:func:`_board_template`
+        :raises PacmanConfigurationException:
+        :raises PacmanAlreadyExistsException:
+        """
+        eth_x = ethernet_connected_chip.x
+        eth_y = ethernet_connected_chip.y
+        width = self._machine.width
+        height = self._machine.height
+        for dx, dy, link_id in template.tolist():
+            self.__add_fixed_route_entry(
+                ((eth_x + dx) % width, (eth_y + dy) % height), [link_id], [])
+
+        processor_id = self.__locate_destination(ethernet_connected_chip)
+        self.__add_fixed_route_entry((eth_x, eth_y), [], [processor_id])
+
     def _do_fixed_routing(self, ethernet_connected_chip):
         """ Handles this board through the quick routing process, based on a\
             predefined routing table.
@@ -70,35 +148,17 @@ class FixedRouteRouter(object):
         eth_x = ethernet_connected_chip.x
         eth_y = ethernet_connected_chip.y
 
-        to_route = set(
-            self._machine.get_existing_xys_by_ethernet(eth_x, eth_y))
-        routed = set()
-        routed.add((eth_x, eth_y))
-        to_route.remove((eth_x, eth_y))
-
-        while len(to_route) > 0:
-            found = []
-            for x, y in to_route:
-                # Check links starting with the most direct to 0,0
-                for link_id in [4, 3, 5, 2, 0, 1]:
-                    # Get protential destination
-                    destination = self._machine.xy_over_link(x, y, link_id)
-                    # If it is useful
-                    if destination in routed:
-                        # check it actually exits
-                        if self._machine.is_link_at(x, y, link_id):
-                            # build entry and add to table and add to tables
-                            key = (x, y)
-                            self.__add_fixed_route_entry(key, [link_id], [])
-                            found.append(key)
-                            break
-            if len(found) == 0:
-                raise PacmanRoutingException(
-                    "Unable to do fixed point routing on {}.".format(
-                        ethernet_connected_chip.ip_address))
-            for key in found:
-                to_route.remove(key)
-                routed.add(key)
+        links = _links_to_root(
+            (eth_x, eth_y),
+            self._machine.get_existing_xys_by_ethernet(eth_x, eth_y),
+            self._topology.xy_over_link, self._topology.is_link_at)
+        if links is None:
+            raise PacmanRoutingException(
+                "Unable to do fixed point routing on {}.".format(
+                    ethernet_connected_chip.ip_address))
+        for key, link_id in links:
+            # build entry and add to table and add to tables
+            self.__add_fixed_route_entry(key, [link_id], [])
 
         # create final fixed route entry
         # locate where to put data on ethernet chip
@@ -140,3 +200,76 @@ class FixedRouteRouter(object):
         raise PacmanConfigurationException(
             "no destination vertex found on Ethernet chip {}:{}".format(
                 chip.x, chip.y))
+
+
+def _links_to_root(root, chips, xy_over_link, is_link_at):
+    """ Choose the link each chip sends to the root chip along, in rounds; \
+        in each round, each chip not yet routed takes the first link of \
+        :py:data:`_LINK_ORDER` that exists and goes to a chip routed in an \
+        earlier round.
+
+    :param tuple(int,int) root: The chip the routes go to
+    :param iterable(tuple(int,int)) chips: The chips to route, which may
+        include the root
+    :param callable(int,int,int,tuple(int,int)) xy_over_link:
+        Where a link of a chip goes
+    :param callable(int,int,int,bool) is_link_at: Whether a link exists
+    :return: The chip and link of each chip other than the root, in the
+        order they were routed, or None if some chips cannot reach the root
+    :rtype: list(tuple(tuple(int,int),int)) or None
+    """
+    to_route = set(chips)
+    to_route.discard(root)
+    routed = {root}
+    links = list()
+    while to_route:
+        found = []
+        for x, y in to_route:
+            # Check links starting with the most direct to 0,0
+            for link_id in _LINK_ORDER:
+                # If the potential destination is useful, check it exists
+                if xy_over_link(x, y, link_id) in routed and is_link_at(
+                        x, y, link_id):
+                    found.append(((x, y), link_id))
+                    break
+        if not found:
+            return None
+        for key, _ in found:
+            to_route.remove(key)
+            routed.add(key)
+        links.extend(found)
+    return links
+
+
+#: The template built by :py:func:`_board_template`, once it is built
+_board_template_cache = dict()
+
+
+def _board_template():
+    """ The routes of a 48-chip board with all its chips and links, as \
+        :py:func:`_links_to_root` chooses them
+
+    :return: The x and y offsets from the Ethernet chip and the link of each
+        chip other than the Ethernet chip, as int32 with a row per chip
+    :rtype: ~numpy.ndarray
+    """
+    if "template" in _board_template_cache:
+        return _board_template_cache["template"]
+    chips = frozenset(Machine.BOARD_48_CHIPS)
+
+    def xy_over_link(x, y, link_id):
+        add_x, add_y = LINK_ADD_TABLE[link_id]
+        return x + add_x, y + add_y
+
+    def is_link_at(x, y, link_id):
+        return xy_over_link(x, y, link_id) in chips
+
+    links = _links_to_root((0, 0), chips, xy_over_link, is_link_at)
+    # Sorted so that the order does not depend on the order of the sets
+    template = numpy.array(
+        sorted((x, y, link_id) for (x, y), link_id in links),
+        dtype=numpy.int32)
+    # Keep callers from changing the cached template
+    template.setflags(write=False)
+    _board_template_cache["template"] = template
+    return template
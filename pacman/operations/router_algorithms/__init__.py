@@ -15,5 +15,7 @@
 
 from .basic_dijkstra_routing import BasicDijkstraRouting
 from .ner_route import NerRoute, NerRouteTrafficAware
+from .negotiated_congestion_route import NegotiatedCongestionRoute
 
-__all__ = ['BasicDijkstraRouting', 'NerRoute', 'NerRouteTrafficAware']
+__all__ = ['BasicDijkstraRouting', 'NegotiatedCongestionRoute', 'NerRoute',
+           'NerRouteTrafficAware']
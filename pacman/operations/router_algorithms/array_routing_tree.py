@@ -0,0 +1,259 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from array import array
+from pacman.model.routing_table_by_partition import (
+    MulticastRoutingTableByPartitionEntry)
+from .routing_tree import RoutingTree
+
+
+class ArrayRoutingTree(object):
+    """ A multicast route through a machine, held as arrays with an element \
+        per chip rather than as an object per chip.
+
+    Each chip of the route is a node, numbered in the order they were added,
+    with the root (the source chip) as node 0. Each node other than the root
+    records its parent node and the link from the parent that leads to it.
+    The sinks are kept in a list of the node, route and vertex of each. The
+    columns are :py:class:`array.array` of 32-bit integers, which take a
+    fraction of the memory of a :py:class:`RoutingTree` per chip, and all
+    walks of the tree are done without recursion, so routes of any length
+    can be handled.
+    """
+
+    __slots__ = [
+        # The x of each node
+        "_xs",
+        # The y of each node
+        "_ys",
+        # The parent of each node; -1 for the root
+        "_parents",
+        # The link from the parent to each node; -1 for the root
+        "_directions",
+        # The (node, route, vertex) of each sink
+        "_sinks",
+        # The node of each (x, y); made when first needed
+        "_index"]
+
+    def __init__(self, root_xy):
+        """
+        :param tuple(int,int) root_xy: The chip the route starts from
+        """
+        self._xs = array("i", (root_xy[0], ))
+        self._ys = array("i", (root_xy[1], ))
+        self._parents = array("i", (-1, ))
+        self._directions = array("i", (-1, ))
+        self._sinks = list()
+        self._index = None
+
+    @staticmethod
+    def from_routing_tree(root):
+        """ Make an ArrayRoutingTree with the same chips and sinks as a \
+            RoutingTree
+
+        The nodes are numbered in the order they would be visited by a
+        depth-first walk of the RoutingTree.
+
+        :param RoutingTree root:
+        :rtype: ArrayRoutingTree
+        """
+        tree = ArrayRoutingTree(root.chip)
+        # A stack of (parent node, direction, RoutingTree); None for the root
+        to_visit = [(None, None, root)]
+        while to_visit:
+            parent, direction, node = to_visit.pop()
+            if parent is None:
+                index = 0
+            else:
+                x, y = node.chip
+                index = tree.add_node(x, y, parent, direction)
+            # Reversed so the first child is the first to come off the stack
+            for route, child in reversed(list(node.children)):
+                if isinstance(child, RoutingTree):
+                    to_visit.append((index, route, child))
+            for route, child in node.children:
+                if not isinstance(child, RoutingTree):
+                    tree._sinks.append((index, route, child))
+        return tree
+
+    def to_routing_tree(self):
+        """ Make a RoutingTree of the chips and sinks
+
+        :return: The root of the tree and the node of each chip in it
+        :rtype: tuple(RoutingTree,dict(tuple(int,int),RoutingTree))
+        """
+        nodes = list()
+        lookup = dict()
+        for x, y, parent, direction in zip(
+                self._xs, self._ys, self._parents, self._directions):
+            node = RoutingTree((x, y))
+            if parent >= 0:
+                nodes[parent].append_child((direction, node))
+            nodes.append(node)
+            lookup[x, y] = node
+        for index, route, vertex in self._sinks:
+            nodes[index].append_child((route, vertex))
+        return nodes[0], lookup
+
+    def copy(self):
+        """ Make a copy of the chips of the tree, without the sinks
+
+        :rtype: ArrayRoutingTree
+        """
+        tree = ArrayRoutingTree((self._xs[0], self._ys[0]))
+        tree._xs = array("i", self._xs)
+        tree._ys = array("i", self._ys)
+        tree._parents = array("i", self._parents)
+        tree._directions = array("i", self._directions)
+        return tree
+
+    def __len__(self):
+        """ The number of chips in the tree
+
+        :rtype: int
+        """
+        return len(self._xs)
+
+    @property
+    def root(self):
+        """ The chip the route starts from
+
+        :rtype: tuple(int,int)
+        """
+        return self._xs[0], self._ys[0]
+
+    @property
+    def sinks(self):
+        """ The chip, route and vertex of each sink
+
+        :rtype: iterable(tuple(tuple(int,int),int or None,object))
+        """
+        for index, route, vertex in self._sinks:
+            yield (self._xs[index], self._ys[index]), route, vertex
+
+    def add_node(self, x, y, parent, direction):
+        """ Add a chip to the tree
+
+        :param int x:
+        :param int y:
+        :param int parent: The node of the chip the route reaches it from
+        :param int direction: The link from the parent to the chip
+        :return: The node of the chip
+        :rtype: int
+        """
+        index = len(self._xs)
+        self._xs.append(x)
+        self._ys.append(y)
+        self._parents.append(parent)
+        self._directions.append(direction)
+        if self._index is not None:
+            self._index[x, y] = index
+        return index
+
+    def node_at(self, x, y):
+        """ The node of a chip in the tree
+
+        :param int x:
+        :param int y:
+        :rtype: int
+        :raises KeyError: If the chip is not in the tree
+        """
+        if self._index is None:
+            self._index = dict(
+                ((x, y), index)
+                for index, (x, y) in enumerate(zip(self._xs, self._ys)))
+        return self._index[x, y]
+
+    def add_sink(self, x, y, route, vertex):
+        """ Add a sink to a chip of the tree
+
+        :param int x:
+        :param int y:
+        :param route: The link or the processor plus 6 that reaches the sink,
+            or None if it has no route
+        :type route: int or None
+        :param vertex: The sink
+        """
+        self._sinks.append((self.node_at(x, y), route, vertex))
+
+    def traverse(self):
+        """ Traverse the tree yielding the direction taken to a node, the \
+            coordinates of that node and the directions leading from the \
+            node, as :py:meth:`RoutingTree.traverse`
+
+        :rtype: iterable(tuple(int, tuple(int,int), set(int)))
+        """
+        out_directions = self._out_directions()
+        for index, (x, y, direction) in enumerate(
+                zip(self._xs, self._ys, self._directions)):
+            yield (None if index == 0 else direction, (x, y),
+                   set(out_directions[index]))
+
+    def _out_directions(self):
+        """ The routes leading from each node, in the order they were added
+
+        :rtype: list(list(int))
+        """
+        out_directions = [[] for _ in self._xs]
+        for index in range(1, len(self._xs)):
+            out_directions[self._parents[index]].append(
+                self._directions[index])
+        for index, route, _ in self._sinks:
+            if route is not None:
+                out_directions[index].append(route)
+        return out_directions
+
+    def add_to_routing_tables(
+            self, routing_tables, partition, incoming_processor,
+            incoming_link=None):
+        """ Add the entries of the route to some routing tables
+
+        The chips are added depth first, with the children of each chip in
+        the order they were added.
+
+        :param MulticastRoutingTableByPartition routing_tables:
+        :param AbstractSingleSourcePartition partition:
+            The partition this route applies to
+        :param incoming_processor: The processor the route starts at
+        :type incoming_processor: int or None
+        :param incoming_link: The link the route arrives at the root by
+        :type incoming_link: int or None
+        """
+        children = [[] for _ in self._xs]
+        for index in range(len(self._xs) - 1, 0, -1):
+            # Reversed so the first child is the first to come off the stack
+            children[self._parents[index]].append(index)
+        out_directions = self._out_directions()
+        to_visit = [0]
+        while to_visit:
+            index = to_visit.pop()
+            link_ids = list()
+            processor_ids = list()
+            for route in out_directions[index]:
+                if route >= 6:
+                    # The route was offset as first 6 are the links
+                    processor_ids.append(route - 6)
+                else:
+                    link_ids.append(route)
+            if index == 0:
+                entry = MulticastRoutingTableByPartitionEntry(
+                    link_ids, processor_ids, incoming_processor,
+                    incoming_link)
+            else:
+                entry = MulticastRoutingTableByPartitionEntry(
+                    link_ids, processor_ids)
+            routing_tables.add_path_entry(
+                entry, self._xs[index], self._ys[index], partition)
+            to_visit.extend(children[index])
@@ -13,8 +13,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import heapq
 import logging
-import sys
 from six.moves import zip
 from spinn_utilities.log import FormatAdapter
 from spinn_utilities.progress_bar import ProgressBar, DummyProgressBar
@@ -22,6 +22,8 @@ from pacman.exceptions import PacmanRoutingException
 from pacman.model.graphs.common import EdgeTrafficType
 from pacman.model.routing_table_by_partition import (
     MulticastRoutingTableByPartition, MulticastRoutingTableByPartitionEntry)
+from pacman.utilities.algorithm_utilities.machine_topology import (
+    machine_topology)
 
 logger = FormatAdapter(logging.getLogger(__name__))
 infinity = float("inf")
@@ -29,7 +31,8 @@ infinity = float("inf")
 
 class _NodeInfo(object):
     """
-    :ivar list(~spinn_machine.Link) neighbours:
+    :ivar list(tuple(int,int) or None) neighbours:
+        The (x, y) over each link, or None where there is no link
     :ivar list(float) bws:
     :ivar list(float) weights:
     """
@@ -45,12 +48,87 @@ class _NodeInfo(object):
         return zip(self.neighbours, self.weights)
 
 
-class _DijkstraInfo(object):
-    __slots__ = ["activated", "cost"]
+class _DijkstraTables(object):
+    """ The cost of reaching each chip and whether it has been activated, \
+        in one full run of Dijkstra's algorithm.
 
-    def __init__(self):
-        self.activated = False
-        self.cost = None
+    The values are kept in lists with a row per chip. Rather than clearing
+    the lists for each run, each value is stamped with the run it was set in,
+    and values from earlier runs are treated as unset.
+    """
+
+    __slots__ = [
+        # The row of each chip, by (x, y)
+        "_index",
+        # The cost of each chip, when set in this run
+        "_costs",
+        # The run in which each cost was set
+        "_cost_runs",
+        # The run in which each chip was activated
+        "_activated_runs",
+        # The number of the current run
+        "_run"]
+
+    def __init__(self, chips):
+        """
+        :param list(tuple(int,int)) chips: The (x, y) of each chip
+        """
+        self._index = dict((xy, row) for row, xy in enumerate(chips))
+        self._costs = [None] * len(chips)
+        self._cost_runs = [0] * len(chips)
+        self._activated_runs = [0] * len(chips)
+        self._run = 1
+
+    def reset(self):
+        """ Start a new run, with no costs and no chips activated
+        """
+        self._run += 1
+
+    def __contains__(self, xy):
+        return xy in self._index
+
+    def row(self, xy):
+        """ The row of a chip, which breaks ties between equal costs
+
+        :param tuple(int,int) xy:
+        :rtype: int
+        """
+        return self._index[xy]
+
+    def cost(self, xy):
+        """ The lowest cost found so far of reaching a chip
+
+        :param tuple(int,int) xy:
+        :return: The cost, or None if the chip has not been reached
+        :rtype: float or None
+        """
+        row = self._index[xy]
+        if self._cost_runs[row] != self._run:
+            return None
+        return self._costs[row]
+
+    def set_cost(self, xy, cost):
+        """
+        :param tuple(int,int) xy:
+        :param float cost:
+        """
+        row = self._index[xy]
+        self._costs[row] = cost
+        self._cost_runs[row] = self._run
+
+    def is_activated(self, xy):
+        """ Whether the lowest cost of reaching a chip is known
+
+        :param tuple(int,int) xy:
+        :rtype: bool
+        """
+        return self._activated_runs[self._index[xy]] == self._run
+
+    def activate(self, xy):
+        """
+        :param tuple(int,int) xy:
+        """
+        self._activated_runs[self._index[xy]] = self._run
 
 
 class BasicDijkstraRouting(object):
@@ -120,7 +198,7 @@ class BasicDijkstraRouting(object):
         :param ~spinn_machine.Machine machine:
         :param MachineGraph graph:
         :param dict(tuple(int,int),_NodeInfo) node_info:
-        :param dict(tuple(int,int),_DijkstraInfo) tables:
+        :param _DijkstraTables tables:
         """
         # pylint: disable=too-many-arguments
         out_going_edges = (
@@ -139,10 +217,9 @@ class BasicDijkstraRouting(object):
             edges_to_route.append(edge)
 
         if dest_chips:
-            self._update_all_weights(node_info)
-            self._reset_tables(tables)
-            tables[placement.x, placement.y].activated = True
-            tables[placement.x, placement.y].cost = 0
+            tables.reset()
+            tables.activate((placement.x, placement.y))
+            tables.set_cost((placement.x, placement.y), 0)
             self._propagate_costs_until_reached_destinations(
                 tables, node_info, dest_chips, placement.x, placement.y)
 
@@ -161,12 +238,10 @@ class BasicDijkstraRouting(object):
         :rtype: dict(tuple(int,int),_NodeInfo)
         """
         nodes_info = dict()
+        topology = machine_topology(machine)
         for chip in machine.chips:
-            # get_neighbours should return a list of
-            # dictionaries of 'x' and 'y' values
             node = _NodeInfo()
-            for source_id in range(6):
-                n = chip.router.get_link(source_id)
+            for n in topology.link_destinations(chip.x, chip.y):
                 node.neighbours.append(n)
                 node.weights.append(infinity)
                 node.bws.append(None if n is None else self._max_bw)
@@ -179,15 +254,12 @@ class BasicDijkstraRouting(object):
             given node
 
         :param ~spinn_machine.Machine machine: the machine object
-        :return: the  Dijkstra's table dictionary
-        :rtype: dict(tuple(int,int),_DijkstraInfo)
+        :return: the  Dijkstra's tables
+        :rtype: _DijkstraTables
         """
         # Holds all the information about nodes within one full run of
         # Dijkstra's algorithm
-        tables = dict()
-        for chip in machine.chips:
-            tables[chip.x, chip.y] = _DijkstraInfo()
-        return tables
+        return _DijkstraTables([(chip.x, chip.y) for chip in machine.chips])
 
     def _update_all_weights(self, nodes_info):
         """ Change the weights of the neighbouring nodes
@@ -211,23 +283,12 @@ class BasicDijkstraRouting(object):
             if neighbour is not None:
                 nodes_info[key].weights[n] = 1
 
-    @staticmethod
-    def _reset_tables(tables):
-        """ Reset the Dijkstra tables for a new path search
-
-        :param dict(tuple(int,int),_DijkstraInfo) tables:
-            the dictionary object for the Dijkstra-tables
-        """
-        for key in tables:
-            tables[key] = _DijkstraInfo()
-
     def _propagate_costs_until_reached_destinations(
             self, tables, nodes_info, dest_chips, x_source, y_source):
         """ Propagate the weights till the destination nodes of the source\
             nodes are retraced
 
-        :param dict(tuple(int,int),_DijkstraInfo) tables:
-            the dictionary object for the Dijkstra-tables
+        :param _DijkstraTables tables: the Dijkstra-tables
         :param dict(tuple(int,int),_NodeInfo) nodes_info:
             the dictionary object for the nodes inside a route scope
         :param set(tuple(int,int)) dest_chips:
@@ -244,94 +305,97 @@ class BasicDijkstraRouting(object):
 
         current = source
 
+        # A heap of (cost, row, (x, y)) of the nodes whose cost has been set;
+        # the row makes ties go to the first chip of the machine. Entries
+        # are left in when a node gets a lower cost, and skipped when popped.
+        to_activate = []
+
         # Iterate only if the destination node hasn't been activated
         while dest_chips_to_find:
             # PROPAGATE!
             for neighbour, weight in nodes_info[current].neighweights:
-                # "neighbours" is a list of 6 links or None objects. There is
+                # "neighbours" is a list of 6 (x, y) or None objects. There is
                 # a None object where there is no connection to that neighbour
-                if (neighbour is not None and
-                        not (neighbour.destination_x == x_source and
-                             neighbour.destination_y == y_source)):
+                if neighbour is not None and neighbour != source:
 
                     # These variables change with every look at a new neighbour
                     self._update_neighbour(
-                        tables, neighbour, current,
+                        tables, to_activate, neighbour, current,
                         source, weight)
 
             # Set the next activated node as the deactivated node with the
             # lowest current cost
-            current = self._minimum(tables)
-            tables[current].activated = True
+            current = self._minimum(tables, to_activate)
+            tables.activate(current)
             dest_chips_to_find.discard(current)
 
     @staticmethod
-    def _minimum(tables):
+    def _minimum(tables, to_activate):
         """
-        :param dict(tuple(int,int),_DijkstraInfo) tables:
+        :param _DijkstraTables tables:
+        :param list(tuple(float,int,tuple(int,int))) to_activate:
+            The heap of nodes with costs
         :rtype: tuple(int,int)
         """
-        # This is the lowest cost across ALL deactivated nodes in the graph.
-        lowest_cost = sys.maxsize
-        lowest = None
-
-        # Find the next node to be activated
-        for key in tables:
-            # Don't continue if the node hasn't even been touched yet
-            if (tables[key].cost is not None and not tables[key].activated
-                    and tables[key].cost < lowest_cost):
-                lowest_cost = tables[key].cost
-                lowest = key
+        # The lowest cost across ALL deactivated nodes in the graph is the
+        # first entry of the heap that is still current
+        while to_activate:
+            cost, _, xy = heapq.heappop(to_activate)
+            if not tables.is_activated(xy) and cost == tables.cost(xy):
+                return xy
 
         # If there were no deactivated nodes with costs, but the destination
         # was not reached this iteration, raise an exception
-        if lowest is None:
-            raise PacmanRoutingException(
-                "Destination could not be activated, ending run")
-
-        return int(lowest[0]), int(lowest[1])
+        raise PacmanRoutingException(
+            "Destination could not be activated, ending run")
 
     @staticmethod
-    def _update_neighbour(tables, neighbour, current, source, weight):
+    def _update_neighbour(
+            tables, to_activate, neighbour, current, source, weight):
         """ Update the lowest cost for each neighbour_xy of a node
 
-        :param dict(tuple(int,int),_DijkstraInfo) tables:
-        :param ~spinn_machine.Link neighbour:
+        :param _DijkstraTables tables:
+        :param list(tuple(float,int,tuple(int,int))) to_activate:
+            The heap of nodes with costs
+        :param tuple(int,int) neighbour: The (x, y) of the neighbour
         :param tuple(int,int) current:
         :param tuple(int,int) source:
         :param float weight:
         :raise PacmanRoutingException: when the algorithm goes to a node that
             doesn't exist in the machine or the node's cost was set too low.
         """
-        neighbour_xy = (neighbour.destination_x, neighbour.destination_y)
+        # pylint: disable=too-many-arguments
+        neighbour_xy = neighbour
         if neighbour_xy not in tables:
             raise PacmanRoutingException(
                 "Tried to propagate to ({}, {}), which is not in the"
                 " graph: remove non-existent neighbours"
-                .format(neighbour.destination_x, neighbour.destination_y))
+                .format(neighbour_xy[0], neighbour_xy[1]))
 
-        chip_cost = tables[current].cost
-        neighbour_cost = tables[neighbour_xy].cost
+        chip_cost = tables.cost(current)
+        neighbour_cost = tables.cost(neighbour_xy)
 
         # Only try to update if the neighbour_xy is within the graph and the
         # cost if the node hasn't already been activated and the lowest cost
         # if the new cost is less, or if there is no current cost.
         new_weight = float(chip_cost + weight)
-        if (not tables[neighbour_xy].activated and
+        if (not tables.is_activated(neighbour_xy) and
                 (neighbour_cost is None or new_weight < neighbour_cost)):
             # update Dijkstra table
-            tables[neighbour_xy].cost = new_weight
+            tables.set_cost(neighbour_xy, new_weight)
+            heapq.heappush(to_activate, (
+                new_weight, tables.row(neighbour_xy), neighbour_xy))
 
-        if tables[neighbour_xy].cost == 0 and neighbour_xy != source:
+        if tables.cost(neighbour_xy) == 0 and neighbour_xy != source:
             raise PacmanRoutingException(
                 "!!!Cost of non-source node ({}, {}) was set to zero!!!"
-                .format(neighbour.destination_x, neighbour.destination_y))
+                .format(neighbour_xy[0], neighbour_xy[1]))
 
     def _retrace_back_to_source(
             self, dest, tables, edge, nodes_info, source_processor, graph):
         """
         :param Placement dest: Destination placement
-        :param dict(tuple(int,int),_DijkstraInfo) tables:
+        :param _DijkstraTables tables:
         :param MachineEdge edge:
         :param dict(tuple(int,int),_NodeInfo) nodes_info:
         :param int source_processor:
@@ -367,10 +431,10 @@ class BasicDijkstraRouting(object):
                     entry, dest.x, dest.y, partition)
                 prev_entry = entry
 
-        while tables[x, y].cost != 0:
+        while tables.cost((x, y)) != 0:
             for idx, neighbour in enumerate(nodes_info[x, y].neighbours):
                 if neighbour is not None:
-                    n_xy = (neighbour.destination_x, neighbour.destination_y)
+                    n_xy = neighbour
 
                     # Only check if it can be a preceding node if it actually
                     # exists
@@ -379,7 +443,7 @@ class BasicDijkstraRouting(object):
                             "Tried to trace back to node not in "
                             "graph: remove non-existent neighbours")
 
-                    if tables[n_xy].cost is not None:
+                    if tables.cost(n_xy) is not None:
                         x, y, prev_entry, added = self._create_routing_entry(
                             n_xy, tables, idx, nodes_info, x, y,
                             prev_entry, edge, graph)
@@ -400,7 +464,7 @@ class BasicDijkstraRouting(object):
         """ Create a new routing entry
 
         :param tuple(int,int) neighbour_xy:
-        :param dict(tuple(int,int),_DijkstraInfo) tables:
+        :param _DijkstraTables tables:
         :param int neighbour_index:
         :param dict(tuple(int,int),_NodeInfo) nodes_info:
         :param int x:
@@ -423,8 +487,8 @@ class BasicDijkstraRouting(object):
         made_an_entry = False
 
         neighbour_weight = nodes_info[neighbour_xy].weights[dec_direction]
-        chip_sought_cost = tables[x, y].cost - neighbour_weight
-        neighbours_lowest_cost = tables[neighbour_xy].cost
+        chip_sought_cost = tables.cost((x, y)) - neighbour_weight
+        neighbours_lowest_cost = tables.cost(neighbour_xy)
 
         if (neighbours_lowest_cost is not None and
                 self._close_enough(neighbours_lowest_cost, chip_sought_cost)):
@@ -0,0 +1,529 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Congestion aware routing by negotiation, in the style of PathFinder.
+
+Algorithm reference: L. McMurchie and C. Ebeling. PathFinder: A
+Negotiation-Based Performance-Driven Router for FPGAs, FPGA (1995).
+"""
+
+import heapq
+import logging
+import time
+from collections import OrderedDict
+import numpy
+from spinn_utilities.log import FormatAdapter
+from spinn_utilities.progress_bar import ProgressBar
+from pacman.exceptions import (
+    MachineHasDisconnectedSubRegion, PacmanInvalidParameterException)
+from pacman.model.routing_table_by_partition import (
+    MulticastRoutingTableByPartition)
+from pacman.utilities.algorithm_utilities.machine_topology import (
+    N_LINKS, machine_topology)
+from .array_routing_tree import ArrayRoutingTree
+from .ner_route import _add_sinks, _vertex_xy
+
+logger = FormatAdapter(logging.getLogger(__name__))
+
+
+class _Net(object):
+    """ A multicast partition to route, and its current route
+    """
+
+    __slots__ = [
+        # The partition
+        "partition",
+        # The vertices the partition goes to
+        "post_vertexes",
+        # The row of the source chip
+        "source",
+        # The rows of the destination chips, nearest to the source first
+        "destinations",
+        # The traffic of the net relative to the others
+        "weight",
+        # The parent row and link from it of each row of the route, or None
+        # for the source, in the order added so parents come before their
+        # children; None if not routed
+        "tree",
+        # The rows of the chips where the route needs a router entry
+        "entry_chips"]
+
+    def __init__(self, partition, post_vertexes, source, destinations,
+                 weight):
+        """
+        :param AbstractSingleSourcePartition partition:
+        :param list(MachineVertex) post_vertexes:
+        :param int source:
+        :param list(int) destinations:
+        :param float weight:
+        """
+        self.partition = partition
+        self.post_vertexes = post_vertexes
+        self.source = source
+        self.destinations = destinations
+        self.weight = weight
+        self.tree = None
+        self.entry_chips = ()
+
+    def links(self):
+        """ The links the route uses
+
+        :rtype: iterable(tuple(int,int))
+        :return: The row of the chip and the link from it
+        """
+        for parent_link in self.tree.values():
+            if parent_link is not None:
+                yield parent_link
+
+
+class NegotiatedCongestionRoute(object):
+    """ Routes the multicast partitions, ripping up and rerouting them until \
+        the links are evenly loaded and the routers have room for their \
+        entries.
+
+    Each partition is routed as a tree that grows from the source by the
+    cheapest path from the tree to each destination in turn. The cost of a
+    path counts each link and each chip it passes through, and goes up where
+    other partitions load a link more than its capacity, or would need
+    more router entries on a chip than the router has. Costs that stay high
+    are remembered from one iteration to the next, so partitions negotiate
+    which of them should go around the busy parts of the machine.
+
+    The traffic of each partition is taken as its number of keys if an
+    n_keys_map is given, or otherwise as the same for all partitions. A chip
+    where a route goes straight through, which default routing handles,
+    does not count as needing a router entry.
+
+    The routes of the iteration that left the fewest chips with too many
+    router entries, then the lowest peak link load, are returned.
+    """
+
+    #: The default number of times to route the partitions
+    DEFAULT_MAX_ITERATIONS = 10
+
+    #: How much the cost of congestion goes up each iteration
+    PRESENT_FACTOR_GROWTH = 1.5
+
+    #: How much of the congestion of each iteration is remembered
+    HISTORY_FACTOR = 0.5
+
+    #: The percentile of the loads of the links used by the first iteration
+    #: that is taken as the link capacity when none is given
+    LINK_CAPACITY_PERCENTILE = 90
+
+    __slots__ = []
+
+    def __call__(self, machine_graph, machine, placements, n_keys_map=None,
+                 max_iterations=DEFAULT_MAX_ITERATIONS, time_limit=None,
+                 link_capacity=None):
+        """
+        :param MachineGraph machine_graph: the machine graph
+        :param ~spinn_machine.Machine machine: spinnaker machine
+        :param Placements placements: the placements
+        :param n_keys_map:
+            The number of keys of each partition, used as its traffic
+        :type n_keys_map: AbstractMachinePartitionNKeysMap or None
+        :param int max_iterations:
+            The most times to route the partitions; 1 routes each partition
+            once, avoiding only the routers that are too full
+        :param time_limit:
+            Seconds after which no more partitions are rerouted, or None for
+            no limit; all partitions are always routed at least once
+        :type time_limit: float or None
+        :param link_capacity:
+            The traffic a link can carry before it is congested, or None to
+            take the LINK_CAPACITY_PERCENTILE percentile of the loads of the
+            links used when each partition is first routed
+        :type link_capacity: float or None
+        :return: a routing table by partition
+        :rtype: MulticastRoutingTableByPartition
+        :raises PacmanInvalidParameterException:
+            If max_iterations is less than 1, time_limit is negative or
+            link_capacity is not positive
+        :raises MachineHasDisconnectedSubRegion:
+            If a destination cannot be reached from its source
+        """
+        if max_iterations < 1:
+            raise PacmanInvalidParameterException(
+                "max_iterations", max_iterations, "must be at least 1")
+        if time_limit is not None and time_limit < 0:
+            raise PacmanInvalidParameterException(
+                "time_limit", time_limit, "must not be negative")
+        if link_capacity is not None and link_capacity <= 0:
+            raise PacmanInvalidParameterException(
+                "link_capacity", link_capacity, "must be positive")
+        deadline = None if time_limit is None else time.time() + time_limit
+
+        negotiation = _Negotiation(machine, link_capacity)
+        nets = negotiation.make_nets(machine_graph, placements, n_keys_map)
+        negotiation.negotiate(nets, max_iterations, deadline)
+
+        routing_tables = MulticastRoutingTableByPartition()
+        progress = ProgressBar(len(nets), "Making routing entries")
+        for net in progress.over(nets):
+            tree = negotiation.routing_tree(net)
+            _add_sinks(tree, net.post_vertexes, machine, placements)
+            incoming_processor = placements.get_placement_of_vertex(
+                net.partition.pre_vertex).p
+            tree.add_to_routing_tables(
+                routing_tables, net.partition, incoming_processor)
+        return routing_tables
+
+
+class _Negotiation(object):
+    """ The loads and costs of the links and chips while routing
+    """
+
+    __slots__ = [
+        # The machine
+        "_machine",
+        # The topology of the machine
+        "_topology",
+        # The (x, y) of each row
+        "_xys",
+        # The row over each link of each row, or -1
+        "_neighbours",
+        # The traffic on each link of each row
+        "_link_loads",
+        # The remembered congestion of each link of each row
+        "_link_history",
+        # The load above which a link is congested; None until known
+        "_link_capacity",
+        # The number of router entries needed on each row
+        "_chip_entries",
+        # The remembered congestion of each row
+        "_chip_history",
+        # The number of router entries available on each row
+        "_chip_capacities",
+        # The multiplier of the present congestion
+        "_present_factor"]
+
+    def __init__(self, machine, link_capacity):
+        """
+        :param ~spinn_machine.Machine machine:
+        :param link_capacity:
+            The load above which a link is congested, or None to find it
+            from the loads of the first iteration
+        :type link_capacity: float or None
+        """
+        self._machine = machine
+        self._topology = machine_topology(machine)
+        self._xys = [tuple(xy) for xy in self._topology.xys.tolist()]
+        self._neighbours = self._topology.neighbours.tolist()
+        n_chips = len(self._xys)
+        self._link_loads = [[0.0] * N_LINKS for _ in range(n_chips)]
+        self._link_history = [[0.0] * N_LINKS for _ in range(n_chips)]
+        self._link_capacity = link_capacity
+        self._chip_entries = [0] * n_chips
+        self._chip_history = [0.0] * n_chips
+        self._chip_capacities = [
+            machine.get_chip_at(x, y).router.n_available_multicast_entries
+            for x, y in self._xys]
+        self._present_factor = 0.0
+
+    def make_nets(self, machine_graph, placements, n_keys_map):
+        """ Find the chips of each multicast partition
+
+        :param MachineGraph machine_graph:
+        :param Placements placements:
+        :param n_keys_map:
+        :type n_keys_map: AbstractMachinePartitionNKeysMap or None
+        :rtype: list(_Net)
+        """
+        topology = self._topology
+        nets = list()
+        for source_vertex in machine_graph.vertices:
+            for partition in machine_graph.\
+                    get_multicast_edge_partitions_starting_at_vertex(
+                        source_vertex):
+                post_vertexes = list(e.post_vertex for e in partition.edges)
+                source_xy = _vertex_xy(
+                    source_vertex, placements, self._machine)
+                destinations = list()
+                for post_vertex in post_vertexes:
+                    xy = _vertex_xy(post_vertex, placements, self._machine)
+                    row = topology.chip_index(*xy)
+                    if row not in destinations:
+                        destinations.append(row)
+                destinations.sort(key=lambda row: topology.get_vector_length(
+                    source_xy, self._xys[row]))
+                weight = 1.0
+                if n_keys_map is not None:
+                    weight = float(n_keys_map.n_keys_for_partition(partition))
+                nets.append(_Net(
+                    partition, post_vertexes, topology.chip_index(*source_xy),
+                    destinations, weight))
+        return nets
+
+    def negotiate(self, nets, max_iterations, deadline):
+        """ Route the nets, rerouting the congested ones until nothing is \
+            congested or the iterations or time run out.
+
+        :param list(_Net) nets:
+        :param int max_iterations:
+        :param deadline: time.time() after which no more nets are rerouted
+        :type deadline: float or None
+        """
+        best_score = None
+        best_trees = None
+        first_score = None
+        iteration = 0
+        progress = ProgressBar(max_iterations, "Negotiating routes")
+        for iteration in range(max_iterations):
+            if iteration == 0:
+                to_route = nets
+            else:
+                to_route = [net for net in nets if self._is_congested(net)]
+                if not to_route:
+                    break
+            for net in to_route:
+                if iteration > 0 and _out_of_time(deadline):
+                    break
+                if net.tree is not None:
+                    self._remove(net)
+                self._route(net)
+                self._add(net)
+
+            if self._link_capacity is None:
+                self._set_link_capacity()
+            score = self._score()
+            if first_score is None:
+                first_score = score
+            if best_score is None or score < best_score:
+                best_score = score
+                best_trees = [(net.tree, net.entry_chips) for net in nets]
+            progress.update()
+            if _out_of_time(deadline):
+                break
+            self._remember_congestion()
+            if self._present_factor == 0.0:
+                self._present_factor = 1.0
+            else:
+                self._present_factor *= \
+                    NegotiatedCongestionRoute.PRESENT_FACTOR_GROWTH
+        progress.end()
+
+        for net, (tree, entry_chips) in zip(nets, best_trees):
+            net.tree = tree
+            net.entry_chips = entry_chips
+        logger.info(
+            "Routed in {} iterations: {} chips with too many router entries"
+            " and a peak link load of {} down from {} and {}",
+            iteration + 1, best_score[0], best_score[1], first_score[0],
+            first_score[1])
+
+    def _route(self, net):
+        """ Grow the tree of a net from its source to each destination
+
+        :param _Net net:
+        """
+        tree = OrderedDict([(net.source, None)])
+        for destination in net.destinations:
+            if destination not in tree:
+                for parent, link, row in self._cheapest_path(
+                        tree, destination, net.weight):
+                    tree[row] = (parent, link)
+        net.tree = tree
+
+        # Chips where the route goes straight on need no router entry
+        children = dict()
+        for row, parent_link in tree.items():
+            if parent_link is not None:
+                children.setdefault(parent_link[0], []).append(row)
+        destinations = set(net.destinations)
+        net.entry_chips = tuple(
+            row for row in tree
+            if row == net.source or row in destinations or
+            len(children.get(row, ())) != 1 or
+            tree[children[row][0]][1] != tree[row][1])
+
+    def _cheapest_path(self, tree, destination, weight):
+        """ Find the cheapest path from any chip of a tree to a chip, by A*
+
+        :param ~collections.OrderedDict(int,tuple(int,int)) tree:
+            The rows already in the tree
+        :param int destination:
+        :param float weight: The traffic of the net
+        :return: The parent row, link from it and row of each step
+        :rtype: list(tuple(int,int,int))
+        :raises MachineHasDisconnectedSubRegion:
+            If there is no path to the destination
+        """
+        topology = self._topology
+        target = self._xys[destination]
+        xys = self._xys
+        neighbours = self._neighbours
+        link_loads = self._link_loads
+        link_history = self._link_history
+        link_capacity = self._link_capacity
+        chip_entries = self._chip_entries
+        chip_history = self._chip_history
+        chip_capacities = self._chip_capacities
+        present = self._present_factor
+
+        costs = dict()
+        came_from = dict()
+        # (cost + estimate, order added, row); each step costs at least one
+        # so the number of steps left is an estimate that is never too high
+        to_visit = list()
+        for order, row in enumerate(tree):
+            costs[row] = 0.0
+            to_visit.append(
+                (topology.get_vector_length(xys[row], target), order, row))
+        heapq.heapify(to_visit)
+        order = len(to_visit)
+        done = set()
+        while to_visit:
+            _, _, row = heapq.heappop(to_visit)
+            if row == destination:
+                break
+            if row in done:
+                continue
+            done.add(row)
+            cost = costs[row]
+            for link, neighbour in enumerate(neighbours[row]):
+                if neighbour < 0 or neighbour in tree:
+                    continue
+                link_cost = 1.0 + link_history[row][link]
+                if link_capacity is not None:
+                    over = link_loads[row][link] + weight - link_capacity
+                    if over > 0:
+                        link_cost *= 1.0 + present * over / link_capacity
+                chip_cost = chip_history[neighbour]
+                over = chip_entries[neighbour] + 1 - chip_capacities[neighbour]
+                if over > 0:
+                    chip_cost += present * over
+                new_cost = cost + link_cost + chip_cost
+                if neighbour not in costs or new_cost < costs[neighbour]:
+                    costs[neighbour] = new_cost
+                    came_from[neighbour] = (row, link)
+                    heapq.heappush(to_visit, (
+                        new_cost + topology.get_vector_length(
+                            xys[neighbour], target), order, neighbour))
+                    order += 1
+        else:
+            raise MachineHasDisconnectedSubRegion(
+                "Could not find path to {}".format(target))
+
+        path = list()
+        row = destination
+        while row not in tree:
+            parent, link = came_from[row]
+            path.append((parent, link, row))
+            row = parent
+        path.reverse()
+        return path
+
+    def _add(self, net):
+        """ Count the use of the links and chips of a net
+
+        :param _Net net:
+        """
+        for row, link in net.links():
+            self._link_loads[row][link] += net.weight
+        for row in net.entry_chips:
+            self._chip_entries[row] += 1
+
+    def _remove(self, net):
+        """ Rip up the route of a net
+
+        :param _Net net:
+        """
+        for row, link in net.links():
+            self._link_loads[row][link] -= net.weight
+        for row in net.entry_chips:
+            self._chip_entries[row] -= 1
+
+    def _set_link_capacity(self):
+        """ Take a high percentile of the loads of the links in use as the \
+            capacity, so that only the busiest links are congested
+        """
+        loads = [load for row_loads in self._link_loads
+                 for load in row_loads if load > 0]
+        if loads:
+            self._link_capacity = float(numpy.percentile(
+                loads, NegotiatedCongestionRoute.LINK_CAPACITY_PERCENTILE))
+
+    def _is_congested(self, net):
+        """ Whether a net uses a congested link or chip
+
+        :param _Net net:
+        :rtype: bool
+        """
+        if self._link_capacity is not None:
+            for row, link in net.links():
+                if self._link_loads[row][link] > self._link_capacity:
+                    return True
+        for row in net.entry_chips:
+            if self._chip_entries[row] > self._chip_capacities[row]:
+                return True
+        return False
+
+    def _score(self):
+        """ How congested the routes are; lower is better
+
+        :return: The number of chips with too many router entries and the
+            peak link load
+        :rtype: tuple(int, float)
+        """
+        n_full = sum(
+            1 for entries, capacity in zip(
+                self._chip_entries, self._chip_capacities)
+            if entries > capacity)
+        peak = 0.0
+        if self._link_loads:
+            peak = max(max(row_loads) for row_loads in self._link_loads)
+        return n_full, peak
+
+    def _remember_congestion(self):
+        """ Add the present congestion to the history
+        """
+        factor = NegotiatedCongestionRoute.HISTORY_FACTOR
+        if self._link_capacity is not None:
+            for row_loads, row_history in zip(
+                    self._link_loads, self._link_history):
+                for link, load in enumerate(row_loads):
+                    if load > self._link_capacity:
+                        row_history[link] += factor * (
+                            load - self._link_capacity) / self._link_capacity
+        for row, entries in enumerate(self._chip_entries):
+            over = entries - self._chip_capacities[row]
+            if over > 0:
+                self._chip_history[row] += factor * over
+
+    def routing_tree(self, net):
+        """ Make the tree of chips of a routed net, without the sinks
+
+        :param _Net net:
+        :rtype: ArrayRoutingTree
+        """
+        tree = ArrayRoutingTree(self._xys[net.source])
+        # The node of each row; the parents are in the tree before children
+        nodes = {net.source: 0}
+        for row, parent_link in net.tree.items():
+            if parent_link is not None:
+                parent, link = parent_link
+                x, y = self._xys[row]
+                nodes[row] = tree.add_node(x, y, nodes[parent], link)
+        return tree
+
+
+def _out_of_time(deadline):
+    """
+    :param deadline:
+    :type deadline: float or None
+    :rtype: bool
+    """
+    return deadline is not None and time.time() > deadline
@@ -28,17 +28,26 @@ https://github.com/project-rig/rig/blob/master/rig/place_and_route/route/utils.p
 import heapq
 import itertools
 import functools
+import logging
+import multiprocessing
 
 from collections import deque, defaultdict
 
+from spinn_utilities.log import FormatAdapter
 from spinn_utilities.progress_bar import ProgressBar
-from pacman.exceptions import MachineHasDisconnectedSubRegion
+from pacman.exceptions import (
+    MachineHasDisconnectedSubRegion, PacmanInvalidParameterException)
 from pacman.model.graphs import (
     AbstractFPGA, AbstractVirtual, AbstractSpiNNakerLink)
 from pacman.model.routing_table_by_partition import (
-    MulticastRoutingTableByPartition, MulticastRoutingTableByPartitionEntry)
+    MulticastRoutingTableByPartition)
+from pacman.utilities.algorithm_utilities.machine_topology import (
+    machine_topology)
+from .array_routing_tree import ArrayRoutingTree
 from .routing_tree import RoutingTree
 
+logger = FormatAdapter(logging.getLogger(__name__))
+
 
 def _convert_a_route(
         routing_tables, partition, incoming_processor, incoming_link,
@@ -53,34 +62,113 @@ def _convert_a_route(
         Partition this route applies to
     :param int or None incoming_processor: processor this link came from
     :param int or None incoming_link: link this link came from
-    :param RoutingTree partition_route: algorithm specific format of the route
+    :param partition_route: algorithm specific format of the route
+    :type partition_route: RoutingTree or ArrayRoutingTree
     """
-    x, y = partition_route.chip
-
-    next_hops = list()
-    processor_ids = list()
-    link_ids = list()
-    for (route, next_hop) in partition_route.children:
-        if route is not None:
-            if route >= 6:
-                # The route was offset as first 6 are the links
-                processor_ids.append(route - 6)
+    if isinstance(partition_route, RoutingTree):
+        partition_route = ArrayRoutingTree.from_routing_tree(partition_route)
+    partition_route.add_to_routing_tables(
+        routing_tables, partition, incoming_processor, incoming_link)
+
+
+#: The rings computed by :py:func:`_hex_rings`, by radius
+_hex_rings_cache = dict()
+
+
+def _hex_rings(radius):
+    """ The offsets of the chips at each distance from a chip, up to a radius
+
+    :param int radius:
+    :return: For each distance from 0 to radius, the (x, y) offsets of the
+        chips at exactly that distance
+    :rtype: tuple(tuple(tuple(int,int)))
+    """
+    if radius in _hex_rings_cache:
+        return _hex_rings_cache[radius]
+    rings = [[] for _ in range(radius + 1)]
+    for dx in range(-radius, radius + 1):
+        for dy in range(-radius, radius + 1):
+            if (dx >= 0) == (dy >= 0) or dx == 0 or dy == 0:
+                distance = max(abs(dx), abs(dy))
             else:
-                link_ids.append(route)
-            if isinstance(next_hop, RoutingTree):
-                next_incoming_link = None
-                next_hops.append((next_hop, next_incoming_link))
+                distance = abs(dx) + abs(dy)
+            if distance <= radius:
+                rings[distance].append((dx, dy))
+    result = tuple(tuple(ring) for ring in rings)
+    _hex_rings_cache[radius] = result
+    return result
+
+
+class _NearestNodeIndex(object):
+    """ An index of the chips in a routing tree, in the order they were \
+        added, that finds the nearest one to a chip.
+
+    Rather than measuring the distance to every chip in the tree, the chips
+    around the given chip are looked up ring by ring, nearest first, so the
+    time taken does not depend on the size of the tree. Wrap-arounds are
+    taken into account, so the distance is that of
+    :py:meth:`~spinn_machine.Machine.get_vector_length`.
+    """
 
-    entry = MulticastRoutingTableByPartitionEntry(
-        link_ids, processor_ids, incoming_processor, incoming_link)
-    routing_tables.add_path_entry(entry, x, y, partition)
+    __slots__ = [
+        # The order in which each (x, y) was added
+        "_order",
+        # The offsets of the chips at each distance up to the radius
+        "_rings",
+        # The width of the machine if it wraps horizontally, else None
+        "_width",
+        # The height of the machine if it wraps vertically, else None
+        "_height"]
+
+    def __init__(self, topology, radius):
+        """
+        :param MachineTopology topology:
+        :param int radius: The furthest distance to look for a chip
+        """
+        self._order = dict()
+        self._rings = _hex_rings(radius)
+        self._width = topology.wrap_width
+        self._height = topology.wrap_height
+
+    def add(self, xy):
+        """ Add a chip to the index
+
+        :param tuple(int,int) xy:
+        """
+        self._order.setdefault(xy, len(self._order))
 
-    for next_hop, next_incoming_link in next_hops:
-        _convert_a_route(
-            routing_tables, partition, None, next_incoming_link, next_hop)
+    def __contains__(self, xy):
+        return xy in self._order
 
+    def nearest(self, xy):
+        """ Find the nearest chip within the radius; of those equally near, \
+            the one added first
 
-def _ner_net(src, destinations, machine, vector_to_nodes):
+        :param tuple(int,int) xy:
+        :return: The chip found, or None if there is none within the radius
+        :rtype: tuple(int,int) or None
+        """
+        x, y = xy
+        order = self._order
+        width = self._width
+        height = self._height
+        for ring in self._rings:
+            nearest = None
+            nearest_order = None
+            for dx, dy in ring:
+                cx = x + dx if width is None else (x + dx) % width
+                cy = y + dy if height is None else (y + dy) % height
+                index = order.get((cx, cy))
+                if index is not None and (
+                        nearest is None or index < nearest_order):
+                    nearest = (cx, cy)
+                    nearest_order = index
+            if nearest is not None:
+                return nearest
+        return None
+
+
+def _ner_net(src, destinations, topology, vector_to_nodes):
     """ Produce a shortest path tree for a given net using NER.
 
     This is the kernel of the NER algorithm.
@@ -89,8 +177,8 @@ def _ner_net(src, destinations, machine, vector_to_nodes):
         The coordinate (x, y) of the source vertex.
     :param iterable(tuple(int,int)) destinations:
         The coordinates of destination vertices.
-    :param ~spinn_machine.Machine machine:
-        machine for which routes are being generated
+    :param MachineTopology topology:
+        topology of the machine for which routes are being generated
     :param vector_to_nodes: ??????????
     :return:
         A RoutingTree is produced rooted at the source and visiting all
@@ -103,11 +191,15 @@ def _ner_net(src, destinations, machine, vector_to_nodes):
     radius = 20
     # Map from (x, y) to RoutingTree objects
     route = {src: RoutingTree(src)}
+    # The chips in the tree, to find which is nearest to each destination
+    index = _NearestNodeIndex(topology, radius)
+    index.add(src)
 
     # Handle each destination, sorted by distance from the source, closest
     # first.
     sorted_dest = sorted(
-        destinations, key=(lambda dest: machine.get_vector_length(src, dest)))
+        destinations,
+        key=(lambda dest: topology.get_vector_length(src, dest)))
     for destination in sorted_dest:
         # We shall attempt to find our nearest neighbouring placed node.
         neighbour = None
@@ -115,19 +207,10 @@ def _ner_net(src, destinations, machine, vector_to_nodes):
         # Try to find a nearby (within radius hops) node in the routing tree
         # that we can route to (falling back on just routing to the source).
         #
-        # This implementation scans the list of all route nodes created so far
-        # and finds the closest node which is < radius hops
-        # (falling back on the origin if no node is closer than radius hops).
-
-        neighbour = None
-        neighbour_distance = None
-        for candidate_neighbour in route:
-            distance = machine.get_vector_length(
-                candidate_neighbour, destination)
-            if distance <= radius and (
-                    neighbour is None or distance < neighbour_distance):
-                neighbour = candidate_neighbour
-                neighbour_distance = distance
+        # This finds the closest node which is <= radius hops, the first added
+        # of any that are equally close
+        # (falling back on the origin if no node is that close).
+        neighbour = index.nearest(destination)
 
         # Fall back on routing directly to the source if no nodes within radius
         # hops of the destination was found.
@@ -135,14 +218,14 @@ def _ner_net(src, destinations, machine, vector_to_nodes):
             neighbour = src
 
         # Find the shortest vector from the neighbour to this destination
-        vector = machine.get_vector(neighbour, destination)
+        vector = topology.get_vector(neighbour, destination)
 
         # The route may inadvertently pass through an
         # already connected node. If the route is allowed to pass through that
         # node it would create a cycle in the route which would be VeryBad(TM).
         # As a result, we work backward through the route and truncate it at
         # the first point where the route intersects with a connected node.
-        nodes = vector_to_nodes(vector, neighbour, machine)
+        nodes = vector_to_nodes(vector, neighbour, topology)
         i = len(nodes)
         for direction, (x, y) in reversed(nodes):
             i -= 1
@@ -160,6 +243,7 @@ def _ner_net(src, destinations, machine, vector_to_nodes):
         for direction, (x, y) in nodes:
             this_node = RoutingTree((x, y))
             route[(x, y)] = this_node
+            index.add((x, y))
 
             last_node.append_child((direction, this_node))
             last_node = this_node
@@ -167,28 +251,21 @@ def _ner_net(src, destinations, machine, vector_to_nodes):
     return route[src], route
 
 
-def _is_linked(source, target, direction, machine):
+def _is_linked(source, target, direction, topology):
     """
     :param tuple(int,int) source:
     :param tuple(int,int) target:
     :param int direction:
-    :param ~spinn_machine.Machine machine:
+    :param MachineTopology topology:
     :rtype: bool
     """
-    s_chip = machine.get_chip_at(source[0], source[1])
-    if s_chip is None:
-        return False
-    link = s_chip.router.get_link(direction)
-    if link is None:
-        return False
-    if link.destination_x != target[0]:
-        return False
-    if link.destination_y != target[1]:
+    destinations = topology.link_destinations(source[0], source[1])
+    if destinations is None:
         return False
-    return True
+    return destinations[direction] == target
 
 
-def _copy_and_disconnect_tree(root, machine):
+def _copy_and_disconnect_tree(root, topology):
     """
     Copy a RoutingTree (containing nothing but RoutingTrees), disconnecting
     nodes which are not connected in the machine.
@@ -204,7 +281,7 @@ def _copy_and_disconnect_tree(root, machine):
     :param RoutingTree root:
         The root of the RoutingTree that contains nothing but RoutingTrees
         (i.e. no children which are vertices or links).
-    :param ~spinn_machine.Machine machine:
+    :param MachineTopology topology:
         The machine in which the routes exist
     :return: (root, lookup, broken_links)
         Where:
@@ -231,7 +308,7 @@ def _copy_and_disconnect_tree(root, machine):
     while to_visit:
         new_parent, direction, old_node = to_visit.popleft()
 
-        if machine.is_chip_at(old_node.chip[0], old_node.chip[1]):
+        if topology.is_chip_at(old_node.chip[0], old_node.chip[1]):
             # Create a copy of the node
             new_node = RoutingTree(old_node.chip)
             new_lookup[new_node.chip] = new_node
@@ -250,7 +327,7 @@ def _copy_and_disconnect_tree(root, machine):
                 # node (no reason to check connectivity between a dead node
                 # and its parent).
                 if _is_linked(
-                        new_parent.chip, new_node.chip, direction, machine):
+                        new_parent.chip, new_node.chip, direction, topology):
                     # Is connected via working link
                     new_parent.append_child((direction, new_node))
                 else:
@@ -265,185 +342,176 @@ def _copy_and_disconnect_tree(root, machine):
     return new_root, new_lookup, broken_links
 
 
-def _a_star(sink, heuristic_source, sources, machine):
-    """ Use A* to find a path from any of the sources to the sink.
-
-    Note that the heuristic means that the search will proceed towards
-    heuristic_source without any concern for any other sources. This means that
-    the algorithm may miss a very close neighbour in order to pursue its goal
-    of reaching heuristic_source. This is not considered a problem since 1) the
-    heuristic source will typically be in the direction of the rest of the tree
-    and near by and often the closest entity 2) it prevents us accidentally
-    forming loops in the rest of the tree since we'll stop as soon as we touch
-    any part of it.
-
-    :param tuple(int,int) sink: (x, y)
-    :param tuple(int,int) heuristic_source: (x, y)
-        An element from `sources` which is used as a guiding heuristic for the
-        A* algorithm.
-    :param set(tuple(int,int)) sources: set([(x, y), ...])
-    :param ~spinn_machine.Machine machine:
-    :return: [(int, (x, y)), ...]
-        A path starting with a coordinate in `sources` and terminating at
-        connected neighbour of `sink` (i.e. the path does not include `sink`).
-        The direction given is the link down which to proceed from the given
-        (x, y) to arrive at the next point in the path.
-    :rtype: list(tuple(int,tuple(int,int)))
-    """
-    # Select the heuristic function to use for distances
-    heuristic = (lambda the_node: machine.get_vector_length(
-        the_node, heuristic_source))
-
-    # A dictionary {node: (direction, previous_node}. An entry indicates that
-    # 1) the node has been visited and 2) which node we hopped from (and the
-    # direction used) to reach previous_node.  This may be None if the node is
-    # the sink.
-    visited = {sink: None}
-
-    # The node which the tree will be reconnected to
-    selected_source = None
-
-    # A heap (accessed via heapq) of (distance, (x, y)) where distance is the
-    # distance between (x, y) and heuristic_source and (x, y) is a node to
-    # explore.
-    to_visit = [(heuristic(sink), sink)]
-    while to_visit:
-        _, node = heapq.heappop(to_visit)
-
-        # Terminate if we've found the destination
-        if node in sources:
-            selected_source = node
-            break
-
-        # Try all neighbouring locations.
-        for neighbour_link in range(6):  # Router.MAX_LINKS_PER_ROUTER
-            # Note: link identifiers arefrom the perspective of the neighbour,
-            # not the current node!
-            neighbour = machine.xy_over_link(
-                #                  Same as Router.opposite
-                node[0], node[1], (neighbour_link + 3) % 6)
-
-            # Skip links which are broken
-            if not machine.is_link_at(
-                    neighbour[0], neighbour[1], neighbour_link):
-                continue
-
-            # Skip neighbours who have already been visited
-            if neighbour in visited:
-                continue
-
-            # Explore all other neighbours
-            visited[neighbour] = (neighbour_link, node)
-            heapq.heappush(to_visit, (heuristic(neighbour), neighbour))
-
-    # Fail of no paths exist
-    if selected_source is None:
-        raise MachineHasDisconnectedSubRegion(
-            "Could not find path from {} to {}".format(
-                sink, heuristic_source))
-
-    # Reconstruct the discovered path, starting from the source we found and
-    # working back until the sink.
-    path = [(visited[selected_source][0], selected_source)]
-    while visited[path[-1][1]][1] != sink:
-        node = visited[path[-1][1]][1]
-        direction = visited[node][0]
-        path.append((direction, node))
-
-    return path
-
-
-def _route_has_dead_links(root, machine):
+def _route_has_dead_links(root, topology):
     """ Quickly determine if a route uses any dead links.
 
     :param RoutingTree root:
         The root of the RoutingTree which contains nothing but RoutingTrees
         (i.e. no vertices and links).
-    :param ~spinn_machine.Machine machine:
+    :param MachineTopology topology:
         The machine in which the routes exist.
     :return: True if the route uses any dead/missing links, False otherwise.
     :rtype: bool
     """
+    dead_links = topology.dead_links
+    if not dead_links:
+        # Routes stay inside the machine, where every link works
+        return False
     for _, (x, y), routes in root.traverse():
-        chip = machine.get_chip_at(x, y)
         for route in routes:
-            if chip is None:
-                return True
-            if not chip.router.is_link(route):
+            if (x, y, route) in dead_links:
                 return True
     return False
 
 
-def _avoid_dead_links(root, machine):
+def _avoid_dead_links(root, topology):
     """ Modify a RoutingTree to route-around dead links in a Machine.
 
-    Uses A* to reconnect disconnected branches of the tree (due to dead links
-    in the machine).
+    Each branch of the tree disconnected by dead links in the machine is
+    joined back to the nearest part of the tree in the direction of the chip
+    it was disconnected from, by :py:func:`_reconnect_subtree`.
 
     :param RoutingTree root:
         The root of the RoutingTree which contains nothing but RoutingTrees
         (i.e. no vertices and links).
-    :param ~spinn_machine.Machine machine:
+    :param MachineTopology topology:
         The machine in which the routes exist.
     :return:
         A new RoutingTree is produced rooted as before. A dictionary mapping
         from (x, y) to the associated RoutingTree is provided for convenience
     :rtype: tuple(RoutingTree,dict(tuple(int,int),RoutingTree))
+    :raises MachineHasDisconnectedSubRegion:
+        If a branch cannot be reached from the rest of the tree
     """
     # Make a copy of the RoutingTree with all broken parts disconnected
-    root, lookup, broken_links = _copy_and_disconnect_tree(root, machine)
+    root, lookup, broken_links = _copy_and_disconnect_tree(root, topology)
 
-    # For each disconnected subtree, use A* to connect the tree to *any* other
-    # disconnected subtree. Note that this process will eventually result in
-    # all disconnected subtrees being connected, the result is a fully
-    # connected tree.
+    # Fail at once if a branch is in another part of the machine
+    components = topology.components
+    root_component = components[topology.chip_index(*root.chip)]
     for parent, child in broken_links:
-        child_chips = set(c.chip for c in lookup[child])
-
-        # Try to reconnect broken links to any other part of the tree
-        # (excluding this broken subtree itself since that would create a
-        # cycle).
-        path = _a_star(child, parent,
-                       set(lookup).difference(child_chips),
-                       machine)
-        # Add new RoutingTree nodes to reconnect the child to the tree.
-        last_node = lookup[path[0][1]]
-        last_direction = path[0][0]
-        for direction, (x, y) in path[1:]:
-            if (x, y) not in child_chips:
-                # This path segment traverses new ground so we must create a
-                # new RoutingTree for the segment.
-                new_node = RoutingTree((x, y))
-                # A* will not traverse anything but chips in this tree so this
-                # assert is meerly a sanity check that this occurred correctly.
-                assert (x, y) not in lookup, "Cycle created."
-                lookup[(x, y)] = new_node
-            else:
-                # This path segment overlaps part of the disconnected tree
-                # (A* doesn't know where the disconnected tree is and thus
-                # doesn't avoid it). To prevent cycles being introduced, this
-                # overlapped node is severed from its parent and merged as part
-                # of the A* path.
-                new_node = lookup[(x, y)]
-
-                # Find the node's current parent and disconnect it.
-                for node in lookup[child]:  # pragma: no branch
-                    dn = [(d, n) for d, n in node.children if n == new_node]
-                    assert len(dn) <= 1
-                    if dn:
-                        node.remove_child(dn[0])
-                        # A node can only have one parent so we can stop now.
-                        break
-            last_node.append_child((last_direction, new_node))
-            last_node = new_node
-            last_direction = direction
-        last_node.append_child((last_direction, lookup[child]))
+        if components[topology.chip_index(*child)] != root_component:
+            raise MachineHasDisconnectedSubRegion(
+                "Could not find path from {} to {}".format(child, parent))
 
+    # Joining each disconnected subtree to *any* other part of the tree,
+    # including the other disconnected subtrees, eventually connects them
+    # all, and as a subtree is never joined to itself there are no cycles
+    for parent, child in broken_links:
+        _reconnect_subtree(parent, child, lookup, topology)
     return root, lookup
 
 
-def _do_route(source_vertex, post_vertexes, machine, placements,
-              vector_to_nodes):
+def _reconnect_subtree(parent, child, lookup, topology):
+    """ Reconnect a disconnected subtree to any other part of the tree, \
+        searching from all the chips of the subtree at once.
+
+    The search goes out from the chips of the subtree, against the direction
+    of the links, and stops at the first chip of the tree it reaches. It
+    tries the chips in order of the steps taken so far plus the steps left
+    to the chip the subtree was disconnected from, so it heads for the tree
+    rather than spreading out all around the subtree. The subtree is
+    rerooted at the chip the path starts from, so it can only be joined at
+    chips whose links back to its root work both ways; its other chips are
+    not searched through.
+
+    :param tuple(int,int) parent: The chip the subtree was disconnected from
+    :param tuple(int,int) child: The root of the subtree
+    :param dict(tuple(int,int),RoutingTree) lookup:
+        The node of each chip in the tree or its subtrees; updated with the
+        nodes added
+    :param MachineTopology topology:
+    :raises MachineHasDisconnectedSubRegion:
+        If no other part of the tree can be reached
+    """
+    # The parent chip and link from it of each chip of the subtree, or None
+    # for its root
+    parents = {child: None}
+    # The chips the subtree could be rerooted at
+    entries = [child]
+    can_reroot = set(entries)
+    to_visit = deque([lookup[child]])
+    while to_visit:
+        node = to_visit.popleft()
+        for link, child_node in node.children:
+            xy = child_node.chip
+            parents[xy] = (node.chip, link)
+            if node.chip in can_reroot and _is_linked(
+                    xy, node.chip, (link + 3) % 6, topology):
+                entries.append(xy)
+                can_reroot.add(xy)
+            to_visit.append(child_node)
+
+    # The (link, next chip) that each chip reaches the subtree by; None for
+    # the chips the search started from
+    visited = dict.fromkeys(entries)
+    # A heap of (steps + steps left to the parent, order added, steps, chip)
+    to_visit = [
+        (topology.get_vector_length(xy, parent), order, 0, xy)
+        for order, xy in enumerate(entries)]
+    heapq.heapify(to_visit)
+    order = len(to_visit)
+    found = None
+    while to_visit and found is None:
+        _, _, steps, chip = heapq.heappop(to_visit)
+        for link in range(6):  # Router.MAX_LINKS_PER_ROUTER
+            # Note: link identifiers are from the perspective of the
+            # neighbour, not the current chip!
+            xy = topology.xy_over_link(chip[0], chip[1], (link + 3) % 6)
+            if xy in visited or xy in parents:
+                continue
+            destinations = topology.link_destinations(xy[0], xy[1])
+            if destinations is None or destinations[link] != chip:
+                continue
+            visited[xy] = (link, chip)
+            if xy in lookup:
+                found = xy
+                break
+            heapq.heappush(to_visit, (
+                steps + 1 + topology.get_vector_length(xy, parent), order,
+                steps + 1, xy))
+            order += 1
+    if found is None:
+        raise MachineHasDisconnectedSubRegion(
+            "Could not find path from {} to {}".format(child, parent))
+
+    # Add the path, from the tree to the subtree
+    node = lookup[found]
+    xy = found
+    while visited[xy] is not None:
+        link, xy = visited[xy]
+        next_node = lookup.get(xy)
+        if next_node is None:
+            next_node = RoutingTree(xy)
+            lookup[xy] = next_node
+        node.append_child((link, next_node))
+        node = next_node
+    _reroot(xy, parents, lookup)
+
+
+def _reroot(xy, parents, lookup):
+    """ Make a chip the root of its subtree, by reversing the links from \
+        the root of the subtree to it
+
+    :param tuple(int,int) xy: The chip to be the root
+    :param dict(tuple(int,int),tuple(tuple(int,int),int)) parents:
+        The parent chip and link from it of each chip of the subtree, or
+        None for the root of the subtree
+    :param dict(tuple(int,int),RoutingTree) lookup:
+        The node of each chip in the tree or its subtrees
+    """
+    node = lookup[xy]
+    while parents[xy] is not None:
+        parent, link = parents[xy]
+        parent_node = lookup[parent]
+        parent_node.remove_child((link, node))
+        node.append_child(((link + 3) % 6, parent_node))
+        xy = parent
+        node = parent_node
+
+
+def _do_route(source_vertex, post_vertexes, machine, topology, placements,
+              vector_to_nodes, cache=None, repairs=None):
     """ Routing algorithm based on Neighbour Exploring Routing (NER).
 
     Algorithm refrence: J. Navaridas et al. SpiNNaker: Enhanced multicast
@@ -451,47 +519,93 @@ def _do_route(source_vertex, post_vertexes, machine, placements,
     http://dx.doi.org/10.1016/j.parco.2015.01.002
 
     This algorithm attempts to use NER to generate routing trees for all nets
-    and routes around broken links using A* graph search. If the system is
+    and routes around broken links using graph search. If the system is
     fully connected, this algorithm will always succeed though no consideration
     of congestion or routing-table usage is attempted.
 
     :param MachineVertex source_vertex:
     :param iterable(MachineVertex) post_vertexes:
     :param ~spinn_machine.Machine machine:
+    :param MachineTopology topology: The topology of the machine
     :param Placements placements:
     :param vector_to_nodes:
+    :param cache:
+        The trees of chips already made, to take the tree from if the same
+        chips have been routed before, or None to always make the tree
+    :type cache: _RouteTreeCache or None
+    :param repairs: Where to count the nets routed around dead links, if
+        anywhere
+    :type repairs: _RepairCounts or None
     :return:
-    :rtype: RoutingTree
+    :rtype: ArrayRoutingTree
     """
+    # pylint: disable=too-many-arguments
     source_xy = _vertex_xy(source_vertex, placements, machine)
     destinations = set(_vertex_xy(post_vertex, placements, machine)
                        for post_vertex in post_vertexes)
+    tree = None
+    if cache is not None:
+        key = cache.key(source_xy, destinations)
+        tree = cache.get(key)
+    if tree is None:
+        root, repaired = _route_chips(
+            source_xy, destinations, topology, vector_to_nodes)
+        if repairs is not None:
+            repairs.count(repaired)
+        tree = ArrayRoutingTree.from_routing_tree(root)
+        if cache is not None:
+            cache.add(key, tree)
+            tree = tree.copy()
+    _add_sinks(tree, post_vertexes, machine, placements)
+    return tree
+
+
+def _route_chips(source_xy, destinations, topology, vector_to_nodes):
+    """ Make the tree of chips that a net goes through, without the sinks
+
+    :param tuple(int,int) source_xy:
+    :param iterable(tuple(int,int)) destinations:
+    :param MachineTopology topology:
+    :param vector_to_nodes:
+    :return: The root of the tree and whether it had to be routed around
+        dead links
+    :rtype: tuple(RoutingTree,bool)
+    """
     # Generate routing tree (assuming a perfect machine)
-    root, lookup = _ner_net(source_xy, destinations, machine, vector_to_nodes)
+    root, _ = _ner_net(
+        source_xy, destinations, topology, vector_to_nodes)
 
     # Fix routes to avoid dead chips/links
-    if _route_has_dead_links(root, machine):
-        root, lookup = _avoid_dead_links(root, machine)
+    if _route_has_dead_links(root, topology):
+        root, _ = _avoid_dead_links(root, topology)
+        return root, True
+    return root, False
+
 
-    # Add the sinks in the net to the RoutingTree
+def _add_sinks(tree, post_vertexes, machine, placements):
+    """ Add the sinks of a net to its tree of chips
+
+    :param ArrayRoutingTree tree: The tree of chips
+    :param iterable(MachineVertex) post_vertexes:
+    :param ~spinn_machine.Machine machine:
+    :param Placements placements:
+    """
     for post_vertex in post_vertexes:
-        tree_node = lookup[_vertex_xy(post_vertex, placements, machine)]
+        x, y = _vertex_xy(post_vertex, placements, machine)
         if isinstance(post_vertex, AbstractVirtual):
             # Sinks with route-to-endpoint constraints must be routed
             # in the according directions.
             route = _route_to_endpoint(post_vertex, machine)
-            tree_node.append_child((route, post_vertex))
+            tree.add_sink(x, y, route, post_vertex)
         else:
             core = placements.get_placement_of_vertex(post_vertex).p
             if core is not None:
                 #  Offset the core by 6 as first 6 are the links
-                tree_node.append_child((core + 6, post_vertex))
+                tree.add_sink(x, y, core + 6, post_vertex)
             else:
                 # Sinks without that resource are simply included without
                 # an associated route
-                tree_node.append_child((None, post_vertex))
-
-    return root
+                tree.add_sink(x, y, None, post_vertex)
 
 
 def _vertex_xy(vertex, placements, machine):
@@ -529,7 +643,7 @@ def _route_to_endpoint(vertex, machine):
     return link_data.connected_link
 
 
-def _least_busy_dimension_first(traffic, vector, start, machine):
+def _least_busy_dimension_first(traffic, vector, start, topology):
     """ List the (x, y) steps on a route that goes through the least busy\
         routes first.
 
@@ -539,7 +653,7 @@ def _least_busy_dimension_first(traffic, vector, start, machine):
     :param start: (x, y)
         The coordinates from which the path should start (note this is a 2D
         coordinate).
-    :param machine:the spinn machine.
+    :param MachineTopology topology: the topology of the machine
     :return: min route
     """
 
@@ -548,7 +662,7 @@ def _least_busy_dimension_first(traffic, vector, start, machine):
     min_route = None
     for order in itertools.permutations([0, 1, 2]):
         dm_vector = [(i, vector[i]) for i in order]
-        route = _get_route(dm_vector, start, machine)
+        route = _get_route(dm_vector, start, topology)
         sum_traffic = sum(traffic[x, y] for _, (x, y) in route)
         if min_route is None or min_sum > sum_traffic:
             min_sum = sum_traffic
@@ -560,7 +674,7 @@ def _least_busy_dimension_first(traffic, vector, start, machine):
     return min_route
 
 
-def _longest_dimension_first(vector, start, machine):
+def _longest_dimension_first(vector, start, topology):
     """
     List the (x, y) steps on a longest-dimension first route.
 
@@ -569,16 +683,16 @@ def _longest_dimension_first(vector, start, machine):
     :param tuple(int,int) start: (x, y)
         The coordinates from which the path should start (note this is a 2D
         coordinate).
-    :param ~spinn_machine.Machine machine:
+    :param MachineTopology topology:
     :return:
     :rtype: list(tuple(int,int))
     """
     return _get_route(
         sorted(enumerate(vector), key=(lambda x: abs(x[1])), reverse=True),
-        start, machine)
+        start, topology)
 
 
-def _get_route(dm_vector, start, machine):
+def _get_route(dm_vector, start, topology):
     x, y = start
 
     out = []
@@ -591,48 +705,55 @@ def _get_route(dm_vector, start, machine):
             if magnitude > 0:
                 # Move East (0) magnitude times
                 for _ in range(magnitude):
-                    x, y = machine.xy_over_link(x, y, 0)
+                    x, y = topology.xy_over_link(x, y, 0)
                     out.append((0, (x, y)))
             else:
                 # Move West (3) -magnitude times
                 for _ in range(magnitude, 0):
-                    x, y = machine.xy_over_link(x, y, 3)
+                    x, y = topology.xy_over_link(x, y, 3)
                     out.append((3, (x, y)))
         elif dimension == 1:  # y
             if magnitude > 0:
                 # Move North (2) magnitude times
                 for _ in range(magnitude):
-                    x, y = machine.xy_over_link(x, y, 2)
+                    x, y = topology.xy_over_link(x, y, 2)
                     out.append((2, (x, y)))
             else:
                 # Move South (5) -magnitude times
                 for _ in range(magnitude, 0):
-                    x, y = machine.xy_over_link(x, y, 5)
+                    x, y = topology.xy_over_link(x, y, 5)
                     out.append((5, (x, y)))
         else:  # z
             if magnitude > 0:
                 # Move SouthWest (4) magnitude times
                 for _ in range(magnitude):
-                    x, y = machine.xy_over_link(x, y, 4)
+                    x, y = topology.xy_over_link(x, y, 4)
                     out.append((4, (x, y)))
             else:
                 # Move NorthEast (1) -magnitude times
                 for _ in range(magnitude, 0):
-                    x, y = machine.xy_over_link(x, y, 1)
+                    x, y = topology.xy_over_link(x, y, 1)
                     out.append((1, (x, y)))
     return out
 
 
-def _ner_route(machine_graph, machine, placements, vector_to_nodes):
+def _ner_route(machine_graph, machine, placements, vector_to_nodes,
+               cache=None, repairs=None):
     """ Performs routing using rig algorithm
 
     :param MachineGraph machine_graph:
     :param ~spinn_machine.Machine machine:
     :param Placements placements:
+    :param cache: Where to keep the trees of chips to use again, if anywhere
+    :type cache: _RouteTreeCache or None
+    :param repairs: Where to count the nets routed around dead links, if
+        anywhere
+    :type repairs: _RepairCounts or None
     :return:
     :rtype: MulticastRoutingTableByPartition
     """
     routing_tables = MulticastRoutingTableByPartition()
+    topology = machine_topology(machine)
 
     progress_bar = ProgressBar(len(machine_graph.vertices), "Routing")
 
@@ -644,43 +765,299 @@ def _ner_route(machine_graph, machine, placements, vector_to_nodes):
             post_vertexes = list(
                 e.post_vertex for e in partition.edges)
             routing_tree = _do_route(
-                source_vertex, post_vertexes, machine, placements,
-                vector_to_nodes)
+                source_vertex, post_vertexes, machine, topology, placements,
+                vector_to_nodes, cache, repairs)
             incoming_processor = placements.get_placement_of_vertex(
                 partition.pre_vertex).p
-            _convert_a_route(
-                routing_tables, partition, incoming_processor, None,
-                routing_tree)
+            routing_tree.add_to_routing_tables(
+                routing_tables, partition, incoming_processor)
+
+    progress_bar.end()
+    if cache is not None:
+        cache.log_hits()
+    if repairs is not None:
+        repairs.log()
+
+    return routing_tables
+
 
+def _ner_route_in_parallel(
+        machine_graph, machine, placements, vector_to_nodes, n_workers,
+        cache, repairs):
+    """ Performs routing using rig algorithm, with the trees of chips of the\
+        nets made in a pool of worker processes
+
+    The nets are sent to the workers as plain tuples, and the trees come
+    back in the same order as the nets were sent, so the routes are the same
+    as those made by :py:func:`_ner_route`, whichever worker finishes first.
+    Only the first net with each source and set of destinations is sent.
+
+    :param MachineGraph machine_graph:
+    :param ~spinn_machine.Machine machine:
+    :param Placements placements:
+    :param vector_to_nodes:
+        A function of the module, so that it can be sent to the workers
+    :param int n_workers: The number of worker processes
+    :param _RouteTreeCache cache: Where to keep the trees to use again
+    :param _RepairCounts repairs:
+        Where to count the nets routed around dead links
+    :return:
+    :rtype: MulticastRoutingTableByPartition
+    """
+    # pylint: disable=too-many-arguments
+    # Work out the chips of each net here, as the workers have no graph
+    partitions = list()
+    nets = list()
+    keys = set()
+    for source_vertex in machine_graph.vertices:
+        for partition in machine_graph.\
+                get_multicast_edge_partitions_starting_at_vertex(
+                    source_vertex):
+            post_vertexes = list(
+                e.post_vertex for e in partition.edges)
+            source_xy = _vertex_xy(source_vertex, placements, machine)
+            destinations = set(_vertex_xy(post_vertex, placements, machine)
+                               for post_vertex in post_vertexes)
+            key = cache.key(source_xy, destinations)
+            partitions.append((partition, post_vertexes, key))
+            if key not in keys:
+                keys.add(key)
+                # A list keeps the order of the set for the ties in distance
+                nets.append((source_xy, list(destinations)))
+
+    routing_tables = MulticastRoutingTableByPartition()
+    progress_bar = ProgressBar(len(partitions), "Routing")
+    chunk_size = len(nets) // (n_workers * 4) + 1
+    pool = multiprocessing.Pool(
+        n_workers, initializer=_init_worker,
+        initargs=(machine_topology(machine), vector_to_nodes))
+    try:
+        trees = pool.imap(_route_in_worker, nets, chunk_size)
+        for partition, post_vertexes, key in progress_bar.over(
+                partitions, False):
+            tree = cache.get(key)
+            if tree is None:
+                tree, repaired = next(trees)
+                repairs.count(repaired)
+                cache.add(key, tree)
+                tree = tree.copy()
+            _add_sinks(tree, post_vertexes, machine, placements)
+            incoming_processor = placements.get_placement_of_vertex(
+                partition.pre_vertex).p
+            tree.add_to_routing_tables(
+                routing_tables, partition, incoming_processor)
+    finally:
+        pool.close()
+        pool.join()
     progress_bar.end()
+    cache.log_hits()
+    repairs.log()
 
     return routing_tables
 
 
+# The topology and vector_to_nodes used by the current worker process
+_worker_topology = None
+_worker_vector_to_nodes = None
+
+
+def _init_worker(topology, vector_to_nodes):
+    """ Set up a worker process to route nets
+
+    :param MachineTopology topology:
+    :param vector_to_nodes:
+    """
+    global _worker_topology, _worker_vector_to_nodes
+    _worker_topology = topology
+    _worker_vector_to_nodes = vector_to_nodes
+
+
+def _route_in_worker(net):
+    """ Make the tree of chips of a net in a worker process
+
+    :param tuple(tuple(int,int),list(tuple(int,int))) net:
+        The source chip and the destination chips
+    :return: The tree, as arrays as they are cheap to pickle, and whether
+        it had to be routed around dead links
+    :rtype: tuple(ArrayRoutingTree,bool)
+    """
+    source_xy, destinations = net
+    root, repaired = _route_chips(
+        source_xy, destinations, _worker_topology, _worker_vector_to_nodes)
+    return ArrayRoutingTree.from_routing_tree(root), repaired
+
+
+class _RouteTreeCache(object):
+    """ The trees of chips made for nets, by source chip and set of \
+        destination chips, so that nets between the same chips are only \
+        routed once.
+
+    The trees are kept as :py:class:`ArrayRoutingTree`, and a new copy is
+    made each time one is used, so the sinks of each net can be added to it.
+    """
+
+    __slots__ = [
+        # The tree of each (source, frozenset(destinations))
+        "_trees",
+        # The number of nets that asked for a tree
+        "_n_gets",
+        # The number of nets that were given a tree
+        "_n_hits"]
+
+    def __init__(self):
+        self._trees = dict()
+        self._n_gets = 0
+        self._n_hits = 0
+
+    @staticmethod
+    def key(source_xy, destinations):
+        """
+        :param tuple(int,int) source_xy:
+        :param iterable(tuple(int,int)) destinations:
+        :rtype: tuple(tuple(int,int),frozenset(tuple(int,int)))
+        """
+        return source_xy, frozenset(destinations)
+
+    def get(self, key):
+        """ Get a copy of the tree made for the same chips
+
+        :param tuple key: From :py:meth:`key`
+        :return: The tree, without sinks, or None if the chips have not been
+            routed before
+        :rtype: ArrayRoutingTree or None
+        """
+        self._n_gets += 1
+        tree = self._trees.get(key)
+        if tree is None:
+            return None
+        self._n_hits += 1
+        return tree.copy()
+
+    def add(self, key, tree):
+        """
+        :param tuple key: From :py:meth:`key`
+        :param ArrayRoutingTree tree: A tree with no sinks, which must not
+            be changed afterwards
+        """
+        self._trees[key] = tree
+
+    def log_hits(self):
+        """ Report how many nets used a tree made for another
+        """
+        logger.info("{} of {} nets were routed the same as an earlier net",
+                    self._n_hits, self._n_gets)
+
+
+class _RepairCounts(object):
+    """ How many nets were routed, and how many of those had to be routed \
+        around dead links.
+    """
+
+    __slots__ = [
+        # The number of nets routed
+        "_n_routed",
+        # The number of nets routed around dead links
+        "_n_repaired"]
+
+    def __init__(self):
+        self._n_routed = 0
+        self._n_repaired = 0
+
+    @property
+    def n_repaired(self):
+        """ The number of nets routed around dead links
+
+        :rtype: int
+        """
+        return self._n_repaired
+
+    def count(self, repaired):
+        """ Count a net that has been routed
+
+        :param bool repaired: Whether it was routed around dead links
+        """
+        self._n_routed += 1
+        if repaired:
+            self._n_repaired += 1
+
+    def log(self):
+        """ Report how many nets were routed around dead links
+        """
+        logger.info("{} of {} nets routed were routed around dead links",
+                    self._n_repaired, self._n_routed)
+
+
 class NerRoute(object):
     """ Performs routing using rig algorithm
     """
 
-    __slots__ = []
+    __slots__ = [
+        # The nets routed around dead links by the last call
+        "_repairs"]
 
-    def __call__(self, machine_graph, machine, placements):
+    def __init__(self):
+        self._repairs = _RepairCounts()
+
+    @property
+    def n_repaired_nets(self):
+        """ The number of nets that had to be routed around dead links by \
+            the last call, counting nets between the same chips once
+
+        :rtype: int
+        """
+        return self._repairs.n_repaired
+
+    def __call__(self, machine_graph, machine, placements, n_workers=None):
         """ basic ner router
 
         :param MachineGraph machine_graph: the machine graph
         :param ~spinn_machine.Machine machine: spinnaker machine
         :param Placements placements: the placements
+        :param n_workers:
+            The number of worker processes to route the nets with.
+            None or 1 to route in this process;
+            0 to use one worker per available CPU.
+            The routes are the same however many workers there are.
+        :type n_workers: int or None
         :return: a routing table by partition
         :rtype: MulticastRoutingTableByPartition
+        :raises PacmanInvalidParameterException:
+            If n_workers is negative
         """
-        return _ner_route(
-            machine_graph, machine, placements, _longest_dimension_first)
+        if n_workers is not None and n_workers < 0:
+            raise PacmanInvalidParameterException(
+                "n_workers", n_workers, "must not be negative")
+        # Nets between the same chips are routed the same
+        cache = _RouteTreeCache()
+        self._repairs = _RepairCounts()
+        if n_workers is None or n_workers == 1:
+            return _ner_route(
+                machine_graph, machine, placements, _longest_dimension_first,
+                cache, self._repairs)
+        return _ner_route_in_parallel(
+            machine_graph, machine, placements, _longest_dimension_first,
+            n_workers or multiprocessing.cpu_count(), cache, self._repairs)
 
 
 class NerRouteTrafficAware(object):
     """ Performs routing with traffic awareness
     """
 
-    __slots__ = []
+    __slots__ = [
+        # The nets routed around dead links by the last call
+        "_repairs"]
+
+    def __init__(self):
+        self._repairs = _RepairCounts()
+
+    @property
+    def n_repaired_nets(self):
+        """ The number of nets that had to be routed around dead links by \
+            the last call
+
+        :rtype: int
+        """
+        return self._repairs.n_repaired
 
     def __call__(self, machine_graph, machine, placements):
         """ traffic-aware ner router
@@ -692,6 +1069,8 @@ class NerRouteTrafficAware(object):
         :rtype: MulticastRoutingTableByPartition
         """
         traffic = defaultdict(lambda: 0)
+        self._repairs = _RepairCounts()
         return _ner_route(
             machine_graph, machine, placements,
-            functools.partial(_least_busy_dimension_first, traffic))
+            functools.partial(_least_busy_dimension_first, traffic),
+            repairs=self._repairs)
@@ -110,14 +110,14 @@ class RoutingTree(object):
         no specific order. This iterator iterates over the child *objects*
         (i.e. not the route part of the child tuple).
         """
-        yield self
-
-        for _route, obj in self._children:
+        # A stack rather than recursion, so long routes can be iterated
+        to_visit = [self]
+        while to_visit:
+            obj = to_visit.pop()
+            yield obj
             if isinstance(obj, RoutingTree):
-                for subchild in obj:
-                    yield subchild
-            else:
-                yield obj
+                to_visit.extend(
+                    child for _route, child in reversed(obj._children))
 
     def __repr__(self):
         return "<RoutingTree at {} with {} {}>".format(
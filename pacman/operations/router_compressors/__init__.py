@@ -15,9 +15,12 @@
 
 from .abstract_compressor import AbstractCompressor
 from .checked_unordered_pair_compressor import CheckedUnorderedPairCompressor
+from .compression_cache import CompressionCache
 from .entry import Entry
+from .entry_table import EntryTable
 from .pair_compressor import PairCompressor
 from .unordered_pair_compressor import UnorderedPairCompressor
 
 __all__ = ['AbstractCompressor', 'CheckedUnorderedPairCompressor',
-           'Entry', 'PairCompressor', 'UnorderedPairCompressor']
+           'CompressionCache', 'Entry', 'EntryTable', 'PairCompressor',
+           'UnorderedPairCompressor']
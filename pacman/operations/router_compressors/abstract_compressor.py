@@ -19,11 +19,18 @@ based on https://github.com/project-rig/
 
 from abc import abstractmethod
 import logging
+import multiprocessing
+import time
 from spinn_utilities.log import FormatAdapter
 from spinn_utilities.progress_bar import ProgressBar
+from spinn_machine import MulticastRoutingEntry
 from pacman.model.routing_tables import (
-    CompressedMulticastRoutingTable, MulticastRoutingTables)
-from pacman.exceptions import MinimisationFailedError
+    CompressedMulticastRoutingTable, MulticastRoutingTables,
+    UnCompressedMulticastRoutingTable)
+from pacman.exceptions import (
+    MinimisationFailedError, PacmanInvalidParameterException)
+from .compression_cache import CompressionCache
+from .entry import Entry
 
 logger = FormatAdapter(logging.getLogger(__name__))
 
@@ -39,21 +46,69 @@ class AbstractCompressor(object):
         "_problems",
         # Flag to say if the results can be order dependent
         "_ordered",
+        # Number of worker processes to compress with; None to run serially
+        "_n_workers",
+        # Seconds allowed to compress all the tables; None for no limit
+        "_time_limit",
+        # Seconds allowed to compress any one table; None for no limit
+        "_table_time_limit",
+        # time.time() by which all the tables must be done; None for never
+        "_deadline",
+        # time.time() by which the current table must be done; None for never
+        "_table_deadline",
+        # Flag to say if the current table ran out of time
+        "_timed_out",
+        # The CompressionCache of previously compressed tables; None for none
+        "_cache",
+        # The number of tables found in the cache
+        "_cache_hits",
     ]
 
     def __init__(self, ordered=True):
         self._ordered = ordered
+        self._target_length = 0
+        self._n_workers = None
+        self._time_limit = None
+        self._table_time_limit = None
+        self._deadline = None
+        self._table_deadline = None
+        self._timed_out = False
+        self._cache = None
+        self._cache_hits = 0
 
-    def __call__(self, router_tables, target_length=None):
+    def __call__(self, router_tables, target_length=None, n_workers=None,
+                 time_limit=None, table_time_limit=None,
+                 cache_directory=None):
         """
         :param MulticastRoutingTables router_tables:
         :param int target_length:
+        :param n_workers:
+            The number of worker processes to compress the tables with.
+            None or 1 to compress serially in this process;
+            0 to use one worker per available CPU.
+        :type n_workers: int or None
+        :param time_limit:
+            Seconds allowed to compress all the tables, or None for no limit
+        :type time_limit: float or None
+        :param table_time_limit:
+            Seconds allowed to compress any one table, or None for no limit
+        :type table_time_limit: float or None
+        :param cache_directory:
+            The directory of a :py:class:`CompressionCache` to get tables
+            compressed before from and to keep the newly compressed tables in,
+            or None to use :py:attr:`cache`
+        :type cache_directory: str or None
         :rtype: MulticastRoutingTables
         """
         if target_length is None:
             self._target_length = 0  # Compress as much as you can
         else:
             self._target_length = target_length
+        self.n_workers = n_workers
+        self.time_limit = time_limit
+        self.table_time_limit = table_time_limit
+        if cache_directory is not None:
+            self._cache = CompressionCache(cache_directory)
         # create progress bar
         progress = ProgressBar(
             router_tables.routing_tables,
@@ -61,6 +116,22 @@ class AbstractCompressor(object):
                 self.__class__.__name__))
         return self.compress_tables(router_tables, progress)
 
+    def configure(self, target_length=None, deadline=None):
+        """ Set up this compressor to have :py:meth:`compress_table` called \
+            directly, as when it is used by another compressor
+
+        :param target_length:
+            The length below which to stop compressing, or None to compress
+            as much as possible
+        :type target_length: int or None
+        :param deadline:
+            time.time() by which each table must be done, or None for never
+        :type deadline: float or None
+        """
+        self._target_length = 0 if target_length is None else target_length
+        self._table_deadline = deadline
+        self._timed_out = False
+
     @staticmethod
     def intersect(key_a, mask_a, key_b, mask_b):
         """
@@ -125,6 +196,16 @@ class AbstractCompressor(object):
 
         Tables who start of smaller than target_length are not compressed
 
+        Compression is "anytime": the compression of a table stops once it
+        is no longer than target_length, or when the time allowed for it or
+        for all the tables has run out, and the best valid table found by then
+        is used. Tables not started before the time for all the tables ran out
+        are left uncompressed.
+
+        If there is a :py:attr:`cache`, tables that have been compressed the
+        same way before are taken from it, and the tables compressed in full
+        without problems are added to it.
+
         :param MulticastRoutingTables router_tables: Routing tables
         :param ~spinn_utilities.progress_bar.ProgressBar progress:
             Progress bar to show while working
@@ -134,23 +215,42 @@ class AbstractCompressor(object):
         """
         compressed_tables = MulticastRoutingTables()
         self._problems = ""
-        for table in progress.over(router_tables.routing_tables):
-            if table.number_of_entries < self._target_length:
+        timed_out = ""
+        self._cache_hits = 0
+        if self._time_limit is None:
+            self._deadline = None
+        else:
+            self._deadline = time.time() + self._time_limit
+        if self._n_workers is None or self._n_workers == 1:
+            results = self._compress_serially(router_tables, progress)
+        else:
+            results = self._compress_in_parallel(router_tables, progress)
+        for table, compressed_table, table_timed_out in results:
+            if compressed_table is None:
                 new_table = table
             else:
-                compressed_table = self.compress_table(table)
-
                 new_table = CompressedMulticastRoutingTable(table.x, table.y)
 
                 for entry in compressed_table:
                     new_table.add_multicast_routing_entry(
                         entry.to_MulticastRoutingEntry())
-                if new_table.number_of_entries > self.MAX_SUPPORTED_LENGTH:
-                    self._problems += "(x:{},y:{})={} ".format(
-                        new_table.x, new_table.y, new_table.number_of_entries)
+            if new_table.number_of_entries > self.MAX_SUPPORTED_LENGTH:
+                self._problems += "(x:{},y:{})={} ".format(
+                    new_table.x, new_table.y, new_table.number_of_entries)
+            if table_timed_out:
+                timed_out += "(x:{},y:{}) ".format(table.x, table.y)
 
             compressed_tables.add_routing_table(new_table)
 
+        if self._cache is not None:
+            logger.info(
+                "{} of {} routing tables found in the compression cache",
+                self._cache_hits, len(compressed_tables.routing_tables))
+        if len(timed_out) > 0:
+            logger.warning(
+                "Ran out of time compressing the routing tables of {}",
+                timed_out)
+
         if len(self._problems) > 0:
             if self._ordered:
                 raise MinimisationFailedError(
@@ -160,6 +260,297 @@ class AbstractCompressor(object):
                 logger.warning(self._problems)
         return compressed_tables
 
+    def _compress_serially(self, router_tables, progress):
+        """ Compress the tables one after another in this process
+
+        :param MulticastRoutingTables router_tables: Routing tables
+        :param ~spinn_utilities.progress_bar.ProgressBar progress:
+        :return: Each original table with its compressed entries, or None
+            if the table was not compressed, and whether it ran out of time
+        :rtype: iterable(tuple(MulticastRoutingTable, list(Entry) or None,
+            bool))
+        """
+        for table in progress.over(router_tables.routing_tables):
+            if table.number_of_entries < self._target_length:
+                yield table, None, False
+                continue
+            cache_key, compressed = self._from_cache(table)
+            if compressed is not None:
+                yield table, compressed, False
+                continue
+            n_problems = len(self._problems)
+            compressed = self._compress_table_in_time(table)
+            if not self._timed_out and n_problems == len(self._problems):
+                self._to_cache(cache_key, compressed, self._table_report())
+            yield table, compressed, self._timed_out
+
+    def _compress_in_parallel(self, router_tables, progress):
+        """ Compress the tables in a pool of worker processes
+
+        Tables are sent to the workers as plain tuples and the results are
+        returned in the same order as the tables were read, so the output
+        does not depend on which worker finishes first.
+
+        :param MulticastRoutingTables router_tables: Routing tables
+        :param ~spinn_utilities.progress_bar.ProgressBar progress:
+        :return: Each original table with its compressed entries, or None
+            if the table was not compressed, and whether it ran out of time
+        :rtype: iterable(tuple(MulticastRoutingTable, list(Entry) or None,
+            bool))
+        """
+        tables = list(router_tables.routing_tables)
+        cached = [
+            self._from_cache(table)
+            if table.number_of_entries >= self._target_length else (None, None)
+            for table in tables]
+        to_compress = [
+            table for table, (_, compressed) in zip(tables, cached)
+            if table.number_of_entries >= self._target_length and
+            compressed is None]
+        n_workers = self._n_workers or multiprocessing.cpu_count()
+        chunk_size = len(to_compress) // (n_workers * 4) + 1
+        pool = multiprocessing.Pool(
+            n_workers, initializer=_init_worker,
+            initargs=(self, self.MAX_SUPPORTED_LENGTH))
+        try:
+            compressed = pool.imap(
+                _compress_in_worker,
+                (_pack_table(table) for table in to_compress), chunk_size)
+            for table, (cache_key, cached_entries) in zip(tables, cached):
+                if table.number_of_entries < self._target_length:
+                    yield table, None, False
+                elif cached_entries is not None:
+                    yield table, cached_entries, False
+                else:
+                    packed_entries, problems, timed_out, report = next(
+                        compressed)
+                    self._problems += problems
+                    self._add_table_report(table, report)
+                    if packed_entries is None:
+                        yield table, None, timed_out
+                    else:
+                        entries = [Entry(*packed) for packed in packed_entries]
+                        if not timed_out and not problems:
+                            self._to_cache(cache_key, entries, report)
+                        yield table, entries, timed_out
+                progress.update()
+        finally:
+            pool.close()
+            pool.join()
+        progress.end()
+
+    def _from_cache(self, router_table):
+        """ Look for a table in the cache
+
+        :param MulticastRoutingTable router_table:
+        :return: The key of the table in the cache and the compressed entries
+            if found; each is None if there is no cache
+        :rtype: tuple(str or None, list(Entry) or None)
+        """
+        if self._cache is None:
+            return None, None
+        cache_key = self._cache.key(
+            self.__class__.__name__, self._target_length, router_table)
+        found = self._cache.get(cache_key)
+        if found is None:
+            return cache_key, None
+        packed_entries, report = found
+        self._cache_hits += 1
+        self._add_table_report(router_table, report)
+        return cache_key, [Entry(*packed) for packed in packed_entries]
+
+    def _to_cache(self, cache_key, entries, report):
+        """ Add a newly compressed table to the cache, if there is one
+
+        :param cache_key: The key from :py:meth:`_from_cache`
+        :type cache_key: str or None
+        :param entries: The compressed entries
+        :type entries: list(Entry) or None
+        :param report: The :py:meth:`_table_report` for the table
+        """
+        if cache_key is not None and entries is not None:
+            self._cache.put(cache_key, entries, report)
+
+    def _table_report(self):
+        """ Get anything about the table just compressed that a worker \
+            process must pass back to the calling compressor
+
+        :return: Something that can be pickled and written as JSON, or None
+            if nothing
+        """
+        return None
+
+    def _add_table_report(self, router_table, report):
+        """ Record what :py:meth:`_table_report` returned for a table \
+            compressed in a worker process or found in the cache
+
+        :param MulticastRoutingTable router_table: The original table
+        :param report: The report of the worker
+        """
+
+    def _compress_table_in_time(self, router_table):
+        """ Compress a table within the time allowed for it
+
+        :param UnCompressedMulticastRoutingTable router_table:
+        :return: The compressed entries, or None if there was no time left
+        :rtype: list(Entry) or None
+        """
+        self._timed_out = False
+        self._table_deadline = self._deadline
+        if self._table_time_limit is not None:
+            table_deadline = time.time() + self._table_time_limit
+            if self._deadline is None or table_deadline < self._deadline:
+                self._table_deadline = table_deadline
+        if self._out_of_time():
+            return None
+        return self.compress_table(router_table)
+
+    def _out_of_time(self):
+        """ Determine if the time to compress the current table has run \
+            out, in which case compress_table should stop and return the \
+            best table it has found so far
+
+        :rtype: bool
+        """
+        if self._table_deadline is not None and (
+                time.time() >= self._table_deadline):
+            self._timed_out = True
+        return self._timed_out
+
+    def _time_left(self):
+        """ The seconds left to compress the current table
+
+        :return: The time left, or None if there is no limit
+        :rtype: float or None
+        """
+        if self._table_deadline is None:
+            return None
+        return max(0.0, self._table_deadline - time.time())
+
+    def _stop_early(self, n_entries):
+        """ Determine if compress_table should stop and return the current \
+            table, as it is already short enough or the time has run out
+
+        :param int n_entries: The length of the current table
+        :rtype: bool
+        """
+        return n_entries <= self._target_length or self._out_of_time()
+
     @property
     def ordered(self):
         return self._ordered
+
+    @property
+    def n_workers(self):
+        """ The number of worker processes used to compress the tables, \
+            or None if they are compressed serially
+
+        :rtype: int or None
+        """
+        return self._n_workers
+
+    @n_workers.setter
+    def n_workers(self, n_workers):
+        if n_workers is not None and n_workers < 0:
+            raise PacmanInvalidParameterException(
+                "n_workers", n_workers, "must not be negative")
+        self._n_workers = n_workers
+
+    @property
+    def cache(self):
+        """ The cache of previously compressed tables, or None to always \
+            compress the tables
+
+        :rtype: CompressionCache or None
+        """
+        return self._cache
+
+    @cache.setter
+    def cache(self, cache):
+        self._cache = cache
+
+    @property
+    def time_limit(self):
+        """ The seconds allowed to compress all the tables, \
+            or None if there is no limit
+
+        :rtype: float or None
+        """
+        return self._time_limit
+
+    @time_limit.setter
+    def time_limit(self, time_limit):
+        if time_limit is not None and time_limit < 0:
+            raise PacmanInvalidParameterException(
+                "time_limit", time_limit, "must not be negative")
+        self._time_limit = time_limit
+
+    @property
+    def table_time_limit(self):
+        """ The seconds allowed to compress any one table, \
+            or None if there is no limit
+
+        :rtype: float or None
+        """
+        return self._table_time_limit
+
+    @table_time_limit.setter
+    def table_time_limit(self, table_time_limit):
+        if table_time_limit is not None and table_time_limit < 0:
+            raise PacmanInvalidParameterException(
+                "table_time_limit", table_time_limit, "must not be negative")
+        self._table_time_limit = table_time_limit
+
+
+# The compressor used by the current worker process
+_worker_compressor = None
+
+
+def _init_worker(compressor, max_supported_length):
+    """ Set up a worker process to compress tables
+
+    :param AbstractCompressor compressor: A copy of the calling compressor
+    :param int max_supported_length:
+        The calling process's table length limit, which may have been changed
+        from the class default
+    """
+    global _worker_compressor
+    type(compressor).MAX_SUPPORTED_LENGTH = max_supported_length
+    _worker_compressor = compressor
+
+
+def _pack_table(table):
+    """ Convert a table into plain tuples that are cheap to pickle
+
+    :param MulticastRoutingTable table:
+    :rtype: tuple(int, int, list(tuple(int, int, bool, int)))
+    """
+    return table.x, table.y, [
+        (entry.routing_entry_key, entry.mask, entry.defaultable,
+         entry.spinnaker_route)
+        for entry in table.multicast_routing_entries]
+
+
+def _compress_in_worker(packed_table):
+    """ Compress a single packed table in a worker process
+
+    :param tuple(int, int, list(tuple(int, int, bool, int))) packed_table:
+    :return: The packed compressed entries (or None if there was no time
+        to compress the table), any problems reported, whether the table
+        ran out of time and the compressor's report on the table
+    :rtype: tuple(list(tuple(int, int, bool, int)) or None, str, bool, object)
+    """
+    x, y, packed_entries = packed_table
+    table = UnCompressedMulticastRoutingTable(x, y, [
+        MulticastRoutingEntry(
+            key, mask, defaultable=defaultable, spinnaker_route=route)
+        for key, mask, defaultable, route in packed_entries])
+    _worker_compressor._problems = ""
+    compressed = _worker_compressor._compress_table_in_time(table)
+    if compressed is None:
+        return None, "", True, None
+    return [
+        (entry.key, entry.mask, entry.defaultable, entry.spinnaker_route)
+        for entry in compressed
+    ], _worker_compressor._problems, _worker_compressor._timed_out, \
+        _worker_compressor._table_report()
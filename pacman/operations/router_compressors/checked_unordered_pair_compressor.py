@@ -15,6 +15,7 @@
 
 from spinn_utilities.progress_bar import ProgressBar
 from pacman.exceptions import PacmanElementAllocationException
+from .compression_cache import CompressionCache
 from .unordered_pair_compressor import UnorderedPairCompressor
 
 
@@ -33,10 +34,28 @@ class CheckedUnorderedPairCompressor(UnorderedPairCompressor):
 
     __slots__ = []
 
-    def __call__(self, router_tables, target_length=None):
+    def __call__(self, router_tables, target_length=None, n_workers=None,
+                 time_limit=None, table_time_limit=None,
+                 cache_directory=None):
         """
         :param MulticastRoutingTables router_tables:
         :param int target_length:
+        :param n_workers:
+            The number of worker processes to compress the tables with.
+            None or 1 to compress serially in this process;
+            0 to use one worker per available CPU.
+        :type n_workers: int or None
+        :param time_limit:
+            Seconds allowed to compress all the tables, or None for no limit
+        :type time_limit: float or None
+        :param table_time_limit:
+            Seconds allowed to compress any one table, or None for no limit
+        :type table_time_limit: float or None
+        :param cache_directory:
+            The directory of a :py:class:`CompressionCache` to get tables
+            compressed before from and to keep the newly compressed tables in,
+            or None to use :py:attr:`cache`
+        :type cache_directory: str or None
         :rtype: MulticastRoutingTables
         :raises PacmanElementAllocationException:
             if the compressed table won't fit
@@ -46,6 +65,11 @@ class CheckedUnorderedPairCompressor(UnorderedPairCompressor):
             self._target_length = 0
         else:
             self._target_length = target_length
+        self.n_workers = n_workers
+        self.time_limit = time_limit
+        self.table_time_limit = table_time_limit
+        if cache_directory is not None:
+            self.cache = CompressionCache(cache_directory)
         # create progress bar
         progress = ProgressBar(
             router_tables.routing_tables, "Compressing routing Tables")
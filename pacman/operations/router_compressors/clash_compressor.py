@@ -24,6 +24,7 @@ class ClashCompressor(AbstractCompressor):
 
     __slots__ = [
         "_all_entries",
+        "_clashes",
         "_max_clashes"
     ]
 
@@ -50,9 +51,18 @@ class ClashCompressor(AbstractCompressor):
                     m_key, m_mask, defaultable, an_entry.spinnaker_route)
             if len(clashers) <= self._max_clashes:
                 for entry in clashers:
-                    entry.clashes += 1
+                    self._clashes[self._clash_key(entry)] += 1
         return None
 
+    @staticmethod
+    def _clash_key(entry):
+        """ The key under which the clashes of an entry are counted
+
+        :param ~.Entry entry:
+        :rtype: tuple(int, int, int)
+        """
+        return entry.key, entry.mask, entry.spinnaker_route
+
     def compress_by_route(self, route_entries):
         """
         :param list(~.Entry) route_entres:
@@ -81,6 +91,7 @@ class ClashCompressor(AbstractCompressor):
         """
         while True:
             self._all_entries = defaultdict(list)
+            self._clashes = defaultdict(int)
             for mcr_entry in router_table.multicast_routing_entries:
                 entry = Entry.from_MulticastRoutingEntry(mcr_entry)
                 if entry not in top_entries:
@@ -113,9 +124,13 @@ class ClashCompressor(AbstractCompressor):
                 print("Good Results ", len(answer))
                 return answer
 
+            if self._out_of_time():
+                # Every round gives a valid table so use this one
+                return top_entries + results
+
             clashers = []
             for entry in results:
-                if entry.clashes > 0:
+                if self._clashes[self._clash_key(entry)] > 0:
                     clashers.append(entry)
             print(len(top_entries) + len(results), len(top_entries),
                   len(results), len(clashers))
@@ -127,7 +142,9 @@ class ClashCompressor(AbstractCompressor):
                     raise MinimisationFailedError("No clashers left")
                 return answer
 
-            clashers = sorted(clashers, key=lambda x: x.clashes, reverse=True)
+            clashers = sorted(
+                clashers, key=lambda x: self._clashes[self._clash_key(x)],
+                reverse=True)
             top_entries.extend(clashers[0:1])
 
     def compress_table(self, router_table):
@@ -145,5 +162,5 @@ class ClashCompressor(AbstractCompressor):
         except Exception as ex:  # pylint: disable=broad-except
             print(ex)
             self._problems += "(x:{},y:{})={} ".format(
-                router_table.x, router_table.y, len(results))
+                router_table.x, router_table.y, ex)
         return []
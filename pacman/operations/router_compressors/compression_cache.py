@@ -0,0 +1,189 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import errno
+import hashlib
+import json
+import os
+import tempfile
+import numpy
+
+
+class CompressionCache(object):
+    """ A directory of compressed routing tables, addressed by the content \
+        of the uncompressed table and how it was compressed.
+
+    Each compressed table is held in its own JSON file. When the files take
+    up more than the maximum size, the least recently used are deleted.
+    Several processes may share the same directory.
+    """
+
+    #: The default maximum size of the cache files in bytes
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    __slots__ = [
+        # The directory holding the files
+        "_directory",
+        # The size in bytes above which files are deleted
+        "_max_bytes",
+        # The size in bytes of the files, as far as is known
+        "_n_bytes"]
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param str directory:
+            The directory to keep the files in, which is made if needed
+        :param int max_bytes: The size in bytes above which files are deleted
+        """
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            # Made already, possibly by another process
+            if e.errno != errno.EEXIST or not os.path.isdir(directory):
+                raise
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._n_bytes = sum(size for _, _, size in self._files())
+
+    @property
+    def directory(self):
+        """ The directory holding the files
+
+        :rtype: str
+        """
+        return self._directory
+
+    @staticmethod
+    def key(compressor_name, target_length, router_table):
+        """ Get the key of a table and how it is to be compressed.
+
+        The entries are sorted first, so the order of the entries in the
+        table and the chip it is for do not change the key.
+
+        :param str compressor_name:
+        :param int target_length:
+        :param MulticastRoutingTable router_table:
+        :rtype: str
+        """
+        rows = sorted(
+            (entry.routing_entry_key, entry.mask, entry.spinnaker_route,
+             entry.defaultable)
+            for entry in router_table.multicast_routing_entries)
+        digest = hashlib.sha256("{}:{}:".format(
+            compressor_name, target_length).encode())
+        digest.update(numpy.array(rows, dtype=numpy.uint32).tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self._directory, key + ".json")
+
+    def get(self, key):
+        """ Get a compressed table, if it is in the cache
+
+        :param str key: The key from :py:meth:`key`
+        :return: The (key, mask, defaultable, route) of each compressed entry
+            and the report stored with them, or None if not in the cache
+        :rtype: tuple(list(tuple(int, int, bool, int)), object) or None
+        """
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            # Mark as recently used
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return [
+            (entry_key, mask, bool(defaultable), route)
+            for entry_key, mask, defaultable, route in data["entries"]
+        ], data["report"]
+
+    def put(self, key, entries, report=None):
+        """ Add a compressed table to the cache
+
+        :param str key: The key from :py:meth:`key`
+        :param list(Entry) entries: The compressed entries
+        :param report: Anything else to keep about the table, which must be
+            possible to write as JSON
+        """
+        data = {
+            "entries": [
+                [entry.key, entry.mask, int(entry.defaultable),
+                 entry.spinnaker_route] for entry in entries],
+            "report": report}
+        # Write then rename so no-one reads a partly written file
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self._directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        path = self._path(key)
+        self._n_bytes += os.path.getsize(tmp_path)
+        try:
+            # Replacing a table, so stop counting the old one
+            self._n_bytes -= os.path.getsize(path)
+        except OSError:
+            pass
+        self._rename(tmp_path, path)
+        if self._n_bytes > self._max_bytes:
+            self._evict()
+
+    @staticmethod
+    def _rename(src, dst):
+        """ Rename a file, replacing any file already at the new name
+        """
+        try:
+            os.rename(src, dst)
+        except OSError:
+            # Windows will not rename over an existing file
+            if not os.path.exists(dst):
+                raise
+            try:
+                os.remove(dst)
+            except OSError:
+                # Deleted by another process
+                pass
+            os.rename(src, dst)
+
+    def _files(self):
+        """ The cache files
+
+        :rtype: iterable(tuple(str, float, int))
+        :return: The path, last use time and size of each file
+        """
+        for name in os.listdir(self._directory):
+            if name.endswith(".json"):
+                path = os.path.join(self._directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Deleted by another process
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _evict(self):
+        """ Delete the least recently used files until the cache is small \
+            enough
+        """
+        files = sorted(self._files(), key=lambda file: file[1])
+        self._n_bytes = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if self._n_bytes <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Deleted by another process
+                pass
+            self._n_bytes -= size
@@ -0,0 +1,232 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy
+from .entry import Entry
+
+
+class EntryTable(object):
+    """ The entries of a single routing table held as columns of NumPy \
+        arrays, one row per entry.
+
+    This takes a fraction of the memory of a list of :py:class:`Entry` and
+    allows the bitwise tests of many entries to be done in one call.
+    """
+
+    #: The most cells of the pairs by rows matrix that
+    #: :py:meth:`intersects_any` makes at once
+    MAX_INTERSECT_CELLS = 1 << 20
+
+    __slots__ = [
+        # The routing keys as uint32
+        "keys",
+        # The masks as uint32
+        "masks",
+        # The spinnaker_routes (link and processor bitfield) as uint32
+        "routes",
+        # If each entry could be replaced by default routing, as bool
+        "defaultables"]
+
+    def __init__(self, keys, masks, routes, defaultables):
+        """
+        :param iterable(int) keys:
+        :param iterable(int) masks:
+        :param iterable(int) routes:
+        :param iterable(bool) defaultables:
+        """
+        self.keys = numpy.array(keys, dtype=numpy.uint32)
+        self.masks = numpy.array(masks, dtype=numpy.uint32)
+        self.routes = numpy.array(routes, dtype=numpy.uint32)
+        self.defaultables = numpy.array(defaultables, dtype=bool)
+
+    @staticmethod
+    def from_routing_table(router_table):
+        """
+        :param AbstractMulticastRoutingTable router_table:
+        :rtype: EntryTable
+        """
+        entries = router_table.multicast_routing_entries
+        # Yes I know using _params is ugly but this is for speed
+        return EntryTable(
+            [mre._routing_entry_key for mre in entries],
+            [mre._mask for mre in entries],
+            [mre._spinnaker_route for mre in entries],
+            [mre._defaultable for mre in entries])
+
+    @staticmethod
+    def from_entries(entries):
+        """
+        :param list(Entry) entries:
+        :rtype: EntryTable
+        """
+        return EntryTable(
+            [entry.key for entry in entries],
+            [entry.mask for entry in entries],
+            [entry.spinnaker_route for entry in entries],
+            [entry.defaultable for entry in entries])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def entry(self, index):
+        """ Get a single row as an Entry
+
+        :param int index:
+        :rtype: Entry
+        """
+        return Entry(
+            int(self.keys[index]), int(self.masks[index]),
+            bool(self.defaultables[index]), int(self.routes[index]))
+
+    def to_entries(self, stop=None):
+        """ Get the rows as Entries
+
+        :param stop: Exclusive index of the last row to include or None for
+            all the rows
+        :type stop: int or None
+        :rtype: list(Entry)
+        """
+        return [
+            Entry(key, mask, defaultable, route)
+            for key, mask, defaultable, route in zip(
+                self.keys[:stop].tolist(), self.masks[:stop].tolist(),
+                self.defaultables[:stop].tolist(),
+                self.routes[:stop].tolist())]
+
+    def set_entry(self, index, key, mask, defaultable, route):
+        """ Overwrite a single row
+
+        :param int index:
+        :param int key:
+        :param int mask:
+        :param bool defaultable:
+        :param int route:
+        """
+        self.keys[index] = key
+        self.masks[index] = mask
+        self.defaultables[index] = defaultable
+        self.routes[index] = route
+
+    def copy_entry(self, to_index, from_index):
+        """ Overwrite a row with another row
+
+        :param int to_index:
+        :param int from_index:
+        """
+        self.keys[to_index] = self.keys[from_index]
+        self.masks[to_index] = self.masks[from_index]
+        self.defaultables[to_index] = self.defaultables[from_index]
+        self.routes[to_index] = self.routes[from_index]
+
+    def swap(self, index_a, index_b):
+        """ Exchange two rows
+
+        :param int index_a:
+        :param int index_b:
+        """
+        for column in (self.keys, self.masks, self.defaultables, self.routes):
+            column[[index_a, index_b]] = column[[index_b, index_a]]
+
+    def reorder(self, order):
+        """ Put the rows in a new order
+
+        :param ~numpy.ndarray order: The index of the row to put at each
+            position, as from :py:func:`numpy.argsort`
+        """
+        self.keys = self.keys[order]
+        self.masks = self.masks[order]
+        self.routes = self.routes[order]
+        self.defaultables = self.defaultables[order]
+
+    def intersects(self, key, mask, start=0, stop=None):
+        """ Which rows would match some of the same keys as a key-mask pair.
+
+        :param int key:
+        :param int mask:
+        :param int start: Inclusive index of the first row to check
+        :param stop: Exclusive index of the last row to check or None for all
+        :type stop: int or None
+        :return: A bool per row from start to stop
+        :rtype: ~numpy.ndarray
+        """
+        return (self.keys[start:stop] & numpy.uint32(mask)) == (
+            numpy.uint32(key) & self.masks[start:stop])
+
+    def intersects_any(self, keys, masks, start=0, stop=None):
+        """ Which of several key-mask pairs would match some of the same keys
+            as any of the rows.
+
+        :param ~numpy.ndarray keys: uint32 keys of the pairs to check
+        :param ~numpy.ndarray masks: uint32 masks of the pairs to check
+        :param int start: Inclusive index of the first row to check against
+        :param stop: Exclusive index of the last row to check against or None
+            for all
+        :type stop: int or None
+        :return: A bool per key-mask pair
+        :rtype: ~numpy.ndarray
+        """
+        start, stop, _ = slice(start, stop).indices(len(self.keys))
+        keys = keys[:, None]
+        masks = masks[:, None]
+        # The rows are checked in chunks so the matrix stays small however
+        # long the table is
+        chunk = max(1, self.MAX_INTERSECT_CELLS // max(1, len(keys)))
+        result = numpy.zeros(len(keys), dtype=bool)
+        for chunk_start in range(start, stop, chunk):
+            chunk_stop = min(chunk_start + chunk, stop)
+            result |= ((self.keys[chunk_start:chunk_stop] & masks) == (
+                keys & self.masks[chunk_start:chunk_stop])).any(axis=1)
+        return result
+
+    def covers(self, key, mask, start=0, stop=None):
+        """ Which rows would only match keys that a key-mask pair also \
+            matches.
+
+        :param int key:
+        :param int mask:
+        :param int start: Inclusive index of the first row to check
+        :param stop: Exclusive index of the last row to check or None for all
+        :type stop: int or None
+        :return: A bool per row from start to stop
+        :rtype: ~numpy.ndarray
+        """
+        mask = numpy.uint32(mask)
+        return (((self.masks[start:stop] & mask) == mask) &
+                ((self.keys[start:stop] & mask) == numpy.uint32(key)))
+
+    def merge(self, index, others):
+        """ Merge a row with each of several other rows
+
+        As with :py:meth:`AbstractCompressor.merge` the assumption is that
+        the rows have the same route.
+
+        :param int index: The row to merge with each of the others
+        :param ~numpy.ndarray others: The indices of the other rows
+        :return: The key, mask and defaultable of each merged entry
+        :rtype: tuple(~numpy.ndarray, ~numpy.ndarray, ~numpy.ndarray)
+        """
+        key = self.keys[index]
+        other_keys = self.keys[others]
+        any_ones = key | other_keys
+        all_ones = key & other_keys
+        all_selected = self.masks[index] & self.masks[others]
+
+        # Compute the new mask and key
+        any_zeros = ~all_ones
+        new_xs = any_ones ^ any_zeros
+        masks = all_selected & new_xs  # Combine existing and new Xs
+        keys = all_ones & masks
+        defaultables = self.defaultables[index] & self.defaultables[others]
+        return keys, masks, defaultables
@@ -0,0 +1,163 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import Counter, OrderedDict
+import logging
+from spinn_utilities.log import FormatAdapter
+from .abstract_compressor import AbstractCompressor
+from .entry import Entry
+from .ordered_covering_router_compressor import (
+    ordered_covering, remove_default_routes)
+from .unordered_pair_compressor import UnorderedPairCompressor
+
+logger = FormatAdapter(logging.getLogger(__name__))
+
+
+class HybridCompressor(AbstractCompressor):
+    """ Compressor that uses the cheapest way of making each table fit.
+
+    Each table goes through the tiers below in turn, stopping as soon as the
+    table is no longer than the target length (or the router size if no
+    target length is given):
+
+    #. no compression, if the table already fits
+    #. removing the entries that default routing can replace
+    #. the :py:class:`UnorderedPairCompressor` followed by removing the \
+        entries that default routing can replace
+    #. ordered covering, as done by the \
+        :py:class:`OrderedCoveringCompressor`, followed by removing the \
+        entries that default routing can replace
+
+    The tier each chip needed is available from :py:attr:`tiers` after the
+    tables have been compressed.
+    """
+
+    #: Tier of a table which already fits
+    NO_COMPRESSION = "none"
+
+    #: Tier of a table which fits once default routes are removed
+    REMOVE_DEFAULT_ROUTES = "remove_default_routes"
+
+    #: Tier of a table which fits once pair compressed
+    PAIR = "pair"
+
+    #: Tier of a table which needed ordered covering
+    ORDERED_COVERING = "ordered_covering"
+
+    __slots__ = [
+        # The compressor used for the pair tier
+        "_pair",
+        # The tier used for each chip, by (x, y)
+        "_tiers",
+        # The tier used for the table just compressed
+        "_tier"]
+
+    def __init__(self):
+        super(HybridCompressor, self).__init__(True)
+        self._pair = UnorderedPairCompressor()
+        self._tiers = OrderedDict()
+        self._tier = None
+
+    @property
+    def tiers(self):
+        """ The tier each table needed, by the (x, y) of its chip
+
+        Tables that were not started because the time ran out are not
+        included.
+
+        :rtype: dict(tuple(int, int), str)
+        """
+        return self._tiers
+
+    def compress_tables(self, router_tables, progress):
+        self._tiers = OrderedDict()
+        try:
+            return super(HybridCompressor, self).compress_tables(
+                router_tables, progress)
+        finally:
+            # Put the tiers in table order, including the tables too short
+            # to be passed to compress_table
+            tiers = OrderedDict()
+            for table in router_tables.routing_tables:
+                chip = (table.x, table.y)
+                if chip in self._tiers:
+                    tiers[chip] = self._tiers[chip]
+                elif table.number_of_entries < self._target_length:
+                    tiers[chip] = self.NO_COMPRESSION
+            self._tiers = tiers
+            counts = Counter(tiers.values())
+            logger.info("Compression tiers used: {}", ", ".join(
+                "{}: {}".format(tier, counts[tier]) for tier in (
+                    self.NO_COMPRESSION, self.REMOVE_DEFAULT_ROUTES,
+                    self.PAIR, self.ORDERED_COVERING)))
+
+    def compress_table(self, router_table):
+        """
+        :param UnCompressedMulticastRoutingTable router_table:
+        :rtype: list(Entry)
+        """
+        target_length = self._target_length or self.MAX_SUPPORTED_LENGTH
+        original = [
+            Entry.from_MulticastRoutingEntry(router_entry)
+            for router_entry in router_table.multicast_routing_entries]
+        if len(original) <= target_length:
+            return self._use_tier(router_table, self.NO_COMPRESSION, original)
+
+        compressed = remove_default_routes(original, None)
+        if len(compressed) <= target_length:
+            return self._use_tier(
+                router_table, self.REMOVE_DEFAULT_ROUTES, compressed)
+
+        # The pair compressor shares this compressor's time budget
+        self._pair.configure(target_length, self._table_deadline)
+        paired = remove_default_routes(
+            self._pair.compress_table(router_table), None)
+        if len(paired) <= target_length or self._out_of_time():
+            return self._use_tier(router_table, self.PAIR, paired)
+
+        # Pair merges that overlap can keep ordered covering from doing
+        # better, so it starts again from the original entries
+        time_left = self._time_left()
+        compressed, _ = ordered_covering(
+            original, target_length, no_raise=True,
+            use_timer_cut_off=time_left is not None,
+            time_to_run_for=time_left)
+        compressed = remove_default_routes(compressed, None)
+        # Record if the merging was cut short
+        self._out_of_time()
+        if len(paired) <= len(compressed):
+            # Ordered covering did no better, probably out of time
+            return self._use_tier(router_table, self.PAIR, paired)
+        return self._use_tier(
+            router_table, self.ORDERED_COVERING, compressed)
+
+    def _use_tier(self, router_table, tier, entries):
+        """ Record the tier that a table needed
+
+        :param UnCompressedMulticastRoutingTable router_table:
+        :param str tier:
+        :param list(Entry) entries: The entries from the tier
+        :return: The entries
+        :rtype: list(Entry)
+        """
+        self._tier = tier
+        self._tiers[router_table.x, router_table.y] = tier
+        return entries
+
+    def _table_report(self):
+        return self._tier
+
+    def _add_table_report(self, router_table, report):
+        self._tiers[router_table.x, router_table.y] = report
@@ -13,6 +13,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import logging
+from spinn_utilities.log import FormatAdapter
 from pacman.operations.router_compressors import Entry
 from pacman.exceptions import MinimisationFailedError
 from .remove_default_routes import remove_default_routes
@@ -20,10 +22,12 @@ from pacman.utilities.constants import FULL_MASK
 from .utils import intersect
 from spinn_utilities.timer import Timer
 
+logger = FormatAdapter(logging.getLogger(__name__))
+
 
 def minimise(
         routing_table, target_length, use_timer_cut_off=False,
-        time_to_run_for_before_raising_exception=None):
+        time_to_run_for=None, time_to_run_for_before_raising_exception=None):
     """Reduce the size of a routing table by merging together entries where \
     possible and by removing any remaining default routes.
 
@@ -49,19 +53,32 @@ def minimise(
         possible. If ``None`` then the table will be made as small as possible.
     :type target_length: int or None
     :param bool use_timer_cut_off: flag for timing cutoff to be used.
+    :param time_to_run_for:
+        The time to run for in seconds before stopping with the table merged
+        so far
+    :type time_to_run_for: float or None
     :param time_to_run_for_before_raising_exception:
-        The time to run for in seconds before raising an exception
-    :type time_to_run_for_before_raising_exception: int or None
+        DEPRECATED use ``time_to_run_for``; used as ``time_to_run_for`` if
+        that is not given. Note that running out of time no longer raises an
+        exception, but stops with the table merged so far
+    :type time_to_run_for_before_raising_exception: float or None
     :return: The compressed table entries
     :rtype: list(Entry)
     :raises MinimisationFailedError:
         If the smallest table that can be produced is larger than
         ``target_length``.
     """
+    if time_to_run_for_before_raising_exception is not None:
+        logger.warning(
+            "time_to_run_for_before_raising_exception is deprecated and no "
+            "longer raises when the time runs out. "
+            "Please use time_to_run_for instead")
+        if time_to_run_for is None:
+            time_to_run_for = time_to_run_for_before_raising_exception
     table, _ = ordered_covering(
         routing_table=routing_table, target_length=target_length,
         no_raise=True, use_timer_cut_off=use_timer_cut_off,
-        time_to_run_for=time_to_run_for_before_raising_exception)
+        time_to_run_for=time_to_run_for)
     return remove_default_routes(table, target_length)
 
 
@@ -105,6 +122,11 @@ def ordered_covering(
         be minimised to be smaller than `target_length` and `target_length` is
         not None. If True then a table will be returned regardless of the size
         of the final table.
+    :param bool use_timer_cut_off: flag for timing cutoff to be used.
+    :param time_to_run_for:
+        The time to run for in seconds before stopping with the table merged
+        so far, which is always a valid table
+    :type time_to_run_for: float or None
     :return: new routing table, A new aliases dictionary.
     :rtype: tuple(list(Entry), dict(tuple(int,int), set(tuple(int,int))))
     :raises MinimisationFailedError:
@@ -123,10 +145,11 @@ def ordered_covering(
         routing_table,
         key=lambda entry: get_generality(entry.key, entry.mask)
     )
+    merges = _MergeCache()
 
     while target_length is None or len(routing_table) > target_length:
         # Get the best merge
-        merge = _get_best_merge(routing_table, aliases)
+        merge = merges.get_best_merge(routing_table, aliases)
 
         # If there is no merge then stop
         if merge.goodness <= 0:
@@ -135,13 +158,13 @@ def ordered_covering(
         # Otherwise apply the merge, this returns a new routing table and a new
         # aliases dictionary.
         routing_table, aliases = merge.apply(aliases)
+        merges.invalidate(merge)
 
         # control for limiting the search
         if use_timer_cut_off:
             diff = timer.take_sample()
             if diff.total_seconds() >= time_to_run_for:
-                raise MinimisationFailedError(
-                    target_length, len(routing_table))
+                break
 
     # If the table is still too big then raise an error
     if (not no_raise and target_length is not None and
@@ -169,8 +192,8 @@ def get_generality(key, mask):
     :param int mask:
     :rtype: int
     """
-    xs = (~key) & (~mask)
-    return sum(1 for i in range(32) if xs & (1 << i))
+    xs = (~key) & (~mask) & FULL_MASK
+    return bin(xs).count("1")
 
 
 def _get_best_merge(routing_table, aliases):
@@ -216,6 +239,105 @@ def _get_best_merge(routing_table, aliases):
     return best_merge
 
 
+class _MergeCache(object):
+    """ Keeps what is known about the refined merge for each route between \
+        iterations of :py:func:`ordered_covering`, so that only the routes
+        affected by an applied merge need to be refined again.
+
+    Applying a merge removes some entries of a single route and inserts one
+    new entry which covers all of them and all of their aliases. Refining a
+    merge only ever looks at entries (and aliases) which intersect the
+    unrefined merge of all the entries of that route. So what is known about
+    any other route can only change if its unrefined merge intersects the new
+    entry.
+
+    This gives exactly the same merges as :py:func:`_get_best_merge`, which
+    refines every route on every iteration.
+    """
+
+    __slots__ = [
+        # Key and mask of the unrefined merge of all the entries of a route
+        # dict(int, tuple(int, int))
+        "_unrefined",
+        # For each route either the goodness of its refined merge and the ids
+        # of the entries in that merge, or an upper bound on the goodness and
+        # None if the refinement was abandoned early.
+        # dict(int, tuple(int, frozenset(int) or None))
+        "_refined"]
+
+    def __init__(self):
+        self._unrefined = dict()
+        self._refined = dict()
+
+    def get_best_merge(self, routing_table, aliases):
+        """ Get the merge which would combine the greatest number of entries.
+
+        As with :py:func:`_get_best_merge`, where several merges are equally
+        good the one for the route which appears first in the table is used.
+
+        :param list(Entry) routing_table: Routing entries to be merged.
+        :param aliases:
+            Dictionary of which keys and masks in the routing table are
+            combinations of other (now removed) keys and masks.
+        :type aliases: dict(tuple(int, int), set(tuple(int, int)))
+        :rtype: _Merge
+        """
+        # Group the entries by route, keeping the routes in the order they
+        # are first seen, as _get_all_merges does
+        index_of = dict()
+        groups = dict()
+        routes = list()
+        for i, entry in enumerate(routing_table):
+            index_of[id(entry)] = i
+            route = entry.spinnaker_route
+            if route in groups:
+                groups[route].append(i)
+            else:
+                groups[route] = [i]
+                routes.append(route)
+
+        best_ids = None
+        best_goodness = 0
+        for route in routes:
+            # The unrefined merge of all the entries is the best possible
+            goodness, ids = self._refined.get(
+                route, (len(groups[route]) - 1, None))
+            if goodness <= best_goodness:
+                continue
+            if ids is None:
+                merge = _Merge(routing_table, groups[route])
+                self._unrefined[route] = (merge.key, merge.mask)
+                merge = _refine_merge(merge, aliases, best_goodness)
+                if merge.goodness > best_goodness:
+                    goodness = merge.goodness
+                    ids = frozenset(
+                        id(routing_table[i]) for i in merge.entries)
+                else:
+                    # Refining gave up so only a bound is known
+                    goodness = best_goodness
+                self._refined[route] = (goodness, ids)
+            if ids is not None:
+                best_ids = ids
+                best_goodness = goodness
+
+        if best_ids is None:
+            return _Merge(routing_table)
+        return _Merge(routing_table, {index_of[i] for i in best_ids})
+
+    def invalidate(self, merge):
+        """ Forget what is known about the routes which may have been changed\
+            by applying a merge.
+
+        :param _Merge merge: The merge that has just been applied
+        """
+        route = merge.routing_table[next(iter(merge.entries))].spinnaker_route
+        for other in list(self._refined):
+            key, mask = self._unrefined[other]
+            if other == route or intersect(key, mask, merge.key, merge.mask):
+                del self._refined[other]
+                del self._unrefined[other]
+
+
 def _get_all_merges(routing_table):
     """ Get possible sets of entries to merge.
 
@@ -646,7 +768,7 @@ def _refine_downcheck(merge, aliases, min_goodness):
             # constraint than the previous constraint then ensure that we
             # record the new stringency and store which bits we need to set to
             # meet the constraint.
-            n_settable = sum(1 for bit in all_bits if bit & settable)
+            n_settable = bin(settable).count("1")
             if n_settable <= most_stringent:
                 if n_settable < most_stringent:
                     most_stringent = n_settable
@@ -44,8 +44,13 @@ class OrderedCoveringCompressor(AbstractCompressor):
             entries.append(Entry.from_MulticastRoutingEntry(router_entry))
 
         # compress the router entries
+        time_left = self._time_left()
         compressed_router_table_entries = minimise(
-            entries, self._target_length)
+            entries, self._target_length,
+            use_timer_cut_off=time_left is not None,
+            time_to_run_for=time_left)
+        # Record if the merging was cut short
+        self._out_of_time()
         return compressed_router_table_entries
 
 
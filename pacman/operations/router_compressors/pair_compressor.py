@@ -13,8 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import Counter
+import numpy
 from .abstract_compressor import AbstractCompressor
-from .entry import Entry
+from .entry_table import EntryTable
 
 
 class PairCompressor(AbstractCompressor):
@@ -90,18 +92,36 @@ class PairCompressor(AbstractCompressor):
 
     Step 1 requires the counting of the frequency of routes and the \
     sorting the routes based on this frequency.
-    The current tie break between routes with the same frequency is \
-    the route but this is arbitrary at the algorithm level.
-    This code does not use a dictionary to keep the code the same as \
-    the C.
+    The tie break between routes with the same frequency, and the order \
+    of the entries with the same route, are those of the three-way \
+    quicksorts of the C, as they change which merges are found.
+    Unlike the C, the routes are counted in a dictionary and the \
+    quicksorts compare integer ranks rather than searching for the routes.
 
     Step 2 is change in that the previous entries \
     (0 to _previous_pointer(-1)) are not considered for clash checking
+
+    Unlike the C, the entries are held in an :py:class:`EntryTable` so that \
+    the merges of an entry with a batch of others can be created and \
+    checked for clashes against all the other buckets in one NumPy call. \
+    The first merge of the batch without a clash is the one used, so the \
+    result is the same as checking the merges one at a time.
+
+    The compression of a table can stop between any two merges, once the \
+    table is short enough or the time allowed has run out. The entries \
+    not yet considered are then kept as they are, after the ones already \
+    done, which is still a valid table.
     """
 
+    #: The number of merges to check together the first time;
+    #: this doubles each time a batch has no usable merge
+    FIRST_BATCH_SIZE = 4
+
+    #: The largest number of merges to check together
+    MAX_BATCH_SIZE = 512
+
     __slots__ = [
-        # A list of all entries which may be sorted
-        #   of entries represented as (key, mask, defautible)
+        # An EntryTable of all entries which may be sorted
         "_all_entries",
         # The next index to write a merged/unmergable entry to
         "_write_index",
@@ -111,169 +131,46 @@ class PairCompressor(AbstractCompressor):
         "_previous_index",
         # Inclusive index to the first entry for later buckets
         "_remaining_index",
-        # C does not support dict so to get the histogram we use arrays
-        # In python a dict implementation is only marginally faster so not used
-        # to keep c and python code as similar as possible
-        # List of the routes to match with the frequencies
-        "_routes",
-        # List of the frequencies. Match index for index with routes
-        "_routes_frequency",
-        # Number of unique routes found so far
-        "_routes_count",
     ]
 
-    def _compare_routes(self, route_a, route_b):
-        """
-        Compares two routes for sorting based on the frequency of each route.
-
-        The assumption here is that self._routes has been sorted with the
-        highest frequency at the top of the tables.
-
-        So stop as soon as 1 of the routes is found.
-
-        For two different routes but with the same frequency order is based on
-        the (currently arbitrary) order they are in the self._routes table
-
-        :param int route_a:
-        :param int route_b:
-        :return: ordering value (-1, 0, 1)
-        :rtype: int
-        """
-        if route_a == route_b:
-            return 0
-        for i in range(self._routes_count):
-            if self._routes[i] == route_a:
-                return 1
-            if self._routes[i] == route_b:
-                return -1
-        raise Exception("Apply Gibbs slap!")
-
-    def _three_way_partition_table(self, low, high):
-        """
-        Partitions the entries between low and high into three parts
-
-        based on: https://en.wikipedia.org/wiki/Dutch_national_flag_problem
-
-        :param int low: Inclusive Lowest index to consider
-        :param int high: Inclusive Highest index to consider
-        :return: (last_index of lower, last_index_of_middle)
-        :rtype: tuple(int,int)
-        """
-        check = low + 1
-        pivot = self._all_entries[low].spinnaker_route
-        while check <= high:
-            compare = self._compare_routes(
-                self._all_entries[check].spinnaker_route, pivot)
-            if compare < 0:
-                temp = self._all_entries[low]
-                self._all_entries[low] = self._all_entries[check]
-                self._all_entries[check] = temp
-                low += 1
-                check += 1
-            elif compare > 0:
-                temp = self._all_entries[high]
-                self._all_entries[high] = self._all_entries[check]
-                self._all_entries[check] = temp
-                high -= 1
-            else:
-                check += 1
-        return low, check
-
-    def _quicksort_table(self, low, high):
-        """
-        Sorts the entries in place based on frequency of their route
-
-        :param int low: Inclusive lowest index to consider
-        :param int high: Inclusive highest index to consider
+    def _find_merge(self, left, right):
         """
-        if low < high:
-            left, right = self._three_way_partition_table(low, high)
-            self._quicksort_table(low, left - 1)
-            self._quicksort_table(right, high)
+        Attempt to find a merge between the left entry and any of the
+        following entries up to right
 
-    def _swap_routes(self, index_a, index_b):
-        """
-        Helper function to swap *both* the routes and routes frequency tables
-
-        :param int index_a:
-        :param int index_b:
-        """
-        temp = self._routes_frequency[index_a]
-        self._routes_frequency[index_a] = self._routes_frequency[index_b]
-        self._routes_frequency[index_b] = temp
-        temp = self._routes[index_a]
-        self._routes[index_a] = self._routes[index_b]
-        self._routes[index_b] = temp
-
-    def _three_way_partition_routes(self, low, high):
-        """ Partitions the routes and frequencies into three parts
-
-        based on: https://en.wikipedia.org/wiki/Dutch_national_flag_problem
-
-        :param int low: Lowest index to consider
-        :param int high: Highest index to consider
-        :return: (last_index of lower, last_index_of_middle)
-        :rtype: tuple(int,int)
-        """
-        check = low + 1
-        pivot = self._routes_frequency[low]
-        while check <= high:
-            if self._routes_frequency[check] > pivot:
-                self._swap_routes(low, check)
-                low += 1
-                check += 1
-            elif self._routes_frequency[check] < pivot:
-                self._swap_routes(high, check)
-                high -= 1
-            else:
-                check += 1
-        return low, check
-
-    def _quicksort_routes(self, low, high):
-        """
-        Sorts the routes in place based on frequency
-
-        :param int low: Inclusive lowest index to consider
-        :param int high: Inclusive highest index to consider
-        """
-        if low < high:
-            left, right = self._three_way_partition_routes(low, high)
-            self._quicksort_routes(low, left - 1)
-            self._quicksort_routes(right, high)
-
-    def _find_merge(self, left, index):
-        """
-        Attempt to find a merge between the left entry and the index entry
-
-        Creates a merge and then checks it does not intersect with entries
+        Creates the merges and then checks they do not intersect with entries
         with different routes.
 
-        If no intersect detected entry[left] is replaced with the merge
+        If a merge without an intersect is found, entry[left] is replaced with
+        the first such merge
 
         :param int left: Index of Entry to merge and replace if possible
-        :param int index: Index of entry to merge with
-        :return: True if and only if a merge was found and done
-        :rtype: bool
+        :param int right: Inclusive index of the last entry to merge with
+        :return: The index of the entry merged with, or None if no merge was
+            found
+        :rtype: int or None
         """
-        m_key, m_mask, defaultable = self.merge(
-            self._all_entries[left], self._all_entries[index])
-        if not self.ordered:
-            for check in range(self._previous_index):
-                if self.intersect(
-                        self._all_entries[check].key,
-                        self._all_entries[check].mask,
-                        m_key, m_mask):
-                    return False
-        for check in range(self._remaining_index, self._max_index + 1):
-            if self.intersect(
-                    self._all_entries[check].key,
-                    self._all_entries[check].mask,
-                    m_key, m_mask):
-                return False
-        self._all_entries[left] = Entry(
-            m_key, m_mask, defaultable,
-            self._all_entries[left].spinnaker_route)
-        return True
+        table = self._all_entries
+        start = left + 1
+        batch_size = self.FIRST_BATCH_SIZE
+        while start <= right:
+            indices = numpy.arange(start, min(start + batch_size, right + 1))
+            m_keys, m_masks, defaultables = table.merge(left, indices)
+            clashes = table.intersects_any(
+                m_keys, m_masks, self._remaining_index, self._max_index + 1)
+            if not self.ordered:
+                clashes |= table.intersects_any(
+                    m_keys, m_masks, 0, self._previous_index)
+            usable = numpy.flatnonzero(~clashes)
+            if len(usable):
+                first = usable[0]
+                table.set_entry(
+                    left, m_keys[first], m_masks[first], defaultables[first],
+                    table.routes[left])
+                return int(indices[first])
+            start += batch_size
+            batch_size = min(batch_size * 2, self.MAX_BATCH_SIZE)
+        return None
 
     def _compress_by_route(self, left, right):
         """
@@ -281,41 +178,54 @@ class PairCompressor(AbstractCompressor):
 
         :param int left: Inclusive index of first entry to merge
         :param int right: Inclusive index of last entry to merge
+        :return: False if the compression stopped early
+        :rtype: bool
         """
         while left < right:
-            index = left + 1
-            while index <= right:
-                merged = self._find_merge(left, index)
-                if merged:
-                    self._all_entries[index] = self._all_entries[right]
-                    # Setting None not needed but easier when debugging
-                    # self._all_entries[right] = None
-                    right -= 1
-                    break
-
-                index += 1
-            if not merged:
-                self._all_entries[self._write_index] = self._all_entries[left]
+            if self._stop_early(
+                    self._write_index + right - left + 1 +
+                    self._max_index - self._remaining_index + 1):
+                # Keep the rest of the bucket as it is
+                while left <= right:
+                    self._all_entries.copy_entry(self._write_index, left)
+                    self._write_index += 1
+                    left += 1
+                return False
+            index = self._find_merge(left, right)
+            if index is None:
+                self._all_entries.copy_entry(self._write_index, left)
                 self._write_index += 1
                 left += 1
+            else:
+                self._all_entries.copy_entry(index, right)
+                right -= 1
         if left == right:
-            self._all_entries[self._write_index] = self._all_entries[left]
-            # Setting None not needed but easier when debugging
-            # if left != self._write_pointer:
-            #    self._all_entries[left] = None
+            self._all_entries.copy_entry(self._write_index, left)
             self._write_index += 1
+        return True
 
-    def update_frequency(self, route):
+    def _sort_by_route_frequency(self):
         """
-        :param int route:
+        Sorts the entries so that the routes are in order of frequency, from
+        the least to the most frequent
         """
-        for i in range(self._routes_count):
-            if self._routes[i] == route:
-                self._routes_frequency[i] += 1
-                return
-        self._routes[self._routes_count] = route
-        self._routes_frequency[self._routes_count] = 1
-        self._routes_count += 1
+        routes = self._all_entries.routes.tolist()
+        frequencies = Counter(routes)
+        # The routes in the order they are first found, as the C counts them
+        found = list()
+        seen = set()
+        for route in routes:
+            if route not in seen:
+                seen.add(route)
+                found.append(route)
+        # Most frequent first
+        found = [found[index] for index in _three_way_quicksort(
+            [-frequencies[route] for route in found])]
+        # The entries of the least frequent route first
+        ranks = dict((route, -rank) for rank, route in enumerate(found))
+        self._all_entries.reorder(numpy.array(
+            _three_way_quicksort([ranks[route] for route in routes]),
+            dtype=numpy.int64))
 
     def compress_table(self, router_table):
         """ Compresses all the entries for a single table.
@@ -334,34 +244,70 @@ class PairCompressor(AbstractCompressor):
         """
 
         # Split the entries into buckets based on spinnaker_route
-        self._all_entries = []
-        self._routes_count = 0
-        # Imitate creating fixed size arrays
-        self._routes = self.MAX_SUPPORTED_LENGTH * [None]
-        self._routes_frequency = self.MAX_SUPPORTED_LENGTH * [None]
-
-        for entry in router_table.multicast_routing_entries:
-            self._all_entries.append(
-                Entry.from_MulticastRoutingEntry(entry))
-            self.update_frequency(entry.spinnaker_route)
-
-        self._quicksort_routes(0, self._routes_count - 1)
-        self._quicksort_table(0, len(self._all_entries) - 1)
+        self._all_entries = EntryTable.from_routing_table(router_table)
+        self._sort_by_route_frequency()
 
         self._write_index = 0
         self._max_index = len(self._all_entries) - 1
         self._previous_index = 0
         left = 0
 
-        while left <= self._max_index:
-            right = left
-            while (right < len(self._all_entries) - 1 and
-                   self._all_entries[right+1].spinnaker_route
-                   == self._all_entries[left].spinnaker_route):
-                right += 1
-            self._remaining_index = right + 1
-            self._compress_by_route(left, right)
+        # The exclusive end of each bucket of entries with the same route
+        routes = self._all_entries.routes
+        ends = (numpy.flatnonzero(routes[1:] != routes[:-1]) + 1).tolist()
+        ends.append(len(self._all_entries))
+        for end in ends:
+            right = end - 1
+            self._remaining_index = end
+            if not self._compress_by_route(left, right):
+                # Keep the later buckets as they are
+                while self._remaining_index <= self._max_index:
+                    self._all_entries.copy_entry(
+                        self._write_index, self._remaining_index)
+                    self._write_index += 1
+                    self._remaining_index += 1
+                break
             left = right + 1
             self._previous_index = self._write_index
 
-        return self._all_entries[0:self._write_index]
+        return self._all_entries.to_entries(self._write_index)
+
+
+def _three_way_quicksort(keys):
+    """ The order that the in-place three-way quicksort of the C puts \
+        items in, from the lowest key to the highest
+
+    Items with the same key are not kept in the order they were in, but the
+    order they end up in is the same as in the C.
+
+    :param list(int) keys: The key of each item
+    :return: The index of the item to put at each position
+    :rtype: list(int)
+    """
+    order = list(range(len(keys)))
+    # The inclusive (start, end) of the parts still to be sorted; a stack
+    # rather than recursion, as there can be many different keys
+    to_sort = [(0, len(order) - 1)]
+    while to_sort:
+        start, end = to_sort.pop()
+        if start >= end:
+            continue
+        # Partition as in the Dutch national flag problem
+        low = start
+        high = end
+        check = low + 1
+        pivot = keys[order[low]]
+        while check <= high:
+            key = keys[order[check]]
+            if key < pivot:
+                order[low], order[check] = order[check], order[low]
+                low += 1
+                check += 1
+            elif key > pivot:
+                order[high], order[check] = order[check], order[high]
+                high -= 1
+            else:
+                check += 1
+        to_sort.append((start, low - 1))
+        to_sort.append((check, end))
+    return order
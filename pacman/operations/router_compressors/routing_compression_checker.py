@@ -13,146 +13,170 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from collections import OrderedDict
 import logging
+import multiprocessing
 import os
+from collections import OrderedDict
 from spinn_utilities.log import FormatAdapter
 from spinn_utilities.progress_bar import ProgressBar
+from spinn_machine import MulticastRoutingEntry
 from pacman.exceptions import PacmanRoutingException
+from pacman.model.routing_tables import CompressedMulticastRoutingTable
 from pacman.operations.algorithm_reports import reports
+from .entry_table import EntryTable
 
 logger = FormatAdapter(logging.getLogger(__name__))
-WILDCARD = "*"
 LINE_FORMAT = "0x{:08X} 0x{:08X} 0x{:08X} {: <7s} {}\n"
 
 
-def codify(route, length=32):
+class _CodedTable(object):
+    """ A compressed routing table ready for checking against.
     """
-    This method discovers all the routing keys covered by this route.
 
-    Starts of with the assumption that the key is always covered.
+    __slots__ = [
+        # The keys and masks of the routes, in table order
+        "entries",
+        # The routes matching the entries, index for index
+        "routes"]
+
+    def __init__(self, routes):
+        """
+        :param list(~spinn_machine.MulticastRoutingEntry) routes:
+        """
+        self.routes = routes
+        self.entries = EntryTable(
+            [route.routing_entry_key for route in routes],
+            [route.mask for route in routes],
+            [route.spinnaker_route for route in routes],
+            [route.defaultable for route in routes])
+
 
-    Whenever a mask bit is zero the list of covered keys is doubled to\
-    include both the key with a zero and a one at that place.
+def codify(route, length=32):
+    """
+    This method gets the key and mask which describe all the routing keys
+    covered by this route.
+
+    Whenever a mask bit is zero both a zero and a one in the key are covered.
 
     :param ~spinn_machine.MulticastRoutingEntry route: single routing Entry
     :param int length: length in bits of the key and mask (defaults to 32)
-    :return: set of routing_keys covered by this route
-    :rtype: str
+    :return: key and mask
+    :rtype: tuple(int, int)
     """
     mask = route.mask
     key = route.routing_entry_key
-    code = ""
-    # Check each bit in the mask
-    for i in range(length):
-        bit_value = 2**i
-        # If the mask bit is zero then both zero and one acceptable
-        if mask & bit_value:
-            code = str(int(key & bit_value != 0)) + code
-        else:
-            # Safety key 1 with mask 0 is an error
-            assert key & bit_value == 0, \
-                "Bit {} on the mask:{} is 0 but 1 in the key:{}".format(
-                    i, bin(mask), bin(key))
-            code = WILDCARD + code
-    return code
+    # Safety key 1 with mask 0 is an error
+    assert key & ~mask & ((1 << length) - 1) == 0, \
+        "The mask:{} is 0 where the key:{} is 1".format(bin(mask), bin(key))
+    return key, mask
 
 
 def codify_table(table, length=32):
     """
     :param MulticastRoutingTable table:
     :param int length:
-    :rtype: dict(str, ~spinn_machine.MulticastRoutingEntry)
+    :return: The table in a form that can be quickly checked against
+    :rtype: _CodedTable
     """
+    # Later entries with the same key and mask replace earlier ones
+    # but stay in the position of the first
     code_dict = OrderedDict()
     for route in table.multicast_routing_entries:
         code_dict[codify(route, length)] = route
-    return code_dict
+    return _CodedTable(list(code_dict.values()))
 
 
-def covers(o_code, c_code):
-    """
-    :param str o_code:
-    :param str c_code:
+def covers(o_key, o_mask, c_key, c_mask):
+    """ If the compressed key-mask pair covers any of the keys that the
+        original key-mask pair does.
+
+    :param int o_key: The original key
+    :param int o_mask: The original mask
+    :param int c_key: The compressed key
+    :param int c_mask: The compressed mask
     :rtype: bool
     """
-    if o_code == c_code:
-        return True
-    for o_char, c_char in zip(o_code, c_code):
-        if o_char == "1" and c_char == "0":
-            return False
-        if o_char == "0" and c_char == "1":
-            return False
-        # o_char = c_char or either wildcard is some cover
-    return True
-
-
-def calc_remainders(o_code, c_code):
-    """
-    :param str o_code:
-    :param str c_code:
-    :rtype: list(str)
+    # Only a bit set in both masks but different in the keys stops a cover
+    return (o_key & c_mask) == (c_key & o_mask)
+
+
+def calc_remainders(o_key, o_mask, c_key, c_mask):
+    """ Get the key-mask pairs that together cover the keys of the original
+        key-mask pair that the compressed key-mask pair does not.
+
+    One pair is made for each bit which is an X in the original but not in
+    the compressed, with that bit set to the value the compressed does not
+    match, from the lowest bit up.
+
+    :param int o_key: The original key
+    :param int o_mask: The original mask
+    :param int c_key: The compressed key
+    :param int c_mask: The compressed mask
+    :rtype: list(tuple(int, int))
     """
-    if o_code == c_code:
-        # "" = "" so also the terminator case
-        return []
     remainders = []
-    for tail in calc_remainders(o_code[1:], c_code[1:]):
-        remainders.append(o_code[0] + tail)
-    if o_code[0] == WILDCARD:
-        if c_code[0] == "0":
-            remainders.append("1" + o_code[1:])
-        if c_code[0] == "1":
-            remainders.append("0" + o_code[1:])
+    settable = c_mask & ~o_mask
+    bit = 1
+    while bit <= settable:
+        if settable & bit:
+            remainders.append((o_key | (bit & ~c_key), o_mask | bit))
+        bit <<= 1
     return remainders
 
 
 def compare_route(o_route, compressed_dict, o_code=None, start=0, f=None):
     """
     :param ~spinn_machine.MulticastRoutingEntry o_route: the original route
-    :param dict compressed_dict:
-    :param str o_code:
-    :param int start:
+    :param _CodedTable compressed_dict: The result of :py:func:`codify_table`
+    :param o_code: The key and mask of the part of the original route to
+        check, or None to check the whole of it
+    :type o_code: tuple(int, int) or None
+    :param int start: The index of the first compressed route to check
     :param ~io.FileIO f:
     :rtype: None
+    :raises PacmanRoutingException: if the original route is not covered
+        correctly
     """
     if o_code is None:
         o_code = codify(o_route)
-    keys = list(compressed_dict.keys())
-    for i in range(start, len(keys)):
-        c_code = keys[i]
-        if covers(o_code, c_code):
-            c_route = compressed_dict[c_code]
-            if f is not None:
-                f.write("\t\t{}\n".format(reports.format_route(c_route)))
-            if o_route.processor_ids != c_route.processor_ids:
-                if set(o_route.processor_ids) != set(c_route.processor_ids):
-                    raise PacmanRoutingException(
-                        "Compressed route {} covers original route {} but has "
-                        "a different processor_ids.".format(c_route, o_route))
-            if o_route.link_ids != c_route.link_ids:
-                if set(o_route.link_ids) != set(c_route.link_ids):
-                    raise PacmanRoutingException(
-                        "Compressed route {} covers original route {} but has "
-                        "a different link_ids.".format(c_route, o_route))
-            if not o_route.defaultable and c_route.defaultable:
-                if o_route == c_route:
-                    raise PacmanRoutingException(
-                        "Compressed route {} while original route {} but has "
-                        "a different defaultable value.".format(
-                            c_route, o_route))
-                else:
-                    compare_route(o_route, compressed_dict, o_code=o_code,
-                                  start=i + 1, f=f)
-            else:
-                remainders = calc_remainders(o_code, c_code)
-                for remainder in remainders:
-                    compare_route(o_route, compressed_dict, o_code=remainder,
-                                  start=i + 1, f=f)
-            return
-    if not o_route.defaultable:
-        # print("No route found {}".format(o_route))
-        raise PacmanRoutingException("No route found {}".format(o_route))
+    entries = compressed_dict.entries
+    # Depth first, so the checks happen in the same order as recursion would
+    to_check = [(o_code, start)]
+    while to_check:
+        (o_key, o_mask), start = to_check.pop()
+        matches = entries.intersects(o_key, o_mask, start)
+        index = int(matches.argmax()) if len(matches) else 0
+        if len(matches) == 0 or not matches[index]:
+            if not o_route.defaultable:
+                raise PacmanRoutingException(
+                    "No route found {}".format(o_route))
+            continue
+        index += start
+        c_route = compressed_dict.routes[index]
+        if f is not None:
+            f.write("\t\t{}\n".format(reports.format_route(c_route)))
+        if o_route.spinnaker_route != c_route.spinnaker_route:
+            if set(o_route.processor_ids) != set(c_route.processor_ids):
+                raise PacmanRoutingException(
+                    "Compressed route {} covers original route {} but has "
+                    "a different processor_ids.".format(c_route, o_route))
+            if set(o_route.link_ids) != set(c_route.link_ids):
+                raise PacmanRoutingException(
+                    "Compressed route {} covers original route {} but has "
+                    "a different link_ids.".format(c_route, o_route))
+        if not o_route.defaultable and c_route.defaultable:
+            if o_route == c_route:
+                raise PacmanRoutingException(
+                    "Compressed route {} while original route {} but has "
+                    "a different defaultable value.".format(
+                        c_route, o_route))
+            to_check.append(((o_key, o_mask), index + 1))
+        else:
+            remainders = calc_remainders(
+                o_key, o_mask, int(entries.keys[index]),
+                int(entries.masks[index]))
+            for remainder in reversed(remainders):
+                to_check.append((remainder, index + 1))
 
 
 def compare_tables(original, compressed):
@@ -169,6 +193,90 @@ def compare_tables(original, compressed):
         compare_route(o_route, compressed_dict)
 
 
+def compare_all_tables(
+        routing_tables, compressed_routing_tables, n_workers=None):
+    """ Compares every original table with its compressed table without\
+        generating any output
+
+    :param MulticastRoutingTables routing_tables: the original routing tables
+    :param MulticastRoutingTables compressed_routing_tables:
+        the compressed routing tables
+    :param n_workers:
+        The number of worker processes to compare the tables with.
+        None or 1 to compare serially in this process;
+        0 to use one worker per available CPU.
+    :type n_workers: int or None
+    :rtype: None
+    :raises: PacmanRoutingException for the first table, in the order of
+        routing_tables, with any error
+    """
+    pairs = list()
+    for original in routing_tables.routing_tables:
+        compressed = compressed_routing_tables.get_routing_table_for_chip(
+            original.x, original.y)
+        if compressed is None:
+            raise PacmanRoutingException(
+                "No compressed routing table for chip {}:{}".format(
+                    original.x, original.y))
+        pairs.append((original, compressed))
+    progress = ProgressBar(pairs, "Checking compressed routing tables")
+
+    if n_workers is None or n_workers == 1:
+        for original, compressed in progress.over(pairs):
+            compare_tables(original, compressed)
+        return
+
+    n_workers = n_workers or multiprocessing.cpu_count()
+    chunk_size = len(pairs) // (n_workers * 4) + 1
+    pool = multiprocessing.Pool(n_workers)
+    try:
+        errors = pool.imap(
+            _compare_in_worker,
+            ((_pack_entries(original), _pack_entries(compressed))
+             for original, compressed in pairs), chunk_size)
+        for error in progress.over(errors):
+            if error is not None:
+                raise PacmanRoutingException(error)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _pack_entries(table):
+    """ Convert the entries of a table into plain tuples that are cheap to\
+        pickle
+
+    :param MulticastRoutingTable table:
+    :rtype: list(tuple(int, int, bool, int))
+    """
+    return [
+        (entry.routing_entry_key, entry.mask, entry.defaultable,
+         entry.spinnaker_route)
+        for entry in table.multicast_routing_entries]
+
+
+def _compare_in_worker(packed_tables):
+    """ Compare a pair of packed tables in a worker process
+
+    :param packed_tables: The original and compressed table entries
+    :type packed_tables: tuple(list(tuple(int, int, bool, int)),
+        list(tuple(int, int, bool, int)))
+    :return: The error message or None if the tables match
+    :rtype: str or None
+    """
+    original, compressed = (
+        CompressedMulticastRoutingTable(0, 0, [
+            MulticastRoutingEntry(
+                key, mask, defaultable=defaultable, spinnaker_route=route)
+            for key, mask, defaultable, route in packed])
+        for packed in packed_tables)
+    try:
+        compare_tables(original, compressed)
+    except PacmanRoutingException as ex:
+        return str(ex)
+    return None
+
+
 def generate_routing_compression_checker_report(
         report_folder, routing_tables, compressed_routing_tables):
     """ Make a full report of how the compressed covers all routes in the\
@@ -15,6 +15,8 @@
 
 import sys
 from pacman.utilities import constants
+from pacman.utilities.algorithm_utilities.machine_topology import (
+    invalidate_machine_topology)
 from spinn_machine import SDRAM, Chip, Link, Router
 
 
@@ -69,3 +71,6 @@ def create_virtual_chip(machine, link_data, virtual_chip_x, virtual_chip_y):
         sdram=SDRAM(size=0),
         x=virtual_chip_x, y=virtual_chip_y,
         virtual=True, nearest_ethernet_x=None, nearest_ethernet_y=None))
+
+    # The links of the real chip have changed too
+    invalidate_machine_topology(machine)
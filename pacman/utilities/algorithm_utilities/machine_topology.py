@@ -0,0 +1,443 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import weakref
+import numpy
+
+#: The change in (x, y) over each link, as in
+#: :py:attr:`spinn_machine.Machine.LINK_ADD_TABLE`
+LINK_ADD_TABLE = ((1, 0), (1, 1), (0, 1), (-1, 0), (-1, -1), (0, -1))
+
+#: The number of links of each router
+N_LINKS = 6
+
+
+class MachineTopology(object):
+    """ A snapshot of the chips and links of a machine, for routers to \
+        look up without going through the Chip and Router objects.
+
+    The arrays have a row per chip, in the order of
+    :py:attr:`~spinn_machine.Machine.chips`, for vectorised use. The methods
+    answer the same questions as the methods of the same names of
+    :py:class:`~spinn_machine.Machine`, with the same answers, from plain
+    Python copies of the arrays, as indexing NumPy arrays one element at a
+    time is slow.
+
+    Use :py:func:`machine_topology` to get the snapshot of a machine, so it
+    is only made once however many routers use it.
+    """
+
+    __slots__ = [
+        # The width of the machine
+        "_width",
+        # The height of the machine
+        "_height",
+        # What wraps around; one of "Wrapped", "HorWrap", "VerWrap", "NoWrap"
+        "_wrap",
+        # The (x, y) of each chip, as int32 with a row per chip
+        "_xys",
+        # The row of the chip over each link of each chip, or -1 where there
+        # is no link, as int32 with a row per chip and a column per link
+        "_neighbours",
+        # A bit per link that each chip's router has, as uint8
+        "_link_masks",
+        # The row of each chip, by (x, y)
+        "_index",
+        # The destination (x, y) of each link of each chip, or None where
+        # there is no link, by (x, y)
+        "_destinations",
+        # The width if the machine wraps horizontally, else None
+        "_wrap_width",
+        # The height if the machine wraps vertically, else None
+        "_wrap_height",
+        # Whether the positive way round is preferred when both ways round
+        # are as short
+        "_forwards_first",
+        # The (x, y, link) of each link missing inside the machine
+        "_dead_links",
+        # The connected component of each chip, as int32; made when first
+        # needed
+        "_components"]
+
+    def __init__(self, machine):
+        """
+        :param ~spinn_machine.Machine machine:
+        """
+        self._width = machine.width
+        self._height = machine.height
+        self._wrap = machine.wrap
+        chips = list(machine.chips)
+        self._index = dict(
+            ((chip.x, chip.y), row) for row, chip in enumerate(chips))
+        self._xys = numpy.array(
+            [(chip.x, chip.y) for chip in chips],
+            dtype=numpy.int32).reshape(-1, 2)
+        self._neighbours = numpy.full(
+            (len(chips), N_LINKS), -1, dtype=numpy.int32)
+        self._link_masks = numpy.zeros(len(chips), dtype=numpy.uint8)
+        self._destinations = dict()
+        for row, chip in enumerate(chips):
+            destinations = list()
+            for link_id in range(N_LINKS):
+                link = chip.router.get_link(link_id)
+                if link is None:
+                    destinations.append(None)
+                    continue
+                xy = (link.destination_x, link.destination_y)
+                destinations.append(xy)
+                self._link_masks[row] |= 1 << link_id
+                self._neighbours[row, link_id] = self._index.get(xy, -1)
+            self._destinations[chip.x, chip.y] = tuple(destinations)
+
+        # The directions that wrap, and in which order the ways round are
+        # preferred when they are the same length, as in the Machine classes
+        wraps_x = self._wrap in ("Wrapped", "HorWrap")
+        wraps_y = self._wrap in ("Wrapped", "VerWrap")
+        self._wrap_width = self._width if wraps_x else None
+        self._wrap_height = self._height if wraps_y else None
+        self._forwards_first = self._wrap == "Wrapped"
+
+        # Links off the edge of a machine that does not wrap are not dead
+        self._dead_links = frozenset(
+            (x, y, link_id)
+            for (x, y), destinations in self._destinations.items()
+            for link_id, xy in enumerate(destinations)
+            if xy is None and self._in_machine(
+                *self.xy_over_link(x, y, link_id)))
+        self._components = None
+
+    @property
+    def width(self):
+        """ The width of the machine, as :py:attr:`Machine.width`
+
+        :rtype: int
+        """
+        return self._width
+
+    @property
+    def height(self):
+        """ The height of the machine, as :py:attr:`Machine.height`
+
+        :rtype: int
+        """
+        return self._height
+
+    @property
+    def wrap(self):
+        """ What wraps around, as :py:attr:`Machine.wrap`
+
+        :rtype: str
+        """
+        return self._wrap
+
+    @property
+    def wrap_width(self):
+        """ The width if the machine wraps around horizontally, else None
+
+        :rtype: int or None
+        """
+        return self._wrap_width
+
+    @property
+    def wrap_height(self):
+        """ The height if the machine wraps around vertically, else None
+
+        :rtype: int or None
+        """
+        return self._wrap_height
+
+    @property
+    def n_chips(self):
+        """ The number of chips, which is the number of rows of the arrays
+
+        :rtype: int
+        """
+        return len(self._index)
+
+    @property
+    def xys(self):
+        """ The (x, y) of each chip
+
+        :rtype: ~numpy.ndarray
+        """
+        return self._xys
+
+    @property
+    def neighbours(self):
+        """ The row of the chip at the other end of each link of each chip, \
+            or -1 where there is no link to a chip
+
+        :rtype: ~numpy.ndarray
+        """
+        return self._neighbours
+
+    @property
+    def link_masks(self):
+        """ A bit for each link that the router of each chip has, bit n \
+            being set when link n exists
+
+        :rtype: ~numpy.ndarray
+        """
+        return self._link_masks
+
+    @property
+    def dead_links(self):
+        """ The links that are missing from chips although they would lead \
+            to a place inside the machine, such as the links to and from dead \
+            chips; empty for a machine with every chip and link
+
+        :rtype: frozenset(tuple(int,int,int))
+        """
+        return self._dead_links
+
+    @property
+    def components(self):
+        """ The connected component each chip is in, numbered from 0; two \
+            chips have the same number when a path of links joins them
+
+        :rtype: ~numpy.ndarray
+        """
+        if self._components is None:
+            self._components = self._label_components()
+        return self._components
+
+    def _label_components(self):
+        """ Label the chips by connected component, by breadth first search \
+            treating each link as going both ways
+
+        :rtype: ~numpy.ndarray
+        """
+        links = [list() for _ in range(self.n_chips)]
+        for row, neighbours in enumerate(self._neighbours.tolist()):
+            for neighbour in neighbours:
+                if neighbour >= 0:
+                    links[row].append(neighbour)
+                    links[neighbour].append(row)
+        labels = [-1] * self.n_chips
+        n_components = 0
+        for start in range(self.n_chips):
+            if labels[start] >= 0:
+                continue
+            labels[start] = n_components
+            to_visit = [start]
+            while to_visit:
+                row = to_visit.pop()
+                for neighbour in links[row]:
+                    if labels[neighbour] < 0:
+                        labels[neighbour] = n_components
+                        to_visit.append(neighbour)
+            n_components += 1
+        return numpy.array(labels, dtype=numpy.int32)
+
+    def chip_index(self, x, y):
+        """ The row of the arrays for a chip
+
+        :param int x:
+        :param int y:
+        :return: The row, or None if there is no chip at (x, y)
+        :rtype: int or None
+        """
+        return self._index.get((x, y))
+
+    def is_chip_at(self, x, y):
+        """
+        :param int x:
+        :param int y:
+        :rtype: bool
+        """
+        return (x, y) in self._index
+
+    def is_link_at(self, x, y, link):
+        """
+        :param int x:
+        :param int y:
+        :param int link:
+        :rtype: bool
+        """
+        destinations = self._destinations.get((x, y))
+        return destinations is not None and destinations[link] is not None
+
+    def link_destinations(self, x, y):
+        """ The (x, y) at the other end of each link of a chip
+
+        :param int x:
+        :param int y:
+        :return: A (x, y) per link, or None where the link does not exist,
+            or None if there is no chip at (x, y)
+        :rtype: tuple(tuple(int,int) or None) or None
+        """
+        return self._destinations.get((x, y))
+
+    def xy_over_link(self, x, y, link):
+        """ Where a link would go, whether or not it exists, as \
+            :py:meth:`Machine.xy_over_link`
+
+        :param int x:
+        :param int y:
+        :param int link:
+        :rtype: tuple(int,int)
+        """
+        add_x, add_y = LINK_ADD_TABLE[link]
+        x += add_x
+        y += add_y
+        if self._wrap_width is not None:
+            x %= self._wrap_width
+        if self._wrap_height is not None:
+            y %= self._wrap_height
+        return x, y
+
+    def _in_machine(self, x, y):
+        """ Whether a place is inside the width and height of the machine
+
+        :param int x:
+        :param int y:
+        :rtype: bool
+        """
+        return 0 <= x < self._width and 0 <= y < self._height
+
+    def get_vector_length(self, source, destination):
+        """ The number of links on the shortest path between two chips, as \
+            :py:meth:`Machine.get_vector_length`
+
+        :param tuple(int,int) source:
+        :param tuple(int,int) destination:
+        :rtype: int
+        """
+        return min(
+            _hex_length(dx, dy)
+            for dy in _wrap_options(
+                destination[1] - source[1], self._wrap_height,
+                self._forwards_first)
+            for dx in _wrap_options(
+                destination[0] - source[0], self._wrap_width,
+                self._forwards_first))
+
+    def get_vector(self, source, destination):
+        """ The shortest vector between two chips, as \
+            :py:meth:`Machine.get_vector`
+
+        :param tuple(int,int) source:
+        :param tuple(int,int) destination:
+        :rtype: tuple(int,int,int)
+        """
+        best = None
+        best_length = None
+        # The first of the shortest, as the Machine classes choose
+        for dy in _wrap_options(
+                destination[1] - source[1], self._wrap_height,
+                self._forwards_first):
+            for dx in _wrap_options(
+                    destination[0] - source[0], self._wrap_width,
+                    self._forwards_first):
+                length = _hex_length(dx, dy)
+                if best is None or length < best_length:
+                    best = (dx, dy)
+                    best_length = length
+        return _minimize_vector(*best)
+
+
+def _wrap_options(delta, size, forwards_first):
+    """ The ways round a dimension to move by a difference, in order of \
+        preference
+
+    :param int delta: The difference in the dimension
+    :param size: The size of the dimension if it wraps around, else None
+    :type size: int or None
+    :param bool forwards_first:
+        Whether the positive way is preferred when both are as short
+    :rtype: tuple(int)
+    """
+    if size is None:
+        return (delta, )
+    if forwards_first:
+        return (delta % size, delta % size - size)
+    return (delta % size - size, delta % size)
+
+
+def _hex_length(dx, dy):
+    """ The number of links to move by a vector with no z
+
+    :param int dx:
+    :param int dy:
+    :rtype: int
+    """
+    if (dx > 0) == (dy > 0) or dx == 0 or dy == 0:
+        return max(abs(dx), abs(dy))
+    return abs(dx) + abs(dy)
+
+
+def _minimize_vector(x, y):
+    """ The shortest (x, y, z) vector equivalent to an (x, y, 0) vector, as \
+        :py:meth:`Machine._minimize_vector`
+
+    :param int x:
+    :param int y:
+    :rtype: tuple(int,int,int)
+    """
+    if x > 0:
+        if y > 0:
+            if x > y:
+                return (x - y, 0, -y)
+            return (0, y - x, -x)
+        return (x, y, 0)
+    if y > 0:
+        return (x, y, 0)
+    if x > y:
+        return (0, y - x, -x)
+    return (x - y, 0, -y)
+
+
+# A weak reference to the machine of the last snapshot made, its numbers of
+# chips and links and the snapshot
+_last = (None, 0, None)
+
+
+def invalidate_machine_topology(machine=None):
+    """ Forget the topology snapshot of a machine, so the next call to \
+        :py:func:`machine_topology` makes a new one.
+
+    Call this after changing the links of a machine, such as when adding
+    virtual chips, as the snapshot is not checked against them.
+
+    :param machine:
+        The machine that has changed, or None to forget any snapshot
+    :type machine: ~spinn_machine.Machine or None
+    """
+    global _last
+    machine_ref = _last[0]
+    if machine is None or (
+            machine_ref is not None and machine_ref() is machine):
+        _last = (None, 0, None)
+
+
+def machine_topology(machine):
+    """ Get the topology snapshot of a machine, making it only if the \
+        machine has not been seen before or has gained or lost chips since.
+
+    Changes to the links of a machine the snapshot was made for are not
+    seen; call :py:func:`invalidate_machine_topology` after making them.
+    Only a weak reference to the machine is kept, so the machine can still
+    be freed.
+
+    :param ~spinn_machine.Machine machine:
+    :rtype: MachineTopology
+    """
+    global _last
+    machine_ref, n_chips, topology = _last
+    last_machine = None if machine_ref is None else machine_ref()
+    if last_machine is not machine or n_chips != machine.n_chips:
+        topology = MachineTopology(machine)
+        _last = (weakref.ref(machine), machine.n_chips, topology)
+    return topology
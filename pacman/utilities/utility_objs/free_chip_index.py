@@ -0,0 +1,190 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import defaultdict
+from sortedcollections import SortedList
+
+
+class FreeChipIndex(object):
+    """ An index of the chips which have cores free, in a fixed order, \
+        grouped by how much SDRAM they have free.
+
+    Each chip has a position in the order it was given in. The chips with
+    cores free are kept in buckets by the bit length of their free SDRAM,
+    each a sorted list of positions, so the first chip in the order with
+    enough SDRAM is found by looking at the first chip of each bucket big
+    enough, without looking at any chip that is full.
+    """
+
+    __slots__ = [
+        # The (x, y) of the chip at each position
+        "_xys",
+
+        # The position of each (x, y)
+        "_positions",
+
+        # The free SDRAM of the chip at each position, if it is in the index
+        "_sdram",
+
+        # The bucket holding each position, or -1 if not in the index
+        "_bucket_of",
+
+        # The sorted positions of the chips in the index, by the bit length
+        # of their free SDRAM
+        "_buckets",
+
+        # The number of chips in the index
+        "_n_chips"]
+
+    def __init__(self, chips):
+        """
+        :param iterable(tuple(int,int)) chips:
+            The chips that can be indexed, in the order to find them in
+        """
+        self._xys = list()
+        self._positions = dict()
+        for xy in chips:
+            if xy not in self._positions:
+                self._positions[xy] = len(self._xys)
+                self._xys.append(xy)
+        self._sdram = [0] * len(self._xys)
+        self._bucket_of = [-1] * len(self._xys)
+        self._buckets = list()
+        self._n_chips = 0
+
+    def add(self, x, y, sdram):
+        """ Add a chip which has cores free, or update its free SDRAM
+
+        Chips that were not given when the index was made are ignored.
+
+        :param int x:
+        :param int y:
+        :param int sdram: The SDRAM free on the chip
+        """
+        position = self._positions.get((x, y))
+        if position is None:
+            return
+        bucket = int(sdram).bit_length()
+        old_bucket = self._bucket_of[position]
+        self._sdram[position] = sdram
+        if old_bucket == bucket:
+            return
+        if old_bucket >= 0:
+            self._buckets[old_bucket].remove(position)
+        else:
+            self._n_chips += 1
+        while len(self._buckets) <= bucket:
+            self._buckets.append(SortedList())
+        self._buckets[bucket].add(position)
+        self._bucket_of[position] = bucket
+
+    def add_all(self, chips):
+        """ Add many chips which have cores free at once, as :py:meth:`add`
+
+        :param iterable(tuple(int,int,int)) chips:
+            The x, y and free SDRAM of each chip
+        """
+        added = defaultdict(list)
+        for x, y, sdram in chips:
+            position = self._positions.get((x, y))
+            if position is None:
+                continue
+            if self._bucket_of[position] >= 0:
+                self.remove(x, y)
+            bucket = int(sdram).bit_length()
+            self._sdram[position] = sdram
+            self._bucket_of[position] = bucket
+            added[bucket].append(position)
+            self._n_chips += 1
+        for bucket, positions in added.items():
+            while len(self._buckets) <= bucket:
+                self._buckets.append(SortedList())
+            self._buckets[bucket].update(positions)
+
+    def update_sdram(self, x, y, sdram):
+        """ Change the free SDRAM of a chip, if it is in the index
+
+        :param int x:
+        :param int y:
+        :param int sdram: The SDRAM free on the chip
+        """
+        if (x, y) in self:
+            self.add(x, y, sdram)
+
+    def remove(self, x, y):
+        """ Remove a chip that has no more cores free, if it is in the index
+
+        :param int x:
+        :param int y:
+        """
+        position = self._positions.get((x, y))
+        if position is None or self._bucket_of[position] < 0:
+            return
+        self._buckets[self._bucket_of[position]].remove(position)
+        self._bucket_of[position] = -1
+        self._n_chips -= 1
+
+    def __contains__(self, xy):
+        position = self._positions.get(xy)
+        return position is not None and self._bucket_of[position] >= 0
+
+    def __len__(self):
+        return self._n_chips
+
+    def __iter__(self):
+        """ The chips in the index, in order
+
+        :rtype: iterable(tuple(int,int))
+        """
+        return self.chips_with_sdram(0)
+
+    def chips_with_sdram(self, sdram):
+        """ The chips in the index with at least some SDRAM free, in order; \
+            each is looked up when needed, so the index can be changed by \
+            the caller between them
+
+        :param int sdram: The SDRAM needed
+        :rtype: iterable(tuple(int,int))
+        """
+        position = self._first_position(sdram, 0)
+        while position is not None:
+            yield self._xys[position]
+            position = self._first_position(sdram, position + 1)
+
+    def _first_position(self, sdram, start):
+        """ Find the first position from a given one of a chip in the index \
+            with at least some SDRAM free
+
+        :param int sdram: The SDRAM needed
+        :param int start: The position to look from
+        :rtype: int or None
+        """
+        # Every chip in a bucket above that of the SDRAM has enough, so only
+        # the first from the start in each of those is needed
+        first = int(sdram).bit_length()
+        best = None
+        for bucket in self._buckets[first + 1:]:
+            index = bucket.bisect_left(start) if start else 0
+            if index < len(bucket) and (best is None or bucket[index] < best):
+                best = bucket[index]
+
+        # Chips in the bucket of the SDRAM might have enough, and no chip in
+        # a bucket below does
+        if first < len(self._buckets):
+            for position in self._buckets[first].irange(
+                    start, best, inclusive=(True, False)):
+                if self._sdram[position] >= sdram:
+                    return position
+        return best
@@ -14,6 +14,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from collections import defaultdict
+import numpy
 from spinn_utilities.ordered_set import OrderedSet
 from pacman.model.constraints.placer_constraints import (
     RadialPlacementFromChipConstraint, BoardConstraint, ChipAndCoreConstraint,
@@ -26,8 +27,8 @@ from pacman.utilities.utility_calls import (
 from pacman.exceptions import (
     PacmanCanNotFindChipException, PacmanInvalidParameterException,
     PacmanValueError, PacmanException)
-from sortedcollections import ValueSortedDict
 from pacman.utilities import constants
+from .free_chip_index import FreeChipIndex
 
 
 class ResourceTracker(object):
@@ -35,15 +36,25 @@ class ResourceTracker(object):
     """
 
     __slots__ = [
-        # The amount of SDRAM used by each chip,
-        # indexed by the (x, y) tuple of coordinates of the chip
-        # Note that entries are only added when the SDRAM is first used
-        "_sdram_tracker",
+        # The row of each chip in the arrays of chip state, indexed by the
+        # (x, y) tuple of coordinates of the chip
+        "_chip_rows",
 
-        # The set of processor IDs available on each chip,
-        # indexed by the (x, y) tuple of coordinates of the chip
-        # Note that entries are only added when a core is first used
-        "_core_tracker",
+        # The (x, y) of each chip, as int32 with a row per chip
+        "_xys",
+
+        # The amount of SDRAM available on each chip, as int64
+        "_sdram",
+
+        # A bit per processor ID available on each chip, as uint32 with a
+        # row per chip and as many words as the biggest chip needs
+        "_free_cores",
+
+        # The number of processors available on each chip, as int32
+        "_n_free_cores",
+
+        # Whether each chip is virtual, as bool
+        "_virtual",
 
         # The machine object
         "_machine",
@@ -86,14 +97,14 @@ class ResourceTracker(object):
         # board address
         "_ethernet_chips",
 
-        # Set of (x, y) tuples of coordinates of chips which have available
-        # processors
+        # Index of the (x, y) tuples of coordinates of chips which have
+        # available processors, in the order chips are to be used
         "_chips_available",
 
-        # Number of cores preallocated on each chip (by x, y coordinates)
+        # Number of cores preallocated on each chip, as int32
         "_n_cores_preallocated",
 
-        # counter of chips that have had processors allocated to them
+        # Whether each chip has had processors allocated to it, as bool
         "_chips_used",
 
         # The number of chips with the n cores currently available
@@ -105,6 +116,22 @@ class ResourceTracker(object):
         # tracker of vertex to chip location
         '_vertex_to_chip_map',
 
+        # The checkpoints that can be rolled back to, most recent last
+        "_checkpoints",
+
+        # The most SDRAM available on a chip with processors available in
+        # each block of rows, or -1 if there is no such chip, as int64
+        "_block_sdram",
+
+        # The first row with the most SDRAM in each block of rows, as int64
+        "_block_row",
+
+        # The blocks of rows with chips changed since they were summarised
+        "_changed_blocks",
+
+        # The rows of the chips of each board, by board address
+        "_board_rows",
+
     ]
 
     ALLOCATION_SDRAM_ERROR = (
@@ -112,6 +139,9 @@ class ResourceTracker(object):
         "are only {} bytes of SDRAM available on the chip at this time. "
         "Please fix and try again")
 
+    #: The number of rows of chips summarised together
+    _SUMMARY_BLOCK_SIZE = 64
+
     def __init__(self, machine, plan_n_timesteps, chips=None,
                  preallocated_resources=None):
         """
@@ -121,37 +151,28 @@ class ResourceTracker(object):
         :param chips: If specified, this list of chips will be used instead
             of the list from the machine. Note that the order will be
             maintained, so this can be used either to reduce the set of chips
-            used, or to re-order the chips. Note also that on deallocation,
-            the order is no longer guaranteed.
+            used, or to re-order the chips. Chips keep their place in the
+            order when resources on them are deallocated.
         :type chips: iterable(tuple(int, int)) or None
         :param preallocated_resources:
         :type preallocated_resources: PreAllocatedResourceContainer or None
         """
 
-        # The amount of SDRAM available on each chip,
-        # indexed by the (x, y) tuple of coordinates of the chip
-        # Items are sorted in reverse order so highest comes out first
-        self._sdram_tracker = ValueSortedDict(lambda x: -x)
-        for chip in machine.chips:
-            self._sdram_tracker[chip.x, chip.y] = chip.sdram.size
-
-        # The set of processor IDs available on each chip,
-        # indexed by the (x, y) tuple of coordinates of the chip
-        # Note that entries are only added when a core is first used
-        self._core_tracker = dict()
+        # The state of the chips, in arrays with a row per chip
+        self._make_chip_arrays(machine)
 
         # map between vertex to chip it was allocated
         self._vertex_to_chip_map = dict()
 
+        # The checkpoints that can be rolled back to, most recent last
+        self._checkpoints = list()
+
         # The machine object
         self._machine = machine
 
         # The number of timesteps that should be planned for.
         self._plan_n_timesteps = plan_n_timesteps
 
-        # tracker for chips used
-        self._chips_used = set()
-
         # Set of tags available indexed by board address
         # Note that entries are only added when a board is first used
         self._tags_by_board = dict()
@@ -193,35 +214,98 @@ class ResourceTracker(object):
 
         # set of resources that have been pre allocated and therefore need to
         # be taken account of when allocating resources
-        self._n_cores_preallocated = self._convert_preallocated_resources(
-            preallocated_resources)
+        self._convert_preallocated_resources(preallocated_resources)
 
         # update tracker for n cores available per chip
-        self._real_chips_with_n_cores_available = \
-            [0] * (machine.max_cores_per_chip() + 1)
-        self._virtual_chips_with_n_cores_available = \
-            [0] * (constants.CORES_PER_VIRTUAL_CHIP + 1)
+        n_available = numpy.maximum(
+            self._n_free_cores - self._n_cores_preallocated, 0)
+        self._real_chips_with_n_cores_available = numpy.bincount(
+            n_available[~self._virtual],
+            minlength=machine.max_cores_per_chip() + 1).tolist()
+        self._virtual_chips_with_n_cores_available = numpy.bincount(
+            n_available[self._virtual],
+            minlength=constants.CORES_PER_VIRTUAL_CHIP + 1).tolist()
+
+        # Index of the (x, y) tuples of coordinates of chips which have
+        # available processors, in the order chips are to be used
+        if chips is None:
+            chips = machine.chip_coordinates
+        chips = list(chips)
+        self._chips_available = FreeChipIndex(chips)
+        self._chips_available.add_all(self._available_chips_and_sdram(chips))
+
+        # Summaries of the chips by block of rows, so that the chip with the
+        # most SDRAM is found without looking at every chip
+        n_blocks = -(-len(self._sdram) // self._SUMMARY_BLOCK_SIZE)
+        self._block_sdram = numpy.full(n_blocks, -1, dtype=numpy.int64)
+        self._block_row = numpy.zeros(n_blocks, dtype=numpy.int64)
+        self._changed_blocks = set(range(n_blocks))
+        self._board_rows = dict()
+
+    def _available_chips_and_sdram(self, chips):
+        """ Get the chips which have processors available, with the SDRAM \
+            available on each
+
+        :param iterable(tuple(int,int)) chips: The chips to look at
+        :rtype: iterable(tuple(int,int,int))
+        """
+        available = (
+            self._n_free_cores > self._n_cores_preallocated).tolist()
+        sdram = self._sdram.tolist()
+        for x, y in chips:
+            row = self._chip_rows.get((x, y))
+            if row is not None and available[row]:
+                yield x, y, sdram[row]
+
+    def _make_chip_arrays(self, machine):
+        """ Make the arrays of the state of the chips of a machine, with all \
+            their SDRAM and processors other than monitors available.
 
+        :param ~spinn_machine.Machine machine:
+        """
+        # Most chips share the same processors, so the bits of each set of
+        # processors are only worked out once
+        masks = dict()
+        xys = list()
+        sdram = list()
+        virtual = list()
+        chip_masks = list()
         for chip in machine.chips:
-            pre_allocated = 0
-            if (chip.x, chip.y) in self._n_cores_preallocated:
-                pre_allocated = self._n_cores_preallocated[(chip.x, chip.y)]
-            if chip.virtual:
-                self._virtual_chips_with_n_cores_available[
-                    chip.n_user_processors - pre_allocated] += 1
-            else:
-                self._real_chips_with_n_cores_available[
-                    chip.n_user_processors - pre_allocated] += 1
-
-        # Set of (x, y) tuples of coordinates of chips which have available
-        # processors
-        self._chips_available = OrderedSet()
-        if chips is None:
-            for x, y in machine.chip_coordinates:
-                self._chips_available.add((x, y))
-        else:
-            for x, y in chips:
-                self._chips_available.add((x, y))
+            xys.append((chip.x, chip.y))
+            sdram.append(chip.sdram.size)
+            virtual.append(chip.virtual)
+            processors = tuple(chip.processors)
+            mask = masks.get(processors)
+            if mask is None:
+                mask = sum(
+                    1 << processor.processor_id for processor in processors
+                    if not processor.is_monitor)
+                masks[processors] = mask
+            chip_masks.append(mask)
+
+        n_chips = len(xys)
+        self._chip_rows = dict(zip(xys, range(n_chips)))
+        self._xys = numpy.array(xys, dtype=numpy.int32).reshape(-1, 2)
+        self._sdram = numpy.array(sdram, dtype=numpy.int64)
+        self._virtual = numpy.array(virtual, dtype=bool)
+        self._n_cores_preallocated = numpy.zeros(n_chips, dtype=numpy.int32)
+        self._chips_used = numpy.zeros(n_chips, dtype=bool)
+
+        # The processors of each chip as words of bits, and how many there are
+        n_words = max(
+            [(mask.bit_length() + 31) // 32 for mask in masks.values()] +
+            [1])
+        words = dict(
+            (mask, [(mask >> (32 * word)) & 0xFFFFFFFF
+                    for word in range(n_words)])
+            for mask in masks.values())
+        self._free_cores = numpy.array(
+            [words[mask] for mask in chip_masks],
+            dtype=numpy.uint32).reshape(n_chips, n_words)
+        n_cores = dict(
+            (mask, bin(mask).count("1")) for mask in masks.values())
+        self._n_free_cores = numpy.array(
+            [n_cores[mask] for mask in chip_masks], dtype=numpy.int32)
 
     @property
     def plan_n_time_steps(self):
@@ -229,44 +313,38 @@ class ResourceTracker(object):
 
     def _convert_preallocated_resources(self, preallocated_resources):
         """ Allocates preallocated SDRAM and specific cores to the trackers.\
-            Also builds an arbitrary core map for use throughout resource\
-            tracker.
+            Also counts the arbitrary cores preallocated on each chip for use\
+            throughout resource tracker.
 
         :param PreAllocatedResourceContainer preallocated_resources:
             the preallocated resources from the tools
-        :return: a mapping of chip to arbitrary core demands
-        :rtype: dict(tuple(int, int), int)
         """
 
-        # If there are no resources, return an empty dict which returns 0
+        # If there are no resources, there is nothing to do
         if preallocated_resources is None:
-            return defaultdict(lambda: 0)
+            return
 
         # remove SDRAM by removing from available SDRAM
         for sdram_pre_allocated in preallocated_resources.specific_sdram_usage:
             chip = sdram_pre_allocated.chip
             sdram = sdram_pre_allocated.sdram_usage.get_total_sdram(
                 self._plan_n_timesteps)
-            self._sdram_tracker[chip.x, chip.y] -= sdram
+            self._sdram[self._chip_rows[chip.x, chip.y]] -= sdram
 
         # remove specific cores from the tracker
         for specific_core in preallocated_resources.specific_core_resources:
             chip = specific_core.chip
-            processor_ids = specific_core.cores
-            if not (chip.x, chip.y) in self._core_tracker:
-                self._fill_in_core_tracker_for_chip((chip.x, chip.y), chip)
-            for processor_id in processor_ids:
-                self._core_tracker[chip.x, chip.y].remove(processor_id)
-
-        # create random_core_map
-        chip_to_arbitrary_core_requirement = defaultdict(lambda: 0)
+            row = self._chip_rows[chip.x, chip.y]
+            for processor_id in specific_core.cores:
+                if not self._is_core_free(row, processor_id):
+                    raise KeyError(processor_id)
+                self._take_core(row, processor_id)
+
+        # count the arbitrary cores needed
         for arbitrary_core in preallocated_resources.core_resources:
             chip = arbitrary_core.chip
-            n_cores = arbitrary_core.n_cores
-            if (chip.x, chip.y) in chip_to_arbitrary_core_requirement:
-                chip_to_arbitrary_core_requirement[chip.x, chip.y] += n_cores
-            else:
-                chip_to_arbitrary_core_requirement[chip.x, chip.y] = n_cores
+            self._n_cores_preallocated[self._chip_rows[chip.x, chip.y]] += \
+                arbitrary_core.n_cores
 
         # handle specific IP tags
         ordered_ip_tags = sorted(
@@ -286,8 +364,6 @@ class ResourceTracker(object):
             self._update_structures_for_reverse_ip_tag(
                 rip_tag.board, tag, rip_tag.port)
 
-        return chip_to_arbitrary_core_requirement
-
     @staticmethod
     def check_constraints(
             vertices, additional_placement_constraints=None):
@@ -378,13 +454,11 @@ class ResourceTracker(object):
         :param int y:
         :rtype: bool
         """
-        if not self._machine.is_chip_at(x, y):
+        row = self._chip_rows.get((x, y))
+        if row is None:
             return False
-        if (x, y) in self._core_tracker:
-            projected_id = len(self._core_tracker[x, y])
-        else:
-            projected_id = self._machine.get_chip_at(x, y).n_user_processors
-        return projected_id > self._n_cores_preallocated[x, y]
+        return bool(
+            self._n_free_cores[row] > self._n_cores_preallocated[row])
 
     def _get_usable_chips(self, chips, board_address):
         """ Get all chips that are available on a board given the constraints
@@ -433,9 +507,31 @@ class ResourceTracker(object):
                 if self._chip_available(x, y):
                     yield (x, y)
         else:
+            # The index only has chips with processors available
             for (x, y) in self._chips_available:
-                if self._chip_available(x, y):
-                    yield (x, y)
+                yield (x, y)
+
+    def _get_chips_with_sdram(self, chips, board_address, sdram):
+        """ Get the usable chips with at least the given SDRAM available; \
+            if not limited to some chips, these come straight from the index \
+            of chips with processors available, skipping those that are full
+
+        :param chips: iterable of tuples of (x, y) coordinates of chips to
+            look though for usable chips, or None to use all available chips
+        :type chips: iterable(tuple(int, int)) or None
+        :param board_address: the board address to check for usable chips on
+        :type board_address: str or None
+        :param int sdram: The SDRAM needed
+        :return: iterable of tuples of (x, y) coordinates of usable chips
+        :rtype: iterable(tuple(int, int))
+        :raise PacmanInvalidParameterException:
+            As :py:meth:`_get_usable_chips`
+        """
+        if chips is None and board_address is None:
+            return self._chips_available.chips_with_sdram(sdram)
+        return (
+            key for key in self._get_usable_chips(chips, board_address)
+            if self._sdram[self._chip_rows[key]] >= sdram)
 
     def _check_chip_not_used(self, chips):
         """
@@ -448,7 +544,8 @@ class ResourceTracker(object):
         :raises PacmanCanNotFindChipException:
         """
         for chip in chips:
-            if chip in self._chips_used:
+            row = self._chip_rows.get(chip)
+            if row is not None and self._chips_used[row]:
                 # Not a case of all the Chips never existed
                 return
         raise PacmanCanNotFindChipException(
@@ -472,7 +569,7 @@ class ResourceTracker(object):
         :return: True if there is enough SDRAM available, or False otherwise
         :rtype: bool
         """
-        return (self._sdram_tracker[chip.x, chip.y] >=
+        return (self._sdram_available(chip) >=
                 resources.sdram.get_total_sdram(self._plan_n_timesteps))
 
     def _sdram_available(self, chip):
@@ -482,7 +579,7 @@ class ResourceTracker(object):
         :return: the SDRAM available
         :rtype: int
         """
-        return self._sdram_tracker[chip.x, chip.y]
+        return int(self._sdram[self._chip_rows[chip.x, chip.y]])
 
     def sdram_avilable_on_chip(self, chip_x, chip_y):
         """ Get the available SDRAM on the chip at coordinates chip_x, chip_y
@@ -504,12 +601,40 @@ class ResourceTracker(object):
         """
 
         # TODO: Check for the best core; currently assumes all are the same
-        key = (chip.x, chip.y)
-        if key not in self._core_tracker:
-            for processor in chip.processors:
-                if not processor.is_monitor:
-                    return processor.processor_id
-        return next(iter(self._core_tracker[key]))
+        return self._first_free_core(self._chip_rows[chip.x, chip.y])
+
+    def _first_free_core(self, row):
+        """ Find the lowest processor ID available on a chip
+
+        :param int row: The row of the chip
+        :return: The processor ID, or None if none is available
+        :rtype: int or None
+        """
+        for word, bits in enumerate(self._free_cores[row].tolist()):
+            if bits:
+                return word * 32 + (bits & -bits).bit_length() - 1
+        return None
+
+    def _is_core_free(self, row, processor_id):
+        """ Check if a processor is available on a chip
+
+        :param int row: The row of the chip
+        :param int processor_id:
+        :rtype: bool
+        """
+        word, bit = divmod(processor_id, 32)
+        return (0 <= word < self._free_cores.shape[1] and
+                bool(int(self._free_cores[row, word]) >> bit & 1))
+
+    def _take_core(self, row, processor_id):
+        """ Mark an available processor of a chip as no longer available
+
+        :param int row: The row of the chip
+        :param int processor_id:
+        """
+        word, bit = divmod(processor_id, 32)
+        self._free_cores[row, word] &= 0xFFFFFFFF ^ (1 << bit)
+        self._n_free_cores[row] -= 1
 
     def _is_core_available(self, chip, key, processor_id):
         """ Check if there is a core available on a given chip given the\
@@ -538,38 +663,20 @@ class ResourceTracker(object):
         :rtype: int
         """
 
-        # If a specific processor has been requested, perform special checks
-        if processor_id is not None:
-
-            # If the chip has already had cores allocated...
-            if key in self._core_tracker:
-
-                # Check if there is enough space for preallocated cores,
-                # and that the processor specified is available
-                return int(
-                    len(self._core_tracker[key]) -
-                    self._n_cores_preallocated[key] > 0
-                    and processor_id in self._core_tracker[key])
+        row = self._chip_rows[key]
+        n_cores = int(
+            self._n_free_cores[row] - self._n_cores_preallocated[row])
 
-            # If here, the chip has no cores allocated, so check that there
-            # are enough cores on the chip for preallocated cores
-            elif chip.n_user_processors - self._n_cores_preallocated[key] > 0:
-
-                # Check that the processor is not a monitor core
-                processor = chip.get_processor_with_id(processor_id)
-                return int(processor is not None and not processor.is_monitor)
-
-            # If we get here, the core has been allocated
-            return 0
+        # If a specific processor has been requested, check that there is
+        # enough space for preallocated cores, and that the processor
+        # specified is available (which a monitor never is)
+        if processor_id is not None:
+            return int(n_cores > 0 and self._is_core_free(row, processor_id))
 
         # Check how many cores are available
         # TODO: Check the resources can be met with the processor
         # Currently assumes all processors are equal
-        if key in self._core_tracker:
-            n_cores = len(self._core_tracker[key])
-        else:
-            n_cores = sum(not proc.is_monitor for proc in chip.processors)
-        return n_cores - self._n_cores_preallocated[key]
+        return n_cores
 
     def _get_matching_ip_tag(
             self, chip, board_address, tag_id, ip_address, port, strip_sdp,
@@ -787,8 +894,12 @@ class ResourceTracker(object):
         :param ResourceContainer resources:
             the resources containing the SDRAM required
         """
-        self._sdram_tracker[chip.x, chip.y] -= \
-            resources.sdram.get_total_sdram(self._plan_n_timesteps)
+        row = self._chip_rows[chip.x, chip.y]
+        self._change_row(row)
+        self._sdram[row] -= resources.sdram.get_total_sdram(
+            self._plan_n_timesteps)
+        self._chips_available.update_sdram(
+            chip.x, chip.y, int(self._sdram[row]))
 
     def allocate_sdram(self, chip_x, chip_y, sdram_value):
         """ Allocates SDRAM value directly to a chip
@@ -798,12 +909,16 @@ class ResourceTracker(object):
         :param int sdram_value: the number of bytes to allocate
         :raises PacmanException: when the SDRAM can't be allocated
         """
-        if self._sdram_tracker[chip_x, chip_y] - sdram_value < 0:
+        row = self._chip_rows[chip_x, chip_y]
+        sdram = int(self._sdram[row])
+        if sdram - sdram_value < 0:
             raise PacmanException(self.ALLOCATION_SDRAM_ERROR.format(
-                sdram_value, chip_x, chip_y,
-                self._sdram_tracker[chip_x, chip_y]))
+                sdram_value, chip_x, chip_y, sdram))
         else:
-            self._sdram_tracker[chip_x, chip_y] -= sdram_value
+            self._change_row(row)
+            self._sdram[row] = sdram - sdram_value
+            self._chips_available.update_sdram(
+                chip_x, chip_y, sdram - sdram_value)
 
     def _allocate_core(self, chip, key, processor_id):
         """ Allocates a core on the given chip
@@ -815,44 +930,77 @@ class ResourceTracker(object):
         :type processor_id: int or None
         :rtype: int
         """
-        if key not in self._core_tracker:
-            self._fill_in_core_tracker_for_chip(key, chip)
+        row = self._chip_rows[key]
         if processor_id is not None:
-            self._core_tracker[key].remove(processor_id)
+            if not self._is_core_free(row, processor_id):
+                raise KeyError(processor_id)
         else:
             # TODO: Find a core that meets the resource requirements
-            processor_id = self._core_tracker[key].pop()
+            processor_id = self._first_free_core(row)
+        n_available = int(
+            self._n_free_cores[row] - self._n_cores_preallocated[row])
+        self._change_row(row)
+        self._take_core(row, processor_id)
 
         # update number tracker
-        if chip.virtual:
-            self._virtual_chips_with_n_cores_available[
-                len(self._core_tracker[key])] -= 1
-            self._virtual_chips_with_n_cores_available[
-                len(self._core_tracker[key]) - 1] += 1
-        else:
-            self._real_chips_with_n_cores_available[
-                len(self._core_tracker[key])] -= 1
-            self._real_chips_with_n_cores_available[
-                len(self._core_tracker[key]) - 1] += 1
+        self._update_n_cores_available(chip, n_available, n_available - 1)
 
-        if len(self._core_tracker[key]) == self._n_cores_preallocated[key]:
-            self._chips_available.remove(key)
+        if n_available == 1:
+            self._chips_available.remove(chip.x, chip.y)
 
         # update chip tracker
-        self._chips_used.add(key)
+        self._chips_used[row] = True
 
         # return processor ID
         return processor_id
 
-    def _fill_in_core_tracker_for_chip(self, key, chip):
+    def _allocate_cores(self, chip, key, n_cores):
+        """ Allocates the lowest available cores on the given chip
+
+        :param ~spinn_machine.Chip chip: The chip to allocate the resources of
+        :param tuple(int,int) key: The (x, y) coordinates of the chip
+        :param int n_cores:
+            The number of cores to allocate, which must be available
+        :return: The IDs of the processors allocated
+        :rtype: list(int)
         """
-        :param tuple(int,int) key:
-        :param ~spinn_machine.Chip chip:
+        row = self._chip_rows[key]
+        n_available = int(
+            self._n_free_cores[row] - self._n_cores_preallocated[row])
+        self._change_row(row)
+        processor_ids = list()
+        for word, bits in enumerate(self._free_cores[row].tolist()):
+            while bits and len(processor_ids) < n_cores:
+                lowest = bits & -bits
+                processor_ids.append(word * 32 + lowest.bit_length() - 1)
+                bits ^= lowest
+            self._free_cores[row, word] = bits
+        self._n_free_cores[row] -= n_cores
+
+        # update number tracker
+        self._update_n_cores_available(
+            chip, n_available, n_available - n_cores)
+
+        if n_available == n_cores:
+            self._chips_available.remove(chip.x, chip.y)
+
+        # update chip tracker
+        self._chips_used[row] = True
+        return processor_ids
+
+    def _update_n_cores_available(self, chip, old, new):
+        """ Move a chip between the counts of chips with n cores available
+
+        :param ~spinn_machine.Chip chip: The chip
+        :param int old: The number of cores that were available on the chip
+        :param int new: The number of cores now available on the chip
         """
-        self._core_tracker[key] = set()
-        for processor in chip.processors:
-            if not processor.is_monitor:
-                self._core_tracker[key].add(processor.processor_id)
+        if chip.virtual:
+            counts = self._virtual_chips_with_n_cores_available
+        else:
+            counts = self._real_chips_with_n_cores_available
+        counts[max(old, 0)] -= 1
+        counts[max(new, 0)] += 1
 
     def _allocate_tag(self, chip, board_address, tag_id):
         """ Allocate a tag given the constraints
@@ -932,6 +1080,7 @@ class ResourceTracker(object):
         if ip_tags is None or not ip_tags:
             return None
 
+        self._save_tags()
         allocations = list()
         for ip_tag in ip_tags:
 
@@ -1007,6 +1156,7 @@ class ResourceTracker(object):
         if reverse_ip_tags is None or not reverse_ip_tags:
             return None
 
+        self._save_tags()
         allocations = list()
         for reverse_ip_tag in reverse_ip_tags:
             (board_address, tag) = self._allocate_tag(
@@ -1241,16 +1391,22 @@ class ResourceTracker(object):
         :raises PacmanValueError:
             If there isn't a chip available that can take the allocation.
         """
+        # The tags do not depend on the chip, so are only checked once
+        sdram = resources.sdram.get_total_sdram(self._plan_n_timesteps)
+        if (self._are_ip_tags_available(board_address, ip_tags) and
+                self._are_reverse_ip_tags_available(
+                    board_address, reverse_ip_tags)):
+            usable_chips = self._get_chips_with_sdram(
+                chips, board_address, sdram)
+        else:
+            usable_chips = ()
+
         # Find the first usable chip which fits the resources
-        for (chip_x, chip_y) in self._get_usable_chips(chips, board_address):
+        for (chip_x, chip_y) in usable_chips:
             chip = self._machine.get_chip_at(chip_x, chip_y)
             key = (chip_x, chip_y)
 
-            if (self._is_core_available(chip, key, processor_id) and
-                    self._is_sdram_available(chip, resources) and
-                    self._are_ip_tags_available(board_address, ip_tags) and
-                    self._are_reverse_ip_tags_available(board_address,
-                                                        reverse_ip_tags)):
+            if self._is_core_available(chip, key, processor_id):
                 processor_id = self._allocate_core(chip, key, processor_id)
                 self._allocate_sdram(chip, resources)
                 ip_tags_allocated = self._allocate_ip_tags(
@@ -1259,6 +1415,7 @@ class ResourceTracker(object):
                     chip, board_address, reverse_ip_tags)
                 if vertices is not None:
                     for vertex in vertices:
+                        self._save_vertex(vertex)
                         self._vertex_to_chip_map[vertex] = (chip.x, chip.y)
                 return (chip.x, chip.y, processor_id, ip_tags_allocated,
                         reverse_ip_tags_allocated)
@@ -1298,6 +1455,83 @@ class ResourceTracker(object):
                 n_cores, n_tags, n_chips, max_sdram,
                 all_n_cores, all_n_tags, all_n_chips, all_max_sdram))
 
+    def allocate_many(self, resources, count, chips=None):
+        """ Allocate the same resources to a number of cores, in one pass\
+            over the chips; each chip is filled before moving on to the next,\
+            so the cores are those that calling :py:meth:`allocate_resources`\
+            for each in turn would give.
+
+        :param ResourceContainer resources:
+            The resources to be allocated to each core, which must not
+            include any IP tags or reverse IP tags
+        :param int count: The number of cores to allocate
+        :param iterable(tuple(int,int)) chips:
+            An iterable of (x, y) tuples of chips that are to be used
+        :return: The x and y coordinates of the chip and the processor ID of
+            each core allocated
+        :rtype: list(tuple(int, int, int))
+        :raises PacmanInvalidParameterException:
+            If the resources include tags, or if the chips are given and
+            their cores run out before all the cores are allocated, as
+            :py:meth:`allocate_resources` would raise; none of the cores are
+            allocated
+        :raises PacmanValueError:
+            If there aren't enough resources for all the cores, in which case
+            none of them are allocated
+        """
+        if resources.iptags or resources.reverse_iptags:
+            raise PacmanInvalidParameterException(
+                "resources", str(resources),
+                "Resources with tags must be allocated one at a time")
+        sdram = resources.sdram.get_total_sdram(self._plan_n_timesteps)
+        allocations = list()
+        if count <= 0:
+            return allocations
+
+        # If not all the cores fit, none are allocated
+        self.checkpoint()
+        try:
+            for key in self._get_chips_with_sdram(chips, None, sdram):
+                (chip_x, chip_y) = key
+                chip = self._machine.get_chip_at(chip_x, chip_y)
+                row = self._chip_rows[key]
+
+                # Take as many cores as fit on the chip
+                n_cores = min(
+                    count - len(allocations),
+                    self._n_cores_available(chip, key, None))
+                if sdram:
+                    n_cores = min(n_cores, int(self._sdram[row]) // sdram)
+                for processor_id in self._allocate_cores(chip, key, n_cores):
+                    allocations.append((chip_x, chip_y, processor_id))
+                self._sdram[row] -= n_cores * sdram
+                self._chips_available.update_sdram(
+                    chip_x, chip_y, int(self._sdram[row]))
+                if len(allocations) == count:
+                    break
+            if len(allocations) < count and chips is not None:
+                # Raises as allocating the next core by itself would if
+                # there are no cores left on the chips
+                for _ in self._get_usable_chips(chips, None):
+                    pass
+        except Exception:
+            self.rollback()
+            raise
+        if len(allocations) < count:
+            self.rollback()
+            n_cores, n_chips, max_sdram, n_tags = self._available_resources(
+                self._get_usable_chips(chips, None))
+            raise PacmanValueError(
+                "No resources available to allocate {} cores with SDRAM: {}"
+                " each; only {} would fit\n"
+                "    Resources available:\n"
+                "      {} Cores and {} tags on {} chips,"
+                " largest SDRAM space: {}".format(
+                    count, sdram, len(allocations), n_cores, n_tags, n_chips,
+                    max_sdram))
+        self.commit()
+        return allocations
+
     def _available_resources(self, usable_chips):
         """ Describe how much of the various resource types are available.
 
@@ -1311,14 +1545,10 @@ class ResourceTracker(object):
         n_chips = 0
         n_tags = 0
         for x, y in usable_chips:
-            chip = self._machine.get_chip_at(x, y)
-            if (x, y) in self._core_tracker:
-                n_cores += (len(self._core_tracker[x, y]) -
-                            self._n_cores_preallocated[x, y])
-            else:
-                n_cores += (chip.n_user_processors -
-                            self._n_cores_preallocated[x, y])
-            sdram_available = self._sdram_available(chip)
+            row = self._chip_rows[x, y]
+            n_cores += int(
+                self._n_free_cores[row] - self._n_cores_preallocated[row])
+            sdram_available = int(self._sdram[row])
             if sdram_available > max_sdram:
                 max_sdram = sdram_available
             n_chips += 1
@@ -1372,21 +1602,16 @@ class ResourceTracker(object):
                 board_address, reverse_ip_tags):
             return ResourceContainer()
 
-        area_code = None
+        board_rows = None
         if board_address is not None:
-            if board_address not in self._ethernet_chips:
-                raise PacmanInvalidParameterException(
-                    "board_address", str(board_address),
-                    "Unrecognised board address")
-            eth_chip = self._machine.get_chip_at(
-                *self._ethernet_chips[board_address])
-            area_code = set(self._machine.get_existing_xys_on_board(eth_chip))
+            board_rows = self._get_board_rows(board_address)
 
         (x, y, p) = self.get_chip_and_core(constraints)
         if x is not None and y is not None:
             if not self._chip_available(x, y):
                 return ResourceContainer()
-            if area_code is not None and (x, y) not in area_code:
+            if (board_rows is not None and
+                    self._chip_rows[x, y] not in board_rows):
                 return ResourceContainer()
             best_processor_id = p
             chip = self._machine.get_chip_at(x, y)
@@ -1404,7 +1629,74 @@ class ResourceTracker(object):
                 ConstantSDRAM(sdram_available),
                 CPUCyclesPerTickResource(max_cpu_available))
 
-        return self.get_maximum_resources_available(area_code)
+        if board_rows is not None:
+            return self._maximum_resources_of_row(
+                self._best_row_of(board_rows))
+        return self.get_maximum_resources_available()
+
+    def _get_board_rows(self, board_address):
+        """ Get the rows of the chips on a board, working them out the\
+            first time each board is asked for
+
+        :param str board_address: The address of the board
+        :return: The rows in increasing order
+        :rtype: ~numpy.ndarray
+        :raises PacmanInvalidParameterException:
+            If there is no board with the address
+        """
+        rows = self._board_rows.get(board_address)
+        if rows is None:
+            if board_address not in self._ethernet_chips:
+                raise PacmanInvalidParameterException(
+                    "board_address", str(board_address),
+                    "Unrecognised board address")
+            eth_chip = self._machine.get_chip_at(
+                *self._ethernet_chips[board_address])
+            rows = self._rows_of(
+                self._machine.get_existing_xys_on_board(eth_chip))
+            self._board_rows[board_address] = rows
+        return rows
+
+    def _rows_of(self, xys):
+        """ Get the rows of the chips of the tracker among some coordinates
+
+        :param iterable(tuple(int,int)) xys: The coordinates
+        :return: The rows in increasing order
+        :rtype: ~numpy.ndarray
+        """
+        return numpy.unique(numpy.array(
+            [self._chip_rows[xy] for xy in xys if xy in self._chip_rows],
+            dtype=numpy.int64))
+
+    def _best_row_of(self, rows):
+        """ Find the first of some rows with the most SDRAM available of\
+            those with processors available
+
+        :param ~numpy.ndarray rows: The rows in increasing order
+        :return: The row, or None if no chip has processors available
+        :rtype: int or None
+        """
+        sdram = numpy.where(
+            self._n_free_cores[rows] > self._n_cores_preallocated[rows],
+            self._sdram[rows], -1)
+        if not len(sdram) or sdram.max() < 0:
+            return None
+        return int(rows[numpy.argmax(sdram)])
+
+    def _summarise_changed_blocks(self):
+        """ Remake the summaries of the blocks of rows with chips that\
+            have changed since they were last summarised
+        """
+        size = self._SUMMARY_BLOCK_SIZE
+        for block in self._changed_blocks:
+            rows = slice(block * size, (block + 1) * size)
+            sdram = numpy.where(
+                self._n_free_cores[rows] > self._n_cores_preallocated[rows],
+                self._sdram[rows], -1)
+            best = int(numpy.argmax(sdram))
+            self._block_sdram[block] = sdram[best]
+            self._block_row[block] = block * size + best
+        self._changed_blocks.clear()
 
     def get_maximum_resources_available(self, area_code=None):
         """ Get the maximum resources available
@@ -1414,23 +1706,42 @@ class ResourceTracker(object):
         :return: a resource which shows max resources available
         :rtype: ResourceContainer
         """
-        # Go through the chips in order of sdram
-        for ((chip_x, chip_y), sdram_available) in self._sdram_tracker.items():
-            if self._chip_available(chip_x, chip_y) and (
-                    area_code is None or (chip_x, chip_y) in area_code):
-                chip = self._machine.get_chip_at(chip_x, chip_y)
-                best_processor_id = self._best_core_available(chip)
-                processor = chip.get_processor_with_id(best_processor_id)
-                max_dtcm_available = processor.dtcm_available
-                max_cpu_available = processor.cpu_cycles_available
-                return ResourceContainer(
-                    DTCMResource(max_dtcm_available),
-                    ConstantSDRAM(sdram_available),
-                    CPUCyclesPerTickResource(max_cpu_available))
+        # Find the available chip with the most SDRAM, which without an area
+        # is the best of the summaries of the blocks of rows
+        if area_code is not None:
+            return self._maximum_resources_of_row(
+                self._best_row_of(self._rows_of(area_code)))
+        self._summarise_changed_blocks()
+        if not len(self._block_sdram):
+            return ResourceContainer()
+        block = int(numpy.argmax(self._block_sdram))
+        if self._block_sdram[block] < 0:
+            return ResourceContainer()
+        return self._maximum_resources_of_row(int(self._block_row[block]))
+
+    def _maximum_resources_of_row(self, row):
+        """ Get the resources available on a chip
+
+        :param row: The row of the chip, or None for no chip
+        :type row: int or None
+        :return: a resource which shows the resources available
+        :rtype: ResourceContainer
+        """
+        if row is None:
+            # If nothing is available, return nothing
+            return ResourceContainer()
 
         # Send the maximums
-        # If nothing is available, return nothing
-        return ResourceContainer()
+        chip_x, chip_y = self._xys[row].tolist()
+        chip = self._machine.get_chip_at(chip_x, chip_y)
+        best_processor_id = self._best_core_available(chip)
+        processor = chip.get_processor_with_id(best_processor_id)
+        max_dtcm_available = processor.dtcm_available
+        max_cpu_available = processor.cpu_cycles_available
+        return ResourceContainer(
+            DTCMResource(max_dtcm_available),
+            ConstantSDRAM(int(self._sdram[row])),
+            CPUCyclesPerTickResource(max_cpu_available))
 
     def unallocate_resources(self, chip_x, chip_y, processor_id, resources,
                              ip_tags, reverse_ip_tags, vertices=None):
@@ -1449,33 +1760,36 @@ class ResourceTracker(object):
         :rtype: None
         """
 
-        self._chips_available.add((chip_x, chip_y))
-        self._sdram_tracker[chip_x, chip_y] += \
-            resources.sdram.get_total_sdram(self._plan_n_timesteps)
+        row = self._chip_rows[chip_x, chip_y]
+        chip = self._machine.get_chip_at(chip_x, chip_y)
+        self._change_row(row)
+        self._sdram[row] += resources.sdram.get_total_sdram(
+            self._plan_n_timesteps)
 
         # clear vertex chip tracker
         if vertices is not None:
             for vertex in vertices:
+                self._save_vertex(vertex)
                 del self._vertex_to_chip_map[vertex]
 
-        # update number tracker
-        if self._machine.get_chip_at(chip_x, chip_y).virtual:
-            self._virtual_chips_with_n_cores_available[
-                len(self._core_tracker[chip_x, chip_y])] -= 1
-            self._virtual_chips_with_n_cores_available[
-                len(self._core_tracker[chip_x, chip_y]) + 1] += 1
-        else:
-            self._real_chips_with_n_cores_available[
-                len(self._core_tracker[chip_x, chip_y])] -= 1
-            self._real_chips_with_n_cores_available[
-                len(self._core_tracker[chip_x, chip_y]) + 1] += 1
+        if ip_tags or reverse_ip_tags:
+            self._save_tags()
 
-        self._core_tracker[chip_x, chip_y].add(processor_id)
+        # update number tracker
+        if not self._is_core_free(row, processor_id):
+            n_available = int(
+                self._n_free_cores[row] - self._n_cores_preallocated[row])
+            self._update_n_cores_available(
+                chip, n_available, n_available + 1)
+            word, bit = divmod(processor_id, 32)
+            self._free_cores[row, word] |= 1 << bit
+            self._n_free_cores[row] += 1
+        if self._chip_available(chip_x, chip_y):
+            self._chips_available.add(chip_x, chip_y, int(self._sdram[row]))
 
         # check if chip used needs updating
-        if (len(self._core_tracker[chip_x, chip_y]) ==
-                self._machine.get_chip_at(chip_x, chip_y).n_user_processors):
-            self._chips_used.remove((chip_x, chip_y))
+        if self._n_free_cores[row] == chip.n_user_processors:
+            self._chips_used[row] = False
 
         # Deallocate the IP tags
         if ip_tags is not None:
@@ -1504,6 +1818,118 @@ class ResourceTracker(object):
                     self._reverse_ip_tag_listen_port.remove(
                         (board_address, port))
 
+    def checkpoint(self):
+        """ Mark the current state of the tracker, so that allocations and\
+            unallocations made after it can be undone with\
+            :py:meth:`rollback` or kept with :py:meth:`commit`.
+
+        Checkpoints can be nested; each rollback or commit ends the most
+        recent one. Only the chips that are changed after a checkpoint are
+        copied, when they are first changed, so a checkpoint costs nothing
+        until it is used.
+        """
+        self._checkpoints.append(_Checkpoint())
+
+    def rollback(self):
+        """ Undo all allocations and unallocations made since the most\
+            recent checkpoint, and end that checkpoint.
+
+        :raises PacmanException: If there is no checkpoint
+        """
+        if not self._checkpoints:
+            raise PacmanException("There is no checkpoint to roll back to")
+        checkpoint = self._checkpoints.pop()
+
+        for row, (sdram, free_cores, n_free_cores, used) in \
+                checkpoint.rows.items():
+            x, y = self._xys[row].tolist()
+            n_available = int(
+                self._n_free_cores[row] - self._n_cores_preallocated[row])
+            self._changed_blocks.add(row // self._SUMMARY_BLOCK_SIZE)
+            self._sdram[row] = sdram
+            self._free_cores[row] = free_cores
+            self._n_free_cores[row] = n_free_cores
+            self._chips_used[row] = used
+            self._update_n_cores_available(
+                self._machine.get_chip_at(x, y), n_available,
+                n_free_cores - int(self._n_cores_preallocated[row]))
+            if self._chip_available(x, y):
+                self._chips_available.add(x, y, sdram)
+            else:
+                self._chips_available.remove(x, y)
+
+        for vertex, xy in checkpoint.vertices.items():
+            if xy is None:
+                self._vertex_to_chip_map.pop(vertex, None)
+            else:
+                self._vertex_to_chip_map[vertex] = xy
+
+        if checkpoint.tags is not None:
+            (self._tags_by_board, self._boards_with_ip_tags,
+             self._ip_tags_address_traffic, self._address_and_traffic_ip_tag,
+             self._ip_tags_strip_sdp_and_port,
+             self._reverse_ip_tag_listen_port,
+             self._listen_port_reverse_ip_tag,
+             self._n_ip_tag_allocations) = checkpoint.tags
+
+    def commit(self):
+        """ Keep all allocations and unallocations made since the most\
+            recent checkpoint, and end that checkpoint.  If there is an\
+            earlier checkpoint, a rollback to it will still undo them.
+
+        :raises PacmanException: If there is no checkpoint
+        """
+        if not self._checkpoints:
+            raise PacmanException("There is no checkpoint to commit")
+        checkpoint = self._checkpoints.pop()
+        if self._checkpoints:
+            self._checkpoints[-1].merge(checkpoint)
+
+    def _change_row(self, row):
+        """ Note that the state of a chip is about to change, so that the\
+            summary of its block is remade, and so that its state is copied\
+            into the most recent checkpoint, if there is one and the chip has\
+            not changed since it was made
+
+        :param int row: The row of the chip
+        """
+        self._changed_blocks.add(row // self._SUMMARY_BLOCK_SIZE)
+        if self._checkpoints:
+            rows = self._checkpoints[-1].rows
+            if row not in rows:
+                rows[row] = (
+                    int(self._sdram[row]), self._free_cores[row].copy(),
+                    int(self._n_free_cores[row]), bool(self._chips_used[row]))
+
+    def _save_vertex(self, vertex):
+        """ Copy the chip of a vertex into the most recent checkpoint, if\
+            there is one and the vertex has not changed since it was made
+
+        :param vertex:
+        """
+        if self._checkpoints:
+            vertices = self._checkpoints[-1].vertices
+            if vertex not in vertices:
+                vertices[vertex] = self._vertex_to_chip_map.get(vertex)
+
+    def _save_tags(self):
+        """ Copy the state of the tags into the most recent checkpoint, if\
+            there is one and the tags have not changed since it was made
+        """
+        if self._checkpoints and self._checkpoints[-1].tags is None:
+            self._checkpoints[-1].tags = (
+                dict((board_address, set(tags))
+                     for board_address, tags in self._tags_by_board.items()),
+                OrderedSet(self._boards_with_ip_tags),
+                defaultdict(set, (
+                    (key, set(tags)) for key, tags in
+                    self._ip_tags_address_traffic.items())),
+                dict(self._address_and_traffic_ip_tag),
+                dict(self._ip_tags_strip_sdp_and_port),
+                set(self._reverse_ip_tag_listen_port),
+                dict(self._listen_port_reverse_ip_tag),
+                dict(self._n_ip_tag_allocations))
+
     def is_chip_available(self, chip_x, chip_y):
         """ Check if a given chip is available
 
@@ -1520,7 +1946,7 @@ class ResourceTracker(object):
 
         :rtype: set(tuple(int,int))
         """
-        return self._chips_used
+        return set(map(tuple, self._xys[self._chips_used].tolist()))
 
     @property
     def chips_used(self):
@@ -1528,7 +1954,7 @@ class ResourceTracker(object):
 
         :rtype: int
         """
-        return len(self._chips_used)
+        return int(numpy.count_nonzero(self._chips_used))
 
     def chip_of(self, vertex):
         """ returns the chip a vertex is associated with
@@ -1538,3 +1964,36 @@ class ResourceTracker(object):
         :return: tuple of chip x and chip y values, or None.
         """
         return self._vertex_to_chip_map.get(vertex, None)
+
+
+class _Checkpoint(object):
+    """ The state of what has changed in a :py:class:`ResourceTracker` \
+        since a checkpoint, as it was when the checkpoint was made.
+    """
+
+    __slots__ = [
+        # The (SDRAM, free core words, number of free cores, used) of each
+        # chip changed, by row
+        "rows",
+        # The chip of each vertex changed, or None if it had no chip
+        "vertices",
+        # A copy of all the tag state, or None if no tag has changed
+        "tags"]
+
+    def __init__(self):
+        self.rows = dict()
+        self.vertices = dict()
+        self.tags = None
+
+    def merge(self, later):
+        """ Add the state of a later checkpoint of anything that has not\
+            changed since this one was made
+
+        :param _Checkpoint later:
+        """
+        for row, state in later.rows.items():
+            self.rows.setdefault(row, state)
+        for vertex, xy in later.vertices.items():
+            self.vertices.setdefault(vertex, xy)
+        if self.tags is None:
+            self.tags = later.tags
@@ -0,0 +1,243 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Benchmark of the routing table compressors.
+
+Every compressor is run on each chip's table of one or more corpora of
+routing tables, recording the time taken, the peak memory allocated, and the
+number of entries after compression. The results are written as JSON so they
+can be compared between runs::
+
+    python -m pacman_integration_tests.compression_benchmark \\
+        --corpus recorded --corpus synthetic --output results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from spinn_machine import MulticastRoutingEntry
+from pacman.model.routing_tables import (
+    MulticastRoutingTables, UnCompressedMulticastRoutingTable)
+from pacman.model.routing_tables.multicast_routing_tables import (
+    from_json, iter_tables)
+from pacman.operations.router_compressors import (
+    CheckedUnorderedPairCompressor, PairCompressor, UnorderedPairCompressor)
+from pacman.operations.router_compressors.basic_route_merger import (
+    BasicRouteMerger)
+from pacman.operations.router_compressors.clash_compressor import (
+    ClashCompressor)
+from pacman.operations.router_compressors.hybrid_compressor import (
+    HybridCompressor)
+from pacman.operations.router_compressors.malloc_based_route_merger import (
+    MallocBasedRouteMerger)
+from pacman.operations.router_compressors.ordered_covering_router_compressor \
+    import OrderedCoveringCompressor
+from pacman.operations.router_compressors.routing_compression_checker import (
+    compare_tables)
+
+#: The compressors that can be benchmarked, by name
+COMPRESSORS = OrderedDict([
+    ("PairCompressor", PairCompressor),
+    ("UnorderedPairCompressor", UnorderedPairCompressor),
+    ("CheckedUnorderedPairCompressor", CheckedUnorderedPairCompressor),
+    ("OrderedCoveringCompressor", OrderedCoveringCompressor),
+    ("HybridCompressor", HybridCompressor),
+    ("ClashCompressor", ClashCompressor),
+    ("BasicRouteMerger", BasicRouteMerger),
+    ("MallocBasedRouteMerger", MallocBasedRouteMerger)])
+
+#: The recorded tables shipped with the integration tests
+RECORDED_TABLES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "malloc_hard_routing_tables.json.gz")
+
+
+def synthetic_tables(
+        n_chips=4, n_vertices=2000, vertices_per_population=50,
+        n_routes=16, seed=0):
+    """ Generate tables in the style of the key allocators; each machine\
+        vertex has a block of 256 keys and the vertices of a population are\
+        mostly sent the same way.
+
+    :param int n_chips: The number of tables to make
+    :param int n_vertices: The number of entries in each table
+    :param int vertices_per_population:
+        The number of consecutive vertices which usually share a route
+    :param int n_routes: The number of different routes used on each chip
+    :param int seed: The seed of the random number generator
+    :rtype: MulticastRoutingTables
+    """
+    rng = random.Random(seed)
+    tables = MulticastRoutingTables()
+    for x in range(n_chips):
+        routes = [rng.randrange(1, 1 << 24) for _ in range(n_routes)]
+        table = UnCompressedMulticastRoutingTable(x, 0)
+        route = routes[0]
+        for vertex in range(n_vertices):
+            if vertex % vertices_per_population == 0 or rng.random() < 0.05:
+                route = rng.choice(routes)
+            table.add_multicast_routing_entry(MulticastRoutingEntry(
+                vertex << 8, 0xFFFFFF00, defaultable=False,
+                spinnaker_route=route))
+        tables.add_routing_table(table)
+    return tables
+
+
+def load_corpus(name):
+    """ Get a corpus of tables by name.
+
+    :param str name: "recorded", "synthetic" or the path of a JSON file
+        (optionally gzipped, and read from its binary sidecar if it has one)
+        written with
+        :py:func:`~pacman.model.routing_tables.multicast_routing_tables.write_json`
+    :rtype: MulticastRoutingTables
+    """
+    if name == "recorded":
+        return from_json(RECORDED_TABLES)
+    if name == "synthetic":
+        return synthetic_tables()
+    return MulticastRoutingTables(iter_tables(name))
+
+
+def _compress(compressor_class, table):
+    """ Compress a single table, hiding any output of the compressor.
+
+    :param type compressor_class:
+    :param MulticastRoutingTable table:
+    :rtype: MulticastRoutingTable
+    """
+    quiet = io.StringIO()
+    with contextlib.redirect_stdout(quiet), contextlib.redirect_stderr(quiet):
+        compressed = compressor_class()(MulticastRoutingTables([table]))
+    return compressed.get_routing_table_for_chip(table.x, table.y)
+
+
+def benchmark_table(
+        compressor_name, table, measure_memory=True, check=True):
+    """ Run one compressor on one chip's table.
+
+    :param str compressor_name: A key of :py:data:`COMPRESSORS`
+    :param MulticastRoutingTable table:
+    :param bool measure_memory:
+        Whether to compress the table a second time, tracing the allocations
+    :param bool check:
+        Whether to check the compressed table against the original
+    :return: The result, which can be converted to JSON
+    :rtype: dict
+    """
+    compressor_class = COMPRESSORS[compressor_name]
+    result = OrderedDict([
+        ("compressor", compressor_name), ("x", table.x), ("y", table.y),
+        ("entries_before", table.number_of_entries),
+        ("entries_after", None), ("seconds", None), ("peak_bytes", None),
+        ("valid", None), ("error", None)])
+    try:
+        start = time.perf_counter()
+        compressed = _compress(compressor_class, table)
+        result["seconds"] = time.perf_counter() - start
+        result["entries_after"] = compressed.number_of_entries
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                _compress(compressor_class, table)
+                result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        if check:
+            try:
+                compare_tables(table, compressed)
+                result["valid"] = True
+            except Exception as ex:  # pylint: disable=broad-except
+                result["valid"] = False
+                result["error"] = str(ex)
+    except Exception as ex:  # pylint: disable=broad-except
+        # Record the failure and carry on with the other tables
+        result["error"] = "{}: {}".format(type(ex).__name__, ex)
+    return result
+
+
+def run_benchmark(
+        corpora, compressor_names=None, measure_memory=True, check=True,
+        log=None):
+    """ Run compressors on every table of some corpora.
+
+    :param list(str) corpora: Names as passed to :py:func:`load_corpus`
+    :param compressor_names: The compressors to run, or None for all
+    :type compressor_names: list(str) or None
+    :param bool measure_memory: See :py:func:`benchmark_table`
+    :param bool check: See :py:func:`benchmark_table`
+    :param log: Where to write progress, if anywhere
+    :type log: ~io.TextIOBase or None
+    :return: One result per corpus, compressor and chip
+    :rtype: list(dict)
+    """
+    if compressor_names is None:
+        compressor_names = list(COMPRESSORS)
+    results = list()
+    for corpus in corpora:
+        tables = load_corpus(corpus)
+        for compressor_name in compressor_names:
+            for table in tables:
+                result = benchmark_table(
+                    compressor_name, table, measure_memory, check)
+                result["corpus"] = corpus
+                results.append(result)
+                if log is not None:
+                    log.write("{} {} ({}, {}): {} -> {} in {}s {}\n".format(
+                        corpus, compressor_name, table.x, table.y,
+                        result["entries_before"], result["entries_after"],
+                        result["seconds"], result["error"] or ""))
+    return results
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the routing table compressors")
+    parser.add_argument(
+        "--corpus", action="append",
+        help="recorded, synthetic or a path to a JSON table file; "
+        "may be repeated (default: recorded and synthetic)")
+    parser.add_argument(
+        "--compressor", action="append", choices=list(COMPRESSORS),
+        help="a compressor to run; may be repeated (default: all)")
+    parser.add_argument(
+        "--output", help="file to write the JSON results to "
+        "(default: standard output)")
+    parser.add_argument(
+        "--no-memory", action="store_true",
+        help="do not measure the peak memory")
+    parser.add_argument(
+        "--no-check", action="store_true",
+        help="do not check the compressed tables")
+    options = parser.parse_args(args)
+    results = run_benchmark(
+        options.corpus or ["recorded", "synthetic"], options.compressor,
+        not options.no_memory, not options.no_check, log=sys.stderr)
+    if options.output is None:
+        json.dump(results, sys.stdout, indent=1)
+    else:
+        with open(options.output, "w") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
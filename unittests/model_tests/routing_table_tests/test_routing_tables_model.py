@@ -13,6 +13,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+import shutil
+import tempfile
 import unittest
 
 from pacman.model.graphs.machine import MulticastEdgePartition
@@ -20,11 +23,12 @@ from spinn_machine import MulticastRoutingEntry
 from pacman.model.routing_tables import (
     UnCompressedMulticastRoutingTable, MulticastRoutingTables)
 from pacman.model.routing_tables.multicast_routing_tables import (
-    to_json, from_json)
+    to_json, from_json, iter_json, iter_tables, write_json, SIDECAR_SUFFIX)
 from pacman.model.routing_table_by_partition import (
     MulticastRoutingTableByPartition, MulticastRoutingTableByPartitionEntry)
 from pacman.exceptions import (
-    PacmanAlreadyExistsException, PacmanInvalidParameterException)
+    PacmanAlreadyExistsException, PacmanConfigurationException,
+    PacmanInvalidParameterException)
 from pacman.utilities import file_format_schemas
 
 
@@ -159,6 +163,33 @@ class TestRoutingTable(unittest.TestCase):
         self.assertEqual(new_tables.get_routing_table_for_chip(1, 0), t2)
         self.assertEqual(new_tables.get_routing_table_for_chip(2, 0), None)
 
+    def test_streamed_json(self):
+        tables = [
+            UnCompressedMulticastRoutingTable(x, 1, [
+                MulticastRoutingEntry(
+                    key, 0xFFFFFFF0, defaultable=key % 3 == 0,
+                    spinnaker_route=key * x)
+                for key in range(0, 16 * x, 16)])
+            for x in range(4)]
+        directory = tempfile.mkdtemp()
+        try:
+            for name in ("tables.json", "tables.json.gz"):
+                filename = os.path.join(directory, name)
+                write_json(iter(tables), filename, sidecar=True)
+                self.assertEqual(tables, list(iter_json(filename)))
+                self.assertTrue(os.path.exists(filename + SIDECAR_SUFFIX))
+                self.assertEqual(tables, list(iter_tables(filename)))
+                self.assertEqual(
+                    tables, list(from_json(filename).routing_tables))
+
+            filename = os.path.join(directory, "bad.json")
+            with open(filename, "w") as f:
+                f.write('[{"x": 0, "y": 0, "entries": []}')
+            with self.assertRaises(PacmanConfigurationException):
+                list(iter_tables(filename))
+        finally:
+            shutil.rmtree(directory)
+
     def test_new_multicast_routing_tables_empty(self):
         MulticastRoutingTables()
 
@@ -0,0 +1,113 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import random
+import tempfile
+import unittest
+from spinn_machine.virtual_machine import virtual_machine
+from pacman.model.graphs.machine import (
+    MachineGraph, MachineEdge, MulticastEdgePartition, SimpleMachineVertex)
+from pacman.model.placements import Placements, Placement
+from pacman.model.resources import ResourceContainer
+from pacman.model.routing_info import DictBasedMachinePartitionNKeysMap
+from pacman.model.routing_table_by_partition import (
+    MulticastRoutingTableByPartition, MulticastRoutingTableByPartitionEntry)
+from pacman.operations.algorithm_reports.routing_metrics import (
+    routing_metrics, routing_metrics_report)
+from pacman.operations.router_algorithms import NerRoute
+
+
+class TestRoutingMetrics(unittest.TestCase):
+
+    def test_hand_routed(self):
+        machine = virtual_machine(8, 8)
+        tables = MulticastRoutingTableByPartition()
+        # "a" goes from (0, 0) east to core 3 of (2, 0) and north from
+        # (1, 0) to core 1 of (1, 1)
+        for x, y, links, processors in [
+                (0, 0, [0], []), (1, 0, [0, 2], []), (2, 0, [], [3]),
+                (1, 1, [], [1])]:
+            tables.add_path_entry(MulticastRoutingTableByPartitionEntry(
+                links, processors), x, y, "a")
+        # "b" goes from (2, 0) west to core 1 of (0, 0)
+        for x, y, links, processors in [
+                (2, 0, [3], []), (1, 0, [3], []), (0, 0, [], [1])]:
+            tables.add_path_entry(MulticastRoutingTableByPartitionEntry(
+                links, processors), x, y, "b")
+        n_keys_map = DictBasedMachinePartitionNKeysMap()
+        n_keys_map.set_n_keys_for_partition("a", 4)
+        n_keys_map.set_n_keys_for_partition("b", 2)
+
+        metrics = routing_metrics(tables, machine, n_keys_map)
+        self.assertEqual(metrics.n_routes, 2)
+        self.assertEqual(metrics.total_links, 5)
+        self.assertEqual(metrics.link_load(0, 0, 0), 4)
+        self.assertEqual(metrics.link_load(1, 0, 3), 2)
+        self.assertEqual(metrics.link_load(1, 0, 1), 0)
+        self.assertEqual(metrics.max_link_load, 4)
+        self.assertEqual(metrics.mean_link_load, 16 / 5)
+        self.assertEqual(metrics.entries_on_chip(1, 0), 2)
+        self.assertEqual(metrics.entries_on_chip(1, 1), 1)
+        self.assertEqual(metrics.max_chip_entries, 2)
+        self.assertEqual(metrics.max_hops, 2)
+        self.assertEqual(metrics.mean_hops, 2)
+        self.assertEqual(metrics.max_steiner_ratio, 1.5)
+        self.assertEqual(metrics.mean_steiner_ratio, 1.25)
+        self.assertEqual(metrics.link_hotspots(2), [
+            (0, 0, 0, 4), (1, 0, 0, 4)])
+        self.assertEqual(metrics.chip_hotspots(10), [
+            (0, 0, 2), (1, 0, 2), (2, 0, 2), (1, 1, 1)])
+
+        # Without the number of keys, each partition counts once
+        metrics = routing_metrics(tables, machine)
+        self.assertEqual(metrics.link_load(0, 0, 0), 1)
+        self.assertEqual(metrics.max_link_load, 1)
+
+    def test_router_output(self):
+        machine = virtual_machine(8, 8, down_chips=[(3, 3)])
+        graph = MachineGraph("Test")
+        placements = Placements()
+        vertices = list()
+        for chip in machine.chips:
+            vertex = SimpleMachineVertex(resources=ResourceContainer())
+            graph.add_vertex(vertex)
+            placements.add_placement(Placement(vertex, chip.x, chip.y, 1))
+            vertices.append(vertex)
+        rng = random.Random(0)
+        for vertex in vertices:
+            graph.add_outgoing_edge_partition(
+                MulticastEdgePartition(identifier="Test", pre_vertex=vertex))
+            for vertex_to in rng.sample(vertices, 5):
+                graph.add_edge(MachineEdge(vertex, vertex_to), "Test")
+        tables = NerRoute()(graph, machine, placements)
+
+        report_folder = tempfile.mkdtemp()
+        metrics = routing_metrics_report(
+            tables, machine, report_folder=report_folder)
+        self.assertTrue(os.path.exists(
+            os.path.join(report_folder, "routing_metrics.rpt")))
+        self.assertEqual(metrics.n_routes, len(vertices))
+        self.assertEqual(metrics.total_links, metrics.link_loads.sum())
+        self.assertGreaterEqual(metrics.mean_steiner_ratio, 1)
+        self.assertEqual(
+            metrics.chip_entries.sum(),
+            sum(len(list(tables.get_entries_for_router(x, y)))
+                for x, y in tables.get_routers()))
+        self.assertGreater(metrics.max_hops, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
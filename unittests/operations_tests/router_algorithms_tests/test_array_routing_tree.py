@@ -0,0 +1,122 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pickle
+import sys
+import unittest
+from pacman.model.routing_table_by_partition import (
+    MulticastRoutingTableByPartition)
+from pacman.operations.router_algorithms.array_routing_tree import (
+    ArrayRoutingTree)
+from pacman.operations.router_algorithms.ner_route import _convert_a_route
+from pacman.operations.router_algorithms.routing_tree import RoutingTree
+
+
+def _make_tree():
+    """ (0, 0) -> (1, 0) -> (2, 0) with a sink on core 3 of (2, 0)
+               -> (0, 1) with a sink on link 2 and one with no route
+    """
+    root = RoutingTree((0, 0))
+    east = RoutingTree((1, 0))
+    far_east = RoutingTree((2, 0))
+    north = RoutingTree((0, 1))
+    root.append_child((0, east))
+    root.append_child((2, north))
+    east.append_child((0, far_east))
+    far_east.append_child((3 + 6, "core"))
+    north.append_child((2, "link"))
+    north.append_child((None, "nowhere"))
+    return root
+
+
+def _entries(routing_tables):
+    return [
+        ((x, y), entry.link_ids, entry.processor_ids,
+         entry.incoming_processor, entry.incoming_link)
+        for x, y in routing_tables.get_routers()
+        for entry in routing_tables.get_entries_for_router(x, y).values()]
+
+
+class TestArrayRoutingTree(unittest.TestCase):
+
+    def test_routing_tree_round_trip(self):
+        root = _make_tree()
+        tree = ArrayRoutingTree.from_routing_tree(root)
+        self.assertEqual(len(tree), 4)
+        self.assertEqual(tree.root, (0, 0))
+        self.assertEqual(list(tree.sinks), [
+            ((2, 0), 9, "core"), ((0, 1), 2, "link"),
+            ((0, 1), None, "nowhere")])
+        self.assertEqual(
+            sorted(tree.traverse(), key=lambda hop: hop[1]),
+            sorted(root.traverse(), key=lambda hop: hop[1]))
+
+        copy, lookup = tree.to_routing_tree()
+        self.assertEqual(set(lookup), {(0, 0), (1, 0), (2, 0), (0, 1)})
+        self.assertEqual(list(copy.traverse()), list(root.traverse()))
+
+        # Copies have the chips but not the sinks, and pickle
+        copy = pickle.loads(pickle.dumps(tree.copy()))
+        self.assertEqual(list(copy.sinks), [])
+        copy.add_sink(0, 1, 7, "core")
+        self.assertEqual(list(copy.sinks), [((0, 1), 7, "core")])
+        with self.assertRaises(KeyError):
+            copy.add_sink(5, 5, 7, "core")
+
+    def test_routing_entries(self):
+        routing_tables = MulticastRoutingTableByPartition()
+        _convert_a_route(routing_tables, "partition", 4, None, _make_tree())
+        self.assertEqual(_entries(routing_tables), [
+            ((0, 0), {0, 2}, set(), 4, None),
+            ((1, 0), {0}, set(), None, None),
+            ((2, 0), set(), {3}, None, None),
+            ((0, 1), {2}, set(), None, None)])
+
+        # Built directly, with the chips added in another order
+        tree = ArrayRoutingTree((0, 0))
+        north = tree.add_node(0, 1, 0, 2)
+        east = tree.add_node(1, 0, 0, 0)
+        tree.add_node(2, 0, east, 0)
+        tree.add_sink(2, 0, 9, "core")
+        tree.add_sink(0, 1, 2, "link")
+        self.assertEqual(tree.node_at(0, 1), north)
+        other_tables = MulticastRoutingTableByPartition()
+        tree.add_to_routing_tables(other_tables, "partition", 4)
+        self.assertEqual(
+            sorted(_entries(other_tables)), sorted(_entries(routing_tables)))
+
+    def test_long_route(self):
+        # Longer than the recursion limit, so must be walked without it
+        length = sys.getrecursionlimit() * 2
+        root = RoutingTree((0, 0))
+        node = root
+        for x in range(1, length):
+            child = RoutingTree((x, 0))
+            node.append_child((0, child))
+            node = child
+        node.append_child((6, "core"))
+        self.assertEqual(len(list(root)), length + 1)
+
+        routing_tables = MulticastRoutingTableByPartition()
+        _convert_a_route(routing_tables, "partition", 1, None, root)
+        entries = _entries(routing_tables)
+        self.assertEqual(len(entries), length)
+        self.assertEqual(entries[0], ((0, 0), {0}, set(), 1, None))
+        self.assertEqual(
+            entries[-1], ((length - 1, 0), set(), {0}, None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
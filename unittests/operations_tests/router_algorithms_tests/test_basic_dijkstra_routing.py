@@ -13,6 +13,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import random
 import unittest
 from collections import deque
 
@@ -86,6 +87,51 @@ class TestBasicDijkstraRouting(unittest.TestCase):
                 if vertex != vertex_to:
                     self.assertIn(vertex_to, vertices_reached)
 
+    def test_shortest_paths(self):
+        graph = MachineGraph("Test")
+        machine = virtual_machine(12, 12, validate=False)
+        placements = Placements()
+        vertices = list()
+        for chip in machine.chips:
+            vertex = SimpleMachineVertex(resources=ResourceContainer())
+            graph.add_vertex(vertex)
+            placements.add_placement(Placement(vertex, chip.x, chip.y, 1))
+            vertices.append(vertex)
+        rng = random.Random(0)
+        for vertex in vertices[::7]:
+            graph.add_outgoing_edge_partition(MulticastEdgePartition(
+                identifier="Test", pre_vertex=vertex))
+            for vertex_to in rng.sample(vertices, 5):
+                if vertex != vertex_to:
+                    graph.add_edge(MachineEdge(vertex, vertex_to), "Test")
+
+        routing_paths = BasicDijkstraRouting()(
+            placements, machine, graph, use_progress_bar=False)
+
+        for vertex in vertices[::7]:
+            placement = placements.get_placement_of_vertex(vertex)
+            partition = graph.get_outgoing_edge_partition_starting_at_vertex(
+                vertex, "Test")
+            source = (placement.x, placement.y)
+            # Follow the routes, recording the hops to each chip
+            hops = {source: 0}
+            queue = deque([source])
+            while queue:
+                x, y = queue.popleft()
+                entry = routing_paths.get_entry_on_coords_for_edge(
+                    partition, x, y)
+                for link_id in entry.link_ids:
+                    link = machine.get_chip_at(x, y).router.get_link(link_id)
+                    xy = (link.destination_x, link.destination_y)
+                    if xy not in hops:
+                        hops[xy] = hops[x, y] + 1
+                        queue.append(xy)
+            for edge in partition.edges:
+                dest = placements.get_placement_of_vertex(edge.post_vertex)
+                self.assertEqual(
+                    hops[dest.x, dest.y],
+                    machine.get_vector_length(source, (dest.x, dest.y)))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,161 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import unittest
+from collections import Counter, OrderedDict, deque
+from spinn_machine.virtual_machine import virtual_machine
+from pacman.exceptions import PacmanInvalidParameterException
+from pacman.model.graphs.machine import (
+    MachineGraph, MachineEdge, MulticastEdgePartition, SimpleMachineVertex)
+from pacman.model.placements import Placements, Placement
+from pacman.model.resources import ResourceContainer
+from pacman.model.routing_info import DictBasedMachinePartitionNKeysMap
+from pacman.operations.router_algorithms import NegotiatedCongestionRoute
+from pacman.operations.router_algorithms.negotiated_congestion_route import (
+    _Negotiation)
+
+
+def _peak_link_load(routing_tables):
+    loads = Counter()
+    for x, y in routing_tables.get_routers():
+        for entry in routing_tables.get_entries_for_router(x, y).values():
+            for link_id in entry.link_ids:
+                loads[x, y, link_id] += 1
+    return max(loads.values())
+
+
+class TestNegotiatedCongestionRoute(unittest.TestCase):
+
+    def setUp(self):
+        # Many sources on one side of the machine all sending to the same
+        # few chips, so that the shortest routes share links
+        self.machine = virtual_machine(8, 8, down_chips=[(3, 3)])
+        self.graph = MachineGraph("Test")
+        self.placements = Placements()
+        self.vertices = list()
+        for chip in self.machine.chips:
+            for p in range(1, 3):
+                vertex = SimpleMachineVertex(resources=ResourceContainer())
+                self.graph.add_vertex(vertex)
+                self.placements.add_placement(
+                    Placement(vertex, chip.x, chip.y, p))
+                self.vertices.append(vertex)
+        rng = random.Random(0)
+        for vertex in self.vertices:
+            self.graph.add_outgoing_edge_partition(MulticastEdgePartition(
+                identifier="Test", pre_vertex=vertex))
+            placement = self.placements.get_placement_of_vertex(vertex)
+            targets = rng.sample(self.vertices, 2)
+            if placement.x < 2:
+                targets.extend(self.vertices[-4:])
+            for vertex_to in set(targets):
+                self.graph.add_edge(MachineEdge(vertex, vertex_to), "Test")
+
+    def _check_reached(self, routing_tables):
+        for vertex in self.vertices:
+            partition = self.graph.\
+                get_outgoing_edge_partition_starting_at_vertex(
+                    vertex, "Test")
+            placement = self.placements.get_placement_of_vertex(vertex)
+            entry = routing_tables.get_entry_on_coords_for_edge(
+                partition, placement.x, placement.y)
+            self.assertEqual(entry.incoming_processor, placement.p)
+            reached = set()
+            seen = set()
+            queue = deque([(placement.x, placement.y)])
+            while queue:
+                x, y = queue.pop()
+                seen.add((x, y))
+                entry = routing_tables.get_entry_on_coords_for_edge(
+                    partition, x, y)
+                for p in entry.processor_ids:
+                    reached.add(
+                        self.placements.get_vertex_on_processor(x, y, p))
+                for link_id in entry.link_ids:
+                    link = self.machine.get_chip_at(x, y).router.get_link(
+                        link_id)
+                    self.assertIsNotNone(link)
+                    xy = (link.destination_x, link.destination_y)
+                    self.assertNotIn(xy, seen)
+                    queue.append(xy)
+            self.assertEqual(
+                reached, set(edge.post_vertex for edge in partition.edges))
+
+    def test_routing(self):
+        router = NegotiatedCongestionRoute()
+        once = router(
+            self.graph, self.machine, self.placements, max_iterations=1)
+        self._check_reached(once)
+        negotiated = router(
+            self.graph, self.machine, self.placements, max_iterations=5)
+        self._check_reached(negotiated)
+        self.assertLess(
+            _peak_link_load(negotiated), _peak_link_load(once))
+
+    def test_n_keys_map(self):
+        n_keys_map = DictBasedMachinePartitionNKeysMap()
+        for partition in self.graph.outgoing_edge_partitions:
+            n_keys_map.set_n_keys_for_partition(partition, 16)
+        self._check_reached(NegotiatedCongestionRoute()(
+            self.graph, self.machine, self.placements, n_keys_map,
+            time_limit=0))
+
+    def test_bad_parameters(self):
+        router = NegotiatedCongestionRoute()
+        with self.assertRaises(PacmanInvalidParameterException):
+            router(self.graph, self.machine, self.placements,
+                   max_iterations=0)
+        with self.assertRaises(PacmanInvalidParameterException):
+            router(self.graph, self.machine, self.placements, time_limit=-1)
+        with self.assertRaises(PacmanInvalidParameterException):
+            router(self.graph, self.machine, self.placements,
+                   link_capacity=0)
+
+    def test_link_capacity(self):
+        router = NegotiatedCongestionRoute()
+        once = router(
+            self.graph, self.machine, self.placements, max_iterations=1)
+        # A capacity no link reaches leaves nothing to reroute
+        roomy = router(
+            self.graph, self.machine, self.placements, max_iterations=5,
+            link_capacity=_peak_link_load(once) + 1)
+        self._check_reached(roomy)
+        self.assertEqual(_peak_link_load(once), _peak_link_load(roomy))
+        tight = router(
+            self.graph, self.machine, self.placements, max_iterations=5,
+            link_capacity=1)
+        self._check_reached(tight)
+        self.assertLess(_peak_link_load(tight), _peak_link_load(once))
+
+    def test_parents_first(self):
+        # The trees must not depend on the order of iterating a dict
+        negotiation = _Negotiation(self.machine, None)
+        nets = negotiation.make_nets(self.graph, self.placements, None)
+        negotiation.negotiate(nets, 5, None)
+        for net in nets:
+            self.assertIsInstance(net.tree, OrderedDict)
+            seen = set()
+            for row, parent_link in net.tree.items():
+                if parent_link is None:
+                    self.assertEqual(row, net.source)
+                else:
+                    self.assertIn(parent_link[0], seen)
+                seen.add(row)
+            negotiation.routing_tree(net)
+
+
+if __name__ == '__main__':
+    unittest.main()
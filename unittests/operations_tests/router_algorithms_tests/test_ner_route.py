@@ -0,0 +1,205 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import unittest
+from spinn_machine.virtual_machine import virtual_machine
+from pacman.exceptions import (
+    MachineHasDisconnectedSubRegion, PacmanInvalidParameterException)
+from pacman.model.graphs.machine import (
+    MachineGraph, MachineEdge, MulticastEdgePartition, SimpleMachineVertex)
+from pacman.model.placements import Placements, Placement
+from pacman.model.resources import ResourceContainer
+from pacman.operations.router_algorithms import NerRoute
+from pacman.operations.router_algorithms.ner_route import (
+    _longest_dimension_first, _ner_net, _NearestNodeIndex, _route_chips,
+    _route_has_dead_links, _RouteTreeCache)
+from pacman.operations.router_algorithms.array_routing_tree import (
+    ArrayRoutingTree)
+from pacman.utilities.algorithm_utilities.machine_topology import (
+    machine_topology)
+
+
+def _scan(machine, nodes, destination, radius):
+    """ Find the nearest node by measuring the distance to all of them
+    """
+    nearest = None
+    nearest_distance = None
+    for node in nodes:
+        distance = machine.get_vector_length(node, destination)
+        if distance <= radius and (
+                nearest is None or distance < nearest_distance):
+            nearest = node
+            nearest_distance = distance
+    return nearest
+
+
+class TestNerRoute(unittest.TestCase):
+
+    def _check_nearest(self, machine, radius):
+        rng = random.Random(0)
+        chips = [(chip.x, chip.y) for chip in machine.chips]
+        for _ in range(20):
+            index = _NearestNodeIndex(machine_topology(machine), radius)
+            nodes = rng.sample(chips, rng.randint(1, 30))
+            for node in nodes:
+                index.add(node)
+            for destination in chips:
+                self.assertEqual(
+                    index.nearest(destination),
+                    _scan(machine, nodes, destination, radius))
+
+    def test_nearest_no_wrap(self):
+        self._check_nearest(virtual_machine(16, 16), 5)
+
+    def test_nearest_wrap(self):
+        self._check_nearest(virtual_machine(12, 12, validate=False), 5)
+        self._check_nearest(virtual_machine(12, 24, validate=False), 20)
+
+    def test_parallel(self):
+        machine = virtual_machine(
+            8, 8, down_chips=[(1, 2), (5, 4), (3, 3)],
+            down_links=[(2, 2, 0), (6, 6, 4)])
+        graph = MachineGraph("Test")
+        placements = Placements()
+        vertices = list()
+        for chip in machine.chips:
+            for processor in chip.processors:
+                if not processor.is_monitor:
+                    vertex = SimpleMachineVertex(resources=ResourceContainer())
+                    graph.add_vertex(vertex)
+                    placements.add_placement(Placement(
+                        vertex, chip.x, chip.y, processor.processor_id))
+                    vertices.append(vertex)
+        rng = random.Random(0)
+        for vertex in vertices:
+            graph.add_outgoing_edge_partition(
+                MulticastEdgePartition(identifier="Test", pre_vertex=vertex))
+            for vertex_to in rng.sample(vertices, 20):
+                graph.add_edge(MachineEdge(vertex, vertex_to), "Test")
+
+        serial_router = NerRoute()
+        serial = serial_router(graph, machine, placements)
+        parallel_router = NerRoute()
+        parallel = parallel_router(
+            graph, machine, placements, n_workers=2)
+        self.assertGreater(serial_router.n_repaired_nets, 0)
+        self.assertEqual(serial_router.n_repaired_nets,
+                         parallel_router.n_repaired_nets)
+        self.assertEqual(list(serial.get_routers()),
+                         list(parallel.get_routers()))
+        for x, y in serial.get_routers():
+            serial_entries = serial.get_entries_for_router(x, y)
+            parallel_entries = parallel.get_entries_for_router(x, y)
+            self.assertEqual(list(serial_entries), list(parallel_entries))
+            for partition, entry in serial_entries.items():
+                other = parallel_entries[partition]
+                self.assertEqual(entry.link_ids, other.link_ids)
+                self.assertEqual(entry.processor_ids, other.processor_ids)
+                self.assertEqual(
+                    entry.incoming_processor, other.incoming_processor)
+                self.assertEqual(entry.incoming_link, other.incoming_link)
+
+        with self.assertRaises(PacmanInvalidParameterException):
+            NerRoute()(graph, machine, placements, n_workers=-1)
+
+    def test_avoid_dead_links(self):
+        # A wall of dead chips with a gap, and dead links by the gap
+        machine = virtual_machine(
+            12, 12, validate=False,
+            down_chips=[(6, y) for y in range(10)],
+            down_links=[(5, 10, 0), (5, 11, 1)])
+        topology = machine_topology(machine)
+        destinations = [(9, 2), (8, 5), (10, 8), (7, 0), (2, 2)]
+        root, repaired = _route_chips(
+            (3, 3), destinations, topology, _longest_dimension_first)
+        self.assertTrue(repaired)
+        chips = list()
+        for _, (x, y), routes in root.traverse():
+            chips.append((x, y))
+            for route in routes:
+                self.assertTrue(topology.is_link_at(x, y, route))
+        self.assertEqual(len(chips), len(set(chips)))
+        self.assertTrue(set(destinations).issubset(chips))
+
+        # A chip cut off from the rest cannot be reached
+        machine = virtual_machine(8, 8, down_chips=[(1, 0), (1, 1), (0, 1)])
+        with self.assertRaises(MachineHasDisconnectedSubRegion):
+            _route_chips((4, 4), [(0, 0), (5, 5)], machine_topology(machine),
+                         _longest_dimension_first)
+
+    def test_repair_is_no_longer(self):
+        # Not a whole number of boards, so there are missing chips
+        machine = virtual_machine(40, 40)
+        topology = machine_topology(machine)
+        chips = [(chip.x, chip.y) for chip in machine.chips]
+        rng = random.Random(0)
+        n_repaired = 0
+        total = 0
+        for _ in range(200):
+            source = rng.choice(chips)
+            destinations = rng.sample(chips, 5)
+            root, _ = _ner_net(
+                source, destinations, topology, _longest_dimension_first)
+            if not _route_has_dead_links(root, topology):
+                continue
+            n_repaired += 1
+            repaired_root, _ = _route_chips(
+                source, destinations, topology, _longest_dimension_first)
+            repaired = list()
+            for _, (x, y), routes in repaired_root.traverse():
+                repaired.append((x, y))
+                for route in routes:
+                    self.assertTrue(topology.is_link_at(x, y, route))
+            self.assertEqual(len(repaired), len(set(repaired)))
+            self.assertTrue(set(destinations).issubset(repaired))
+            total += len(repaired)
+        self.assertEqual(48, n_repaired)
+        # Joining each branch back by A* in turn used 3435 chips
+        self.assertLessEqual(total, 3435)
+
+    def test_tree_cache(self):
+        machine = virtual_machine(8, 8, down_chips=[(3, 3)])
+        topology = machine_topology(machine)
+        destinations = [(7, 7), (0, 6), (4, 4)]
+        root, repaired = _route_chips(
+            (0, 0), destinations, topology, _longest_dimension_first)
+        self.assertTrue(repaired)
+        cache = _RouteTreeCache()
+        key = cache.key((0, 0), destinations)
+        self.assertIsNone(cache.get(key))
+        cache.add(key, ArrayRoutingTree.from_routing_tree(root))
+        hops = sorted(root.traverse(), key=lambda hop: hop[1])
+
+        # The same chips in another order find the tree
+        first = cache.get(cache.key((0, 0), reversed(destinations)))
+        second = cache.get(key)
+        self.assertEqual(sorted(first.traverse(), key=lambda hop: hop[1]),
+                         hops)
+        self.assertEqual(sorted(second.traverse(), key=lambda hop: hop[1]),
+                         hops)
+
+        # Each copy can have sinks added without changing the others
+        self.assertIsNot(first, second)
+        first.add_sink(7, 7, 7, "sink")
+        self.assertEqual(sorted(second.traverse(), key=lambda hop: hop[1]),
+                         hops)
+        self.assertEqual(list(cache.get(key).sinks), [])
+
+        self.assertIsNone(cache.get(cache.key((0, 1), destinations)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+from spinn_machine import MulticastRoutingEntry
+from pacman.model.routing_tables import (
+    UnCompressedMulticastRoutingTable, MulticastRoutingTables)
+from pacman.operations.router_compressors import (
+    CompressionCache, Entry, PairCompressor)
+from pacman.operations.router_compressors.hybrid_compressor import (
+    HybridCompressor)
+
+
+def _table(x, routes, reverse=False):
+    entries = [
+        MulticastRoutingEntry(
+            key, 0xFF, defaultable=False, spinnaker_route=route)
+        for key, route in enumerate(routes)]
+    if reverse:
+        entries.reverse()
+    return UnCompressedMulticastRoutingTable(x, 0, entries)
+
+
+class TestCompressionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key(self):
+        routes = [1, 2, 1, 2, 4]
+        key = CompressionCache.key("Pair", 0, _table(0, routes))
+        self.assertEqual(
+            key, CompressionCache.key("Pair", 0, _table(3, routes, True)))
+        self.assertNotEqual(
+            key, CompressionCache.key("Other", 0, _table(0, routes)))
+        self.assertNotEqual(
+            key, CompressionCache.key("Pair", 10, _table(0, routes)))
+        self.assertNotEqual(
+            key, CompressionCache.key("Pair", 0, _table(0, routes[1:])))
+
+    def test_put_get(self):
+        cache = CompressionCache(self.directory)
+        self.assertIsNone(cache.get("missing"))
+        cache.put("abc", [Entry(1, 2, True, 3), Entry(4, 5, False, 6)], "x")
+        self.assertEqual(
+            ([(1, 2, True, 3), (4, 5, False, 6)], "x"), cache.get("abc"))
+        # A new cache on the same directory sees the same tables
+        self.assertEqual(
+            "x", CompressionCache(self.directory).get("abc")[1])
+
+    def test_directory_exists(self):
+        cache = CompressionCache(self.directory)
+        cache.put("abc", [Entry(1, 2, True, 3)])
+        self.assertIsNotNone(CompressionCache(self.directory).get("abc"))
+
+    def test_overwrite(self):
+        cache = CompressionCache(self.directory)
+        cache.put("abc", [Entry(1, 2, True, 3)])
+        cache.put("abc", [Entry(4, 5, False, 6)] * 3)
+        self.assertEqual(
+            [(4, 5, False, 6)] * 3, cache.get("abc")[0])
+        # Only the new table is counted
+        self.assertEqual(
+            os.path.getsize(os.path.join(self.directory, "abc.json")),
+            cache._n_bytes)
+
+    def test_evict_least_recently_used(self):
+        cache = CompressionCache(self.directory)
+        for n, key in enumerate(("a", "b", "c")):
+            cache.put(key, [Entry(n, n, False, n)])
+            path = os.path.join(self.directory, key + ".json")
+            os.utime(path, (n, n))
+        size = os.path.getsize(path)
+        # Using a makes b the least recently used
+        self.assertIsNotNone(cache.get("a"))
+        small_cache = CompressionCache(self.directory, 3 * size)
+        small_cache.put("d", [Entry(3, 3, False, 3)])
+        self.assertIsNone(small_cache.get("b"))
+        for key in ("a", "c", "d"):
+            self.assertIsNotNone(small_cache.get(key))
+
+    def test_compressor_uses_cache(self):
+        tables = MulticastRoutingTables(
+            [_table(0, [1, 2] * 8), _table(1, [1, 2, 4] * 5)])
+        compressor = PairCompressor()
+        first = compressor(tables, cache_directory=self.directory)
+        self.assertEqual(2, len(os.listdir(self.directory)))
+        self.assertEqual(0, compressor._cache_hits)
+        # The same tables on other chips are found in the cache
+        moved = MulticastRoutingTables(
+            [_table(5, [1, 2] * 8, True), _table(6, [1, 2, 4] * 5)])
+        second = compressor(moved)
+        self.assertEqual(2, compressor._cache_hits)
+        for original, table in zip(first, second):
+            self.assertEqual(
+                original.multicast_routing_entries,
+                table.multicast_routing_entries)
+        # Other compressors do not use the same tables
+        hybrid = HybridCompressor()
+        hybrid(tables, target_length=3, cache_directory=self.directory)
+        self.assertEqual(0, hybrid._cache_hits)
+        tiers = hybrid.tiers
+        hybrid(moved, target_length=3, n_workers=2)
+        self.assertEqual(2, hybrid._cache_hits)
+        self.assertEqual(list(tiers.values()), list(hybrid.tiers.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
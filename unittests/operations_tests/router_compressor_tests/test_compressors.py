@@ -19,6 +19,7 @@ from pacman.model.routing_tables import (
     UnCompressedMulticastRoutingTable, MulticastRoutingTables)
 from pacman.operations.router_compressors.routing_compression_checker import (
     compare_tables)
+from pacman.operations.router_compressors import EntryTable
 from pacman.operations.router_compressors.pair_compressor import (
     PairCompressor)
 from pacman.operations.router_compressors.unordered_pair_compressor import (
@@ -79,6 +80,123 @@ class MyTestCase(unittest.TestCase):
         compressed_tables = compressor(self.original_tables)
         self.check_compression(compressed_tables)
 
+    def test_parallel_compression(self):
+        for x in range(1, 4):
+            table = UnCompressedMulticastRoutingTable(x=x, y=0)
+            for entry in self.original_tables.get_routing_table_for_chip(
+                    0, 0).multicast_routing_entries:
+                table.add_multicast_routing_entry(entry)
+            self.original_tables.add_routing_table(table)
+        compressor = PairCompressor()
+        serial_tables = compressor(self.original_tables)
+        parallel_tables = compressor(self.original_tables, n_workers=2)
+        self.check_compression(parallel_tables)
+        self.assertEqual(
+            [(t.x, t.y) for t in serial_tables],
+            [(t.x, t.y) for t in parallel_tables])
+        for original in self.original_tables:
+            serial = serial_tables.get_routing_table_for_chip(
+                original.x, original.y)
+            parallel = parallel_tables.get_routing_table_for_chip(
+                original.x, original.y)
+            self.assertEqual(
+                serial.multicast_routing_entries,
+                parallel.multicast_routing_entries)
+
+    def test_time_limit(self):
+        for compressor in (PairCompressor(), OrderedCoveringCompressor()):
+            for limits in ({"time_limit": 0}, {"table_time_limit": 0}):
+                compressed_tables = compressor(self.original_tables, **limits)
+                # No time to start so the table is kept as it is
+                original = self.original_tables.get_routing_table_for_chip(
+                    0, 0)
+                compressed = compressed_tables.get_routing_table_for_chip(
+                    0, 0)
+                self.assertEqual(
+                    original.multicast_routing_entries,
+                    compressed.multicast_routing_entries)
+
+    def test_target_length_stops_early(self):
+        compressor = PairCompressor()
+        compressed_tables = compressor(self.original_tables)
+        smallest = compressed_tables.get_routing_table_for_chip(0, 0)
+        target_length = smallest.number_of_entries + 2
+        compressed_tables = compressor(
+            self.original_tables, target_length=target_length)
+        original = self.original_tables.get_routing_table_for_chip(0, 0)
+        compressed = compressed_tables.get_routing_table_for_chip(0, 0)
+        self.assertEqual(target_length, compressed.number_of_entries)
+        compare_tables(original, compressed)
+
+    def test_pair_order(self):
+        routes = [5, 7, 6, 7, 5, 7, 8]
+        table = UnCompressedMulticastRoutingTable(0, 0, [
+            MulticastRoutingEntry(
+                key, 0xFFFFFFFF, defaultable=False, spinnaker_route=route)
+            for key, route in enumerate(routes)])
+        compressor = PairCompressor()
+        compressor._all_entries = EntryTable.from_routing_table(table)
+        compressor._sort_by_route_frequency()
+        # Least frequent route first; ties and the entries of a route in
+        # the order the quicksorts of the C leave them
+        self.assertEqual(
+            [(2, 6), (6, 8), (0, 5), (4, 5), (5, 7), (3, 7), (1, 7)],
+            [(entry.key, entry.spinnaker_route)
+             for entry in compressor._all_entries.to_entries()])
+
+    def test_pair_matches_recorded(self):
+        # Outputs recorded from the list based version, which sorted as the
+        # C does
+        routes = [3, 1, 2, 1, 3, 2, 4, 1, 2, 3, 4, 5, 1, 5, 3]
+        keys = [0, 1, 2, 3, 4, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]
+        table = UnCompressedMulticastRoutingTable(0, 0, [
+            MulticastRoutingEntry(
+                key, 0xF, defaultable=False, spinnaker_route=route)
+            for key, route in zip(keys, routes)])
+        compressor = PairCompressor()
+        compressor._all_entries = EntryTable.from_routing_table(table)
+        compressor._sort_by_route_frequency()
+        self.assertEqual(
+            [(7, 4), (11, 4), (14, 5), (12, 5), (6, 2), (2, 2), (9, 2),
+             (3, 1), (8, 1), (13, 1), (1, 1), (4, 3), (10, 3), (0, 3),
+             (15, 3)],
+            [(entry.key, entry.spinnaker_route)
+             for entry in compressor._all_entries.to_entries()])
+        self.assertEqual(
+            [(7, 15, 4), (11, 15, 4), (12, 13, 5), (2, 11, 2), (9, 15, 2),
+             (1, 13, 1), (8, 10, 1), (0, 0, 3)],
+            [(entry.key, entry.mask, entry.spinnaker_route)
+             for entry in PairCompressor().compress_table(table)])
+        self.assertEqual(
+            [(7, 15, 4), (11, 15, 4), (12, 13, 5), (2, 11, 2), (9, 15, 2),
+             (1, 13, 1), (8, 15, 1), (13, 15, 1), (0, 11, 3), (10, 15, 3),
+             (15, 15, 3)],
+            [(entry.key, entry.mask, entry.spinnaker_route)
+             for entry in UnorderedPairCompressor().compress_table(table)])
+
+    def test_pair_many_routes(self):
+        # More routes than entries in a router
+        table = UnCompressedMulticastRoutingTable(0, 0, [
+            MulticastRoutingEntry(
+                key, 0xFFFFFFFF, defaultable=False, spinnaker_route=key)
+            for key in range(1, 2000)])
+        compressed = UnorderedPairCompressor().compress_table(table)
+        self.assertEqual(1999, len(compressed))
+
+    def test_configure(self):
+        table = UnCompressedMulticastRoutingTable(0, 0, [
+            MulticastRoutingEntry(
+                key, 0xFFFFFFFF, defaultable=False, spinnaker_route=key % 2)
+            for key in range(64)])
+        compressor = UnorderedPairCompressor()
+        fully = len(compressor.compress_table(table))
+        compressor.configure(target_length=40)
+        self.assertLess(fully, len(compressor.compress_table(table)))
+        # A deadline already passed leaves the table as it was
+        compressor.configure(deadline=0)
+        self.assertEqual(64, len(compressor.compress_table(table)))
+        self.assertTrue(compressor._timed_out)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,120 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import numpy
+from spinn_machine import MulticastRoutingEntry
+from pacman.model.routing_tables import UnCompressedMulticastRoutingTable
+from pacman.operations.router_compressors import (
+    AbstractCompressor, Entry, EntryTable, PairCompressor)
+
+
+class TestEntryTable(unittest.TestCase):
+
+    def setUp(self):
+        self.entries = [
+            Entry(0b0000, 0b1111, False, 3),
+            Entry(0b0001, 0b1111, True, 3),
+            Entry(0b0100, 0b1100, False, 5),
+            Entry(0b1000, 0b1000, True, 7)]
+        self.table = EntryTable.from_entries(self.entries)
+
+    def test_round_trip(self):
+        self.assertEqual(4, len(self.table))
+        self.assertEqual(self.entries, self.table.to_entries())
+        self.assertEqual(self.entries[:2], self.table.to_entries(2))
+        self.assertEqual(self.entries[2], self.table.entry(2))
+        self.assertTrue(self.table.entry(1).defaultable)
+
+    def test_from_routing_table(self):
+        router_table = UnCompressedMulticastRoutingTable(0, 0, [
+            MulticastRoutingEntry(
+                0xFFFFFFF0, 0xFFFFFFF0, defaultable=True,
+                spinnaker_route=0xFFFFFF)])
+        table = EntryTable.from_routing_table(router_table)
+        entry = table.entry(0)
+        self.assertEqual(0xFFFFFFF0, entry.key)
+        self.assertEqual(0xFFFFFFF0, entry.mask)
+        self.assertEqual(0xFFFFFF, entry.spinnaker_route)
+        self.assertTrue(entry.defaultable)
+
+    def test_intersects(self):
+        for key, mask in [(0b0000, 0b1110), (0b0100, 0b0100), (0, 0)]:
+            expected = [
+                AbstractCompressor.intersect(key, mask, e.key, e.mask)
+                for e in self.entries]
+            self.assertEqual(
+                expected, self.table.intersects(key, mask).tolist())
+            self.assertEqual(
+                expected[1:3], self.table.intersects(key, mask, 1, 3).tolist())
+
+    def test_intersects_any(self):
+        keys = numpy.array([0b0000, 0b0010], dtype=numpy.uint32)
+        masks = numpy.array([0b1110, 0b1111], dtype=numpy.uint32)
+        self.assertEqual(
+            [True, False],
+            self.table.intersects_any(keys, masks, 0, 2).tolist())
+        self.assertEqual(
+            [False, False],
+            self.table.intersects_any(keys, masks, 2, 2).tolist())
+        # A row at a time gives the same answer
+        max_cells = EntryTable.MAX_INTERSECT_CELLS
+        EntryTable.MAX_INTERSECT_CELLS = 1
+        try:
+            self.assertEqual(
+                [True, False],
+                self.table.intersects_any(keys, masks, 0, 2).tolist())
+            self.assertEqual(
+                self.table.intersects_any(keys, masks, 1).tolist(),
+                [self.table.intersects(key, mask, 1).any()
+                 for key, mask in zip(keys, masks)])
+        finally:
+            EntryTable.MAX_INTERSECT_CELLS = max_cells
+
+    def test_covers(self):
+        self.assertEqual(
+            [True, True, False, False],
+            self.table.covers(0b0000, 0b1110).tolist())
+        self.assertEqual(
+            [False, True], self.table.covers(0b0100, 0b0100, 1, 3).tolist())
+
+    def test_merge(self):
+        compressor = PairCompressor()
+        keys, masks, defaultables = self.table.merge(
+            0, numpy.array([1, 2, 3]))
+        for i, other in enumerate(self.entries[1:]):
+            key, mask, defaultable = compressor.merge(
+                self.entries[0], other)
+            self.assertEqual(key, keys[i])
+            self.assertEqual(mask, masks[i])
+            self.assertEqual(defaultable, defaultables[i])
+
+    def test_rows(self):
+        self.table.swap(0, 3)
+        self.assertEqual(self.entries[3], self.table.entry(0))
+        self.assertEqual(self.entries[0], self.table.entry(3))
+        self.table.copy_entry(1, 0)
+        self.assertEqual(self.entries[3], self.table.entry(1))
+        self.table.set_entry(2, 0b1010, 0b1011, True, 9)
+        self.assertEqual(Entry(0b1010, 0b1011, True, 9), self.table.entry(2))
+
+    def test_reorder(self):
+        self.table.reorder(numpy.array([2, 0, 3, 1]))
+        self.assertEqual(
+            [self.entries[i] for i in (2, 0, 3, 1)], self.table.to_entries())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from spinn_machine import MulticastRoutingEntry
+from pacman.model.routing_tables import (
+    UnCompressedMulticastRoutingTable, MulticastRoutingTables)
+from pacman.operations.router_compressors.hybrid_compressor import (
+    HybridCompressor)
+from pacman.operations.router_compressors.routing_compression_checker import (
+    compare_tables)
+
+
+class TestHybridCompressor(unittest.TestCase):
+
+    def setUp(self):
+        self.original_tables = MulticastRoutingTables()
+        # Short enough already
+        self._add_table(0, [1, 2, 3, 4])
+        # Fits once the defaultable entries are removed
+        self._add_table(1, range(1, 11), defaultable=(0, 3, 6))
+        # Fits once the pairs are merged
+        self._add_table(2, [1 << (key % 2) for key in range(16)])
+        # Only fits by putting the exceptions before one general entry
+        self._add_table(3, [
+            1 << (key // 9 + 2) if key % 9 == 0 else 1 for key in range(32)])
+
+    def _add_table(self, x, routes, defaultable=()):
+        table = UnCompressedMulticastRoutingTable(x=x, y=0)
+        for key, route in enumerate(routes):
+            table.add_multicast_routing_entry(MulticastRoutingEntry(
+                key, 0x1F, defaultable=key in defaultable,
+                spinnaker_route=route))
+        self.original_tables.add_routing_table(table)
+
+    def check_tables(self, compressed_tables):
+        for original in self.original_tables:
+            compressed = compressed_tables.get_routing_table_for_chip(
+                original.x, original.y)
+            self.assertLessEqual(compressed.number_of_entries, 8)
+            compare_tables(original, compressed)
+
+    def test_tiers(self):
+        compressor = HybridCompressor()
+        compressed_tables = compressor(self.original_tables, target_length=8)
+        self.check_tables(compressed_tables)
+        self.assertEqual(
+            [((0, 0), HybridCompressor.NO_COMPRESSION),
+             ((1, 0), HybridCompressor.REMOVE_DEFAULT_ROUTES),
+             ((2, 0), HybridCompressor.PAIR),
+             ((3, 0), HybridCompressor.ORDERED_COVERING)],
+            list(compressor.tiers.items()))
+
+    def test_parallel_tiers(self):
+        serial = HybridCompressor()
+        serial(self.original_tables, target_length=8)
+        parallel = HybridCompressor()
+        compressed_tables = parallel(
+            self.original_tables, target_length=8, n_workers=2)
+        self.check_tables(compressed_tables)
+        self.assertEqual(serial.tiers, parallel.tiers)
+
+    def test_fits_router(self):
+        compressor = HybridCompressor()
+        compressor(self.original_tables)
+        self.assertEqual(
+            {HybridCompressor.NO_COMPRESSION},
+            set(compressor.tiers.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
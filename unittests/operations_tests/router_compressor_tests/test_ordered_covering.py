@@ -0,0 +1,80 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import unittest
+from pacman.operations.router_compressors import Entry
+from pacman.operations.router_compressors.ordered_covering_router_compressor \
+    import get_generality, minimise, ordered_covering
+from pacman.operations.router_compressors.ordered_covering_router_compressor.\
+    ordered_covering import _get_best_merge
+
+
+def _uncached_ordered_covering(routing_table):
+    """ The ordered covering loop refining every merge on every iteration
+    """
+    aliases = {}
+    routing_table = sorted(
+        routing_table,
+        key=lambda entry: get_generality(entry.key, entry.mask))
+    while True:
+        merge = _get_best_merge(routing_table, aliases)
+        if merge.goodness <= 0:
+            return routing_table, aliases
+        routing_table, aliases = merge.apply(aliases)
+
+
+class TestOrderedCovering(unittest.TestCase):
+
+    def _random_table(self, seed, n_entries, n_routes):
+        rng = random.Random(seed)
+        keys = rng.sample(range(1 << 12), n_entries)
+        return [Entry(key, 0xFFF, rng.random() < 0.2, rng.randrange(n_routes))
+                for key in keys]
+
+    def test_cache_matches_uncached(self):
+        for seed in range(5):
+            table = self._random_table(seed, 150, 6)
+            expected, expected_aliases = _uncached_ordered_covering(table)
+            result, result_aliases = ordered_covering(table, None)
+            self.assertEqual(expected, result)
+            self.assertEqual(expected_aliases, result_aliases)
+
+    def test_target_length(self):
+        table = self._random_table(42, 100, 4)
+        result, _ = ordered_covering(table, 60)
+        self.assertLessEqual(len(result), 60)
+
+    def test_timer_cut_off(self):
+        table = self._random_table(7, 100, 4)
+        # Stops after the first merge with a table rather than an exception
+        result, _ = ordered_covering(
+            table, 10, no_raise=True, use_timer_cut_off=True,
+            time_to_run_for=0)
+        expected, _ = ordered_covering(table, len(table) - 1)
+        self.assertEqual(expected, result)
+
+    def test_deprecated_time_keyword(self):
+        table = self._random_table(7, 100, 4)
+        expected = minimise(
+            table, None, use_timer_cut_off=True, time_to_run_for=0)
+        result = minimise(
+            table, None, use_timer_cut_off=True,
+            time_to_run_for_before_raising_exception=0)
+        self.assertEqual(expected, result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from spinn_machine import MulticastRoutingEntry
+from pacman.exceptions import PacmanRoutingException
+from pacman.model.routing_tables import (
+    CompressedMulticastRoutingTable, MulticastRoutingTables,
+    UnCompressedMulticastRoutingTable)
+from pacman.operations.router_compressors.routing_compression_checker import (
+    calc_remainders, compare_all_tables, compare_tables, covers)
+
+
+class TestRoutingCompressionChecker(unittest.TestCase):
+
+    def setUp(self):
+        self.original = UnCompressedMulticastRoutingTable(0, 0, [
+            MulticastRoutingEntry(0b0000, 0b1111, [1], [], False),
+            MulticastRoutingEntry(0b0001, 0b1111, [1], [], False),
+            MulticastRoutingEntry(0b0100, 0b1110, [2], [], False),
+            MulticastRoutingEntry(0b1000, 0b1111, [], [3], True)])
+
+    def test_covers(self):
+        self.assertTrue(covers(0b0000, 0b1110, 0b0001, 0b1111))
+        self.assertTrue(covers(0b0000, 0b1111, 0b0000, 0b1100))
+        self.assertFalse(covers(0b0100, 0b1110, 0b0000, 0b1100))
+
+    def test_calc_remainders(self):
+        # 00XX less 0001 is covered by 00X0 and 001X
+        self.assertEqual(
+            [(0b0000, 0b1101), (0b0010, 0b1110)],
+            calc_remainders(0b0000, 0b1100, 0b0001, 0b1111))
+        self.assertEqual([], calc_remainders(0b0001, 0b1111, 0b0000, 0b1110))
+
+    def test_good_compression(self):
+        compressed = CompressedMulticastRoutingTable(0, 0, [
+            MulticastRoutingEntry(0b0100, 0b1110, [2], [], False),
+            MulticastRoutingEntry(0b0000, 0b1000, [1], [], False)])
+        compare_tables(self.original, compressed)
+
+    def test_order_matters(self):
+        compressed = CompressedMulticastRoutingTable(0, 0, [
+            MulticastRoutingEntry(0b0000, 0b1000, [1], [], False),
+            MulticastRoutingEntry(0b0100, 0b1110, [2], [], False)])
+        with self.assertRaises(PacmanRoutingException):
+            compare_tables(self.original, compressed)
+
+    def test_missing_route(self):
+        compressed = CompressedMulticastRoutingTable(0, 0, [
+            MulticastRoutingEntry(0b0000, 0b1111, [1], [], False),
+            MulticastRoutingEntry(0b0100, 0b1110, [2], [], False)])
+        with self.assertRaises(PacmanRoutingException) as context:
+            compare_tables(self.original, compressed)
+        self.assertIn("No route found", str(context.exception))
+
+    def test_all_tables(self):
+        originals = MulticastRoutingTables()
+        compressed = MulticastRoutingTables()
+        for x in range(4):
+            originals.add_routing_table(UnCompressedMulticastRoutingTable(
+                x, 0, self.original.multicast_routing_entries))
+            compressed.add_routing_table(CompressedMulticastRoutingTable(
+                x, 0, self.original.multicast_routing_entries[:x] +
+                self.original.multicast_routing_entries[x + 1:]
+                if x == 2 else self.original.multicast_routing_entries))
+        for n_workers in (None, 2):
+            with self.assertRaises(PacmanRoutingException) as context:
+                compare_all_tables(originals, compressed, n_workers)
+            self.assertIn("No route found", str(context.exception))
+            compare_all_tables(originals, originals, n_workers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,6 +17,8 @@ import pytest
 from spinn_machine import virtual_machine
 from pacman.model.placements import Placements, Placement
 from pacman.operations.fixed_route_router import FixedRouteRouter
+from pacman.operations.fixed_route_router.fixed_route_router import (
+    _board_template, _links_to_root)
 from pacman.exceptions import PacmanRoutingException
 
 
@@ -94,6 +96,27 @@ def test_all_working(width, height,  with_down_links, with_down_chips):
     _check_setup(width, height, down_chips, down_links)
 
 
+def test_template_same_as_search():
+    # Chip (1, 0) of each board sends on link 3 in the template; one board
+    # has that link down, so must be searched
+    machine = virtual_machine(
+        width=12, height=12, down_links=[(9, 4, 3)], down_chips=[(6, 6)])
+    assert len(_board_template()) == 47
+    placements = Placements(
+        Placement(DestinationVertex(), ethernet_chip.x, ethernet_chip.y, 1)
+        for ethernet_chip in machine.ethernet_connected_chips)
+    fixed_route_tables = FixedRouteRouter()(
+        machine, placements, DestinationVertex)
+    for ethernet_chip in machine.ethernet_connected_chips:
+        links = _links_to_root(
+            (ethernet_chip.x, ethernet_chip.y),
+            machine.get_existing_xys_by_ethernet(
+                ethernet_chip.x, ethernet_chip.y),
+            machine.xy_over_link, machine.is_link_at)
+        for xy, link_id in links:
+            assert set(fixed_route_tables[xy].link_ids) == {link_id}
+
+
 def test_unreachable():
     try:
         _check_setup(8, 8, [(0, 2), (1, 3), (1, 4)], None)
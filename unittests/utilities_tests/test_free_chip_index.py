@@ -0,0 +1,60 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import unittest
+from pacman.utilities.utility_objs.free_chip_index import FreeChipIndex
+
+
+class TestFreeChipIndex(unittest.TestCase):
+
+    def test_first_fit(self):
+        chips = [(x, y) for y in range(5) for x in range(5)]
+        random.Random(0).shuffle(chips)
+        index = FreeChipIndex(chips)
+        sdram = dict()
+        rng = random.Random(1)
+        for x, y in chips:
+            sdram[x, y] = rng.randint(0, 1 << 20)
+            index.add(x, y, sdram[x, y])
+        self.assertEqual(list(index), chips)
+        self.assertEqual(len(index), 25)
+
+        for _ in range(200):
+            chip = rng.choice(chips)
+            action = rng.randint(0, 2)
+            if action == 0:
+                index.remove(*chip)
+                sdram.pop(chip, None)
+            elif action == 1:
+                sdram[chip] = rng.randint(0, 1 << 20)
+                index.add(chip[0], chip[1], sdram[chip])
+            else:
+                index.update_sdram(chip[0], chip[1], 1000)
+                if chip in sdram:
+                    sdram[chip] = 1000
+            need = rng.choice([0, 1000, rng.randint(0, 1 << 20)])
+            self.assertEqual(
+                list(index.chips_with_sdram(need)),
+                [xy for xy in chips if sdram.get(xy, -1) >= need])
+            self.assertEqual(len(index), len(sdram))
+
+        # Chips not in the order are ignored
+        index.add(7, 7, 100)
+        self.assertNotIn((7, 7), index)
+
+
+if __name__ == '__main__':
+    unittest.main()
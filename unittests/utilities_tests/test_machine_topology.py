@@ -0,0 +1,157 @@
+# Copyright (c) 2017-2019 The University of Manchester
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gc
+import pickle
+import unittest
+import weakref
+from spinn_machine import Link
+from spinn_machine.virtual_machine import virtual_machine
+from pacman.utilities.algorithm_utilities.machine_topology import (
+    invalidate_machine_topology, machine_topology)
+
+
+class TestMachineTopology(unittest.TestCase):
+
+    def _check(self, machine):
+        topology = machine_topology(machine)
+        self.assertEqual(topology.wrap, machine.wrap)
+        self.assertEqual(topology.n_chips, machine.n_chips)
+        xys = [(x, y) for x in range(-1, machine.width + 1)
+               for y in range(-1, machine.height + 1)]
+        for x, y in xys:
+            self.assertEqual(
+                topology.is_chip_at(x, y), machine.is_chip_at(x, y))
+            for link in range(6):
+                self.assertEqual(topology.xy_over_link(x, y, link),
+                                 machine.xy_over_link(x, y, link))
+                self.assertEqual(topology.is_link_at(x, y, link),
+                                 machine.is_link_at(x, y, link))
+        for source in xys[::7]:
+            for destination in xys:
+                self.assertEqual(
+                    topology.get_vector_length(source, destination),
+                    machine.get_vector_length(source, destination))
+                self.assertEqual(
+                    topology.get_vector(source, destination),
+                    machine.get_vector(source, destination))
+
+        # The arrays agree with the chips
+        for row, chip in enumerate(machine.chips):
+            self.assertEqual(tuple(topology.xys[row]), (chip.x, chip.y))
+            self.assertEqual(topology.chip_index(chip.x, chip.y), row)
+            for link in range(6):
+                neighbour = topology.neighbours[row, link]
+                has_link = chip.router.is_link(link)
+                self.assertEqual(
+                    bool(topology.link_masks[row] & (1 << link)), has_link)
+                if has_link:
+                    router_link = chip.router.get_link(link)
+                    self.assertEqual(
+                        tuple(topology.xys[neighbour]),
+                        (router_link.destination_x,
+                         router_link.destination_y))
+                else:
+                    self.assertEqual(neighbour, -1)
+
+    def test_no_wrap(self):
+        self._check(virtual_machine(
+            8, 8, down_chips=[(1, 2)], down_links=[(3, 3, 0), (5, 5, 4)]))
+
+    def test_wraps(self):
+        self._check(virtual_machine(12, 12, validate=False))
+        self._check(virtual_machine(12, 16, validate=False))
+        self._check(virtual_machine(16, 12, validate=False))
+
+    def test_dead_links(self):
+        self.assertEqual(machine_topology(
+            virtual_machine(12, 12, validate=False)).dead_links, frozenset())
+
+        # The links into a dead chip are dead, as is a down link
+        topology = machine_topology(virtual_machine(
+            12, 12, validate=False, down_chips=[(4, 4)],
+            down_links=[(8, 8, 1)]))
+        self.assertEqual(topology.dead_links, frozenset([
+            (5, 4, 3), (5, 5, 4), (4, 5, 5), (3, 4, 0), (3, 3, 1),
+            (4, 3, 2), (8, 8, 1)]))
+
+        # The links off the edges of a board are not dead
+        topology = machine_topology(virtual_machine(8, 8))
+        self.assertNotIn((7, 3, 0), topology.dead_links)
+
+    def test_components(self):
+        machine = virtual_machine(8, 8, down_chips=[(1, 0), (1, 1), (0, 1)])
+        topology = machine_topology(machine)
+        components = topology.components
+        self.assertEqual(len(components), machine.n_chips)
+        alone = components[topology.chip_index(0, 0)]
+        for chip in machine.chips:
+            self.assertEqual(
+                components[topology.chip_index(chip.x, chip.y)] == alone,
+                (chip.x, chip.y) == (0, 0))
+        self.assertEqual(len(set(components.tolist())), 2)
+
+    def test_cached(self):
+        machine = virtual_machine(8, 8)
+        topology = machine_topology(machine)
+        self.assertIs(machine_topology(machine), topology)
+        self.assertIsNot(
+            machine_topology(virtual_machine(8, 8)), topology)
+
+    def test_pickle(self):
+        # Worker processes started by spawning are sent the topology
+        for machine in (
+                virtual_machine(8, 8, down_links=[(2, 2, 0)]),
+                virtual_machine(12, 12, validate=False)):
+            topology = machine_topology(machine)
+            copy = pickle.loads(pickle.dumps(topology))
+            self.assertEqual(copy.dead_links, topology.dead_links)
+            self.assertEqual(
+                copy.neighbours.tolist(), topology.neighbours.tolist())
+            for source in ((0, 0), (5, 2)):
+                for destination in ((7, 7), (1, 6), (6, 1)):
+                    self.assertEqual(
+                        copy.get_vector(source, destination),
+                        topology.get_vector(source, destination))
+                    self.assertEqual(
+                        copy.get_vector_length(source, destination),
+                        topology.get_vector_length(source, destination))
+
+    def test_invalidate(self):
+        machine = virtual_machine(8, 8, down_links=[(2, 2, 0)])
+        topology = machine_topology(machine)
+        self.assertIn((2, 2, 0), topology.dead_links)
+        machine.get_chip_at(2, 2).router.add_link(Link(2, 2, 0, 3, 2))
+        # Not seen until the snapshot is invalidated
+        self.assertIs(machine_topology(machine), topology)
+        invalidate_machine_topology(virtual_machine(8, 8))
+        self.assertIs(machine_topology(machine), topology)
+        invalidate_machine_topology(machine)
+        topology = machine_topology(machine)
+        self.assertNotIn((2, 2, 0), topology.dead_links)
+        invalidate_machine_topology()
+        self.assertIsNot(machine_topology(machine), topology)
+
+    def test_cache_is_weak(self):
+        machine = virtual_machine(8, 8)
+        machine_topology(machine)
+        ref = weakref.ref(machine)
+        del machine
+        gc.collect()
+        self.assertIsNone(ref())
+
+
+if __name__ == '__main__':
+    unittest.main()
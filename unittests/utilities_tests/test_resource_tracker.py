@@ -16,10 +16,13 @@
 import unittest
 from spinn_machine import (
     virtual_machine, Chip, Router, SDRAM, machine_from_chips)
+from pacman.model.constraints.placer_constraints import (
+    BoardConstraint, ChipAndCoreConstraint)
 from pacman.model.resources import (
     ResourceContainer, ConstantSDRAM, PreAllocatedResourceContainer,
-    CoreResource, SpecificCoreResource)
-from pacman.exceptions import PacmanValueError
+    CoreResource, SpecificCoreResource, IPtagResource, ReverseIPtagResource)
+from pacman.exceptions import (
+    PacmanException, PacmanInvalidParameterException, PacmanValueError)
 from pacman.utilities.utility_objs import ResourceTracker
 
 
@@ -69,47 +72,44 @@ class TestResourceTracker(unittest.TestCase):
         resources = ResourceContainer(sdram=sdram_res)
         chip_0 = machine.get_chip_at(0, 0)
 
-        # verify core tracker is empty
-        if (0, 0) in tracker._core_tracker:
-            raise Exception("shouldnt exist")
+        # verify no cores are used
+        self.assertEqual(
+            tracker._n_cores_available(chip_0, (0, 0), None),
+            chip_0.n_user_processors)
+        self.assertNotIn((0, 0), tracker.keys)
 
         # verify sdram tracker
-        if tracker._sdram_tracker[0, 0] != chip_sdram:
-            raise Exception("incorrect sdram of {}".format(
-                tracker._sdram_tracker[0, 0]))
+        self.assertEqual(tracker.sdram_avilable_on_chip(0, 0), chip_sdram)
 
         # allocate some res
         chip_x, chip_y, processor_id, ip_tags, reverse_ip_tags = \
             tracker.allocate_resources(resources, [(0, 0)])
 
         # verify chips used is updated
-        cores = list(tracker._core_tracker[(0, 0)])
-        self.assertEqual(len(cores), chip_0.n_user_processors - 1)
+        self.assertEqual(
+            tracker._n_cores_available(chip_0, (0, 0), None),
+            chip_0.n_user_processors - 1)
 
         # verify sdram used is updated
-        sdram = tracker._sdram_tracker[(0, 0)]
-        self.assertEqual(sdram, chip_sdram-res_sdram)
+        self.assertEqual(
+            tracker.sdram_avilable_on_chip(0, 0), chip_sdram - res_sdram)
 
-        if (0, 0) not in tracker._chips_used:
-            raise Exception("should exist")
+        self.assertIn((0, 0), tracker.keys)
+        self.assertEqual(tracker.chips_used, 1)
 
         # deallocate res
         tracker.unallocate_resources(
             chip_x, chip_y, processor_id, resources, ip_tags, reverse_ip_tags)
 
         # verify chips used is updated
-        if ((0, 0) in tracker._core_tracker and
-                len(tracker._core_tracker[(0, 0)]) !=
-                chip_0.n_user_processors):
-            raise Exception("shouldn't exist or should be right size")
-
-        if (0, 0) in tracker._chips_used:
-            raise Exception("shouldnt exist")
+        self.assertEqual(
+            tracker._n_cores_available(chip_0, (0, 0), None),
+            chip_0.n_user_processors)
+        self.assertNotIn((0, 0), tracker.keys)
+        self.assertEqual(tracker.chips_used, 0)
 
         # verify sdram tracker
-        if tracker._sdram_tracker[0, 0] != chip_sdram:
-            raise Exception("incorrect sdram of {}".format(
-                tracker._sdram_tracker[0, 0]))
+        self.assertEqual(tracker.sdram_avilable_on_chip(0, 0), chip_sdram)
 
     def test_allocate_resources_when_chip_used(self):
         router = Router([])
@@ -123,6 +123,205 @@ class TestResourceTracker(unittest.TestCase):
             resource_tracker.allocate_resources(
                 ResourceContainer(sdram=ConstantSDRAM(1024)))
 
+    def test_allocate_in_chip_order(self):
+        machine = virtual_machine(width=2, height=2, n_cpus_per_chip=3)
+        chip_sdram = machine.get_chip_at(0, 0).sdram.size
+        order = [(1, 1), (0, 1), (1, 0), (0, 0)]
+        tracker = ResourceTracker(machine, plan_n_timesteps=None, chips=order)
+        small = ResourceContainer(sdram=ConstantSDRAM(100))
+        large = ResourceContainer(sdram=ConstantSDRAM(chip_sdram - 50))
+
+        # The large one leaves a core but too little SDRAM on (1, 1)
+        x, y, large_p, _, _ = tracker.allocate_resources(large)
+        self.assertEqual((x, y), (1, 1))
+        x, y, small_p, _, _ = tracker.allocate_resources(small)
+        self.assertEqual((x, y), (0, 1))
+        self.assertEqual(tracker.allocate_resources(small)[:2], (0, 1))
+
+        # (0, 1) is full, so is no longer available
+        self.assertFalse(tracker.is_chip_available(0, 1))
+        self.assertEqual(list(tracker.chips_available), [
+            (1, 1), (1, 0), (0, 0)])
+        self.assertEqual(tracker.allocate_resources(small)[:2], (1, 0))
+
+        # Freeing the large one puts (1, 1) first again, and (0, 1) goes
+        # back to its place in the order
+        tracker.unallocate_resources(1, 1, large_p, large, None, None)
+        self.assertEqual(tracker.allocate_resources(large)[:2], (1, 1))
+        tracker.unallocate_resources(0, 1, small_p, small, None, None)
+        self.assertEqual(list(tracker.chips_available), [
+            (1, 1), (0, 1), (1, 0), (0, 0)])
+
+    def test_cores_of_unusual_chips(self):
+        machine = virtual_machine(
+            width=2, height=2, down_cores=[(1, 1, 3), (1, 1, 5)])
+        machine.add_virtual_chip(Chip(
+            5, 5, 128, Router([]), SDRAM(), None, None, virtual=True))
+        tracker = ResourceTracker(machine, plan_n_timesteps=None)
+        self.assertEqual(tracker.get_maximum_cores_available_on_a_chip(), 17)
+        self.assertEqual(
+            tracker.get_maximum_cores_available_on_a_virtual_chip(), 127)
+
+        # The cores that are down are never used
+        resources = ResourceContainer()
+        self.assertEqual(
+            [tracker.allocate_resources(resources, [(1, 1)])[2]
+             for _ in range(4)],
+            [1, 2, 4, 6])
+        with self.assertRaises(PacmanValueError):
+            tracker.allocate_constrained_resources(
+                resources, [ChipAndCoreConstraint(1, 1, 5)])
+
+        # Cores beyond the first 32 can be asked for and freed
+        _, _, p, _, _ = tracker.allocate_constrained_resources(
+            resources, [ChipAndCoreConstraint(5, 5, 100)])
+        self.assertEqual(p, 100)
+        with self.assertRaises(PacmanValueError):
+            tracker.allocate_resources(resources, [(5, 5)], 100)
+        self.assertEqual(
+            tracker.get_maximum_cores_available_on_a_virtual_chip(), 126)
+        tracker.unallocate_resources(5, 5, 100, resources, None, None)
+        self.assertEqual(
+            tracker.get_maximum_cores_available_on_a_virtual_chip(), 127)
+        self.assertEqual(tracker.chips_used, 1)
+
+    @staticmethod
+    def _state(tracker, machine, vertex):
+        return (
+            list(tracker.chips_available),
+            [tracker.sdram_avilable_on_chip(chip.x, chip.y)
+             for chip in machine.chips],
+            [tracker._n_cores_available(chip, (chip.x, chip.y), None)
+             for chip in machine.chips],
+            tracker.keys, list(tracker._real_chips_with_n_cores_available),
+            tracker.chip_of(vertex),
+            dict((board, set(tags))
+                 for board, tags in tracker._tags_by_board.items()),
+            dict(tracker._n_ip_tag_allocations),
+            set(tracker._reverse_ip_tag_listen_port))
+
+    def test_checkpoint_rollback(self):
+        machine = virtual_machine(width=2, height=2, n_cpus_per_chip=3)
+        tracker = ResourceTracker(machine, plan_n_timesteps=None)
+        resources = ResourceContainer(sdram=ConstantSDRAM(1000))
+        tagged = ResourceContainer(
+            sdram=ConstantSDRAM(2000),
+            iptags=[IPtagResource("1.2.3.4", 1234, True)],
+            reverse_iptags=[ReverseIPtagResource(5678)])
+        first = tracker.allocate_resources(resources, vertices=["a"])
+        before = self._state(tracker, machine, "a")
+
+        # Changes after a checkpoint are undone by a rollback
+        tracker.checkpoint()
+        tracker.allocate_resources(tagged, vertices=["b"])
+        tracker.allocate_resources(resources)
+        tracker.unallocate_resources(
+            first[0], first[1], first[2], resources, None, None,
+            vertices=["a"])
+        tracker.allocate_sdram(1, 1, 5000)
+        self.assertNotEqual(self._state(tracker, machine, "a"), before)
+        tracker.rollback()
+        self.assertEqual(self._state(tracker, machine, "a"), before)
+        self.assertIsNone(tracker.chip_of("b"))
+
+        # A nested commit is still undone by the outer rollback
+        tracker.checkpoint()
+        tracker.allocate_resources(tagged)
+        tracker.checkpoint()
+        tracker.allocate_resources(tagged)
+        tracker.commit()
+        tracker.rollback()
+        self.assertEqual(self._state(tracker, machine, "a"), before)
+
+        # A commit keeps the changes
+        tracker.checkpoint()
+        tracker.allocate_resources(resources, [(1, 1)])
+        tracker.commit()
+        self.assertEqual(tracker.sdram_avilable_on_chip(1, 1),
+                         machine.get_chip_at(1, 1).sdram.size - 1000)
+        with self.assertRaises(PacmanException):
+            tracker.rollback()
+        with self.assertRaises(PacmanException):
+            tracker.commit()
+
+    def test_maximum_resources_available(self):
+        machine = virtual_machine(width=12, height=12, n_cpus_per_chip=2)
+        tracker = ResourceTracker(machine, plan_n_timesteps=None)
+        chip_sdram = machine.get_chip_at(0, 0).sdram.size
+        eth_chip = machine.get_chip_at(4, 8)
+        constraint = BoardConstraint(eth_chip.ip_address)
+        board = [constraint]
+        on_board = list(machine.get_existing_xys_on_board(eth_chip))
+
+        def max_sdram(constraints):
+            return tracker.get_maximum_constrained_resources_available(
+                ResourceContainer(), constraints).sdram.get_total_sdram(None)
+
+        # Use up a different amount of the SDRAM of each chip on the board,
+        # and all of it on the other chips
+        used = dict(((x, y), 1000 * (x * 12 + y + 1)) for x, y in on_board)
+        first, second = sorted(on_board, key=used.get)[:2]
+        for (x, y), sdram in used.items():
+            tracker.allocate_sdram(x, y, sdram)
+        self.assertEqual(max_sdram(board), chip_sdram - used[first])
+        self.assertEqual(max_sdram([]), chip_sdram)
+        for chip in machine.chips:
+            if (chip.x, chip.y) not in used:
+                tracker.allocate_sdram(chip.x, chip.y, chip_sdram)
+        self.assertEqual(max_sdram([]), chip_sdram - used[first])
+
+        # A full chip is not counted, and comes back when it is freed
+        x, y, p, _, _ = tracker.allocate_resources(
+            ResourceContainer(), [first])
+        self.assertEqual(max_sdram([]), chip_sdram - used[second])
+        self.assertEqual(max_sdram(board), chip_sdram - used[second])
+        tracker.unallocate_resources(x, y, p, ResourceContainer(), None, None)
+        self.assertEqual(max_sdram([]), chip_sdram - used[first])
+        self.assertEqual(max_sdram(
+            [constraint, ChipAndCoreConstraint(*second)]),
+            chip_sdram - used[second])
+
+    def test_allocate_many(self):
+        machine = virtual_machine(width=2, height=2, n_cpus_per_chip=4)
+        chip_sdram = machine.get_chip_at(0, 0).sdram.size
+        resources = ResourceContainer(sdram=ConstantSDRAM(chip_sdram // 2))
+        tracker = ResourceTracker(machine, plan_n_timesteps=None)
+        one_by_one = ResourceTracker(machine, plan_n_timesteps=None)
+
+        # Each chip is filled in turn, as one at a time would do
+        for _ in range(2):
+            tracker.allocate_resources(ResourceContainer(), [(0, 1)])
+            one_by_one.allocate_resources(ResourceContainer(), [(0, 1)])
+        allocations = tracker.allocate_many(resources, 5)
+        self.assertEqual(allocations, [
+            one_by_one.allocate_resources(resources)[:3] for _ in range(5)])
+        self.assertEqual(
+            [(x, y) for x, y, _ in allocations],
+            [(0, 0), (0, 0), (0, 1), (1, 0), (1, 0)])
+        self.assertEqual(list(tracker.chips_available),
+                         list(one_by_one.chips_available))
+
+        # If they don't all fit, none are allocated
+        with self.assertRaises(PacmanValueError):
+            tracker.allocate_many(resources, 4)
+        self.assertEqual(tracker.sdram_avilable_on_chip(1, 1), chip_sdram)
+        self.assertEqual(tracker.allocate_many(resources, 2, [(1, 0), (1, 1)]),
+                         [(1, 1, 1), (1, 1, 2)])
+
+        # Running out of the cores of the chips given fails as one at a
+        # time would
+        tracker = ResourceTracker(machine, plan_n_timesteps=None)
+        small = ResourceContainer(sdram=ConstantSDRAM(1))
+        with self.assertRaises(PacmanInvalidParameterException):
+            tracker.allocate_many(small, 4, [(1, 1)])
+        self.assertEqual(tracker.allocate_many(small, 3, [(1, 1)]),
+                         [(1, 1, 1), (1, 1, 2), (1, 1, 3)])
+        with self.assertRaises(PacmanInvalidParameterException):
+            tracker.allocate_resources(small, [(1, 1)])
+        with self.assertRaises(PacmanInvalidParameterException):
+            tracker.allocate_many(ResourceContainer(iptags=[
+                IPtagResource("1.2.3.4", 1234, True)]), 1)
+
 
 if __name__ == '__main__':
     unittest.main()